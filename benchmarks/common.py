@@ -0,0 +1,89 @@
+"""
+Helpers shared by the benchmark suite: timing, the environment record and
+the JSON result format.
+
+Every suite produces
+    {"suite": str, "environment": {...}, "results": [{"name", "params", "metrics"}, ...]}
+so two runs can be compared with `python -m benchmarks.compare`.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Optional
+
+from re_gpt import json_backend
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "json_backend": json_backend.get_json_backend(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def time_call(function: Callable[[], object], repeat: int = 5) -> dict:
+    """
+    Run `function` `repeat` times.
+
+    Returns:
+        dict: Minimum and median wall time of one run in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {"min_s": min(timings), "median_s": statistics.median(timings)}
+
+
+def percentile(values: list, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def result(name: str, params: dict, metrics: dict) -> dict:
+    return {"name": name, "params": params, "metrics": metrics}
+
+
+def report(suite: str, results: list, output: Optional[str] = None) -> dict:
+    """
+    Print a summary to stderr and write the JSON document to `output` (stdout for "-").
+    """
+    document = {"suite": suite, "environment": environment(), "results": results}
+    for entry in results:
+        params = " ".join(f"{key}={value}" for key, value in entry["params"].items())
+        metrics = " ".join(
+            f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in entry["metrics"].items()
+        )
+        print(f"{entry['name']:<22} {params:<40} {metrics}", file=sys.stderr)
+
+    if output == "-":
+        json.dump(document, sys.stdout, indent=2)
+        print()
+    elif output:
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(document, file, indent=2)
+    return document
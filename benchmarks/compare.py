@@ -0,0 +1,69 @@
+"""
+Compare two benchmark result files, e.g. from two commits:
+
+    python -m benchmarks.hot_path --output before.json
+    git checkout other-branch
+    python -m benchmarks.hot_path --output after.json
+    python -m benchmarks.compare before.json after.json --threshold 0.1
+
+Prints the relative change of every metric both runs have and exits with 1 if
+a time got slower, or a rate lower, by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+# metrics where a higher value is better, every other one is a time or a size
+HIGHER_IS_BETTER = ("_per_s", "_per_cpu_s")
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as file:
+        document = json.load(file)
+    return {
+        (entry["name"], json.dumps(entry["params"], sort_keys=True)): entry["metrics"]
+        for entry in document["results"]
+    }
+
+
+def compare(before: dict, after: dict, threshold: float) -> list:
+    """
+    Returns:
+        list: (name, params, metric, before, after, change, regressed) for every common metric.
+    """
+    rows = []
+    for key, metrics in after.items():
+        if key not in before:
+            continue
+        name, params = key
+        for metric, value in metrics.items():
+            old = before[key].get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            if metric.endswith(HIGHER_IS_BETTER):
+                regressed = change < -threshold
+            else:
+                regressed = change > threshold
+            rows.append((name, params, metric, old, value, change, regressed))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="relative change counted as a regression"
+    )
+    args = parser.parse_args()
+
+    rows = compare(load(args.before), load(args.after), args.threshold)
+    for name, params, metric, old, new, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{name:<22} {params:<50} {metric:<18} {old:>12.4g} {new:>12.4g} {change:>+8.1%} {flag}")
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
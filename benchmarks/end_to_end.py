@@ -0,0 +1,191 @@
+"""
+End-to-end benchmarks against a local re_gpt.mock_server, started as a
+subprocess so its work doesn't count against the client: time to first token
+and deltas per second over HTTP and the websocket, memory per concurrent
+stream, and the startup time of AsyncChatGPT.__aenter__ (eager and lazy) and
+SyncChatGPT.__enter__.
+
+Run from the repository root:
+    python -m benchmarks.end_to_end --output results/end_to_end.json
+"""
+import argparse
+import asyncio
+import contextlib
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from re_gpt import AsyncChatGPT, SyncChatGPT
+
+from .common import percentile, report, result
+
+SESSION_TOKEN = "benchmark"
+
+
+@contextlib.contextmanager
+def mock_server(**options):
+    """
+    Start `python -m re_gpt.mock_server` with the given options.
+
+    Yields:
+        str: Base URL of the server.
+    """
+    command = [sys.executable, "-m", "re_gpt.mock_server", "--port", "0", "--websocket-port", "0"]
+    for name, value in options.items():
+        flag = "--" + name.replace("_", "-")
+        if value is True:
+            command.append(flag)
+        elif value is not False:
+            command += [flag, str(value)]
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError("The mock server didn't start.")
+        yield line.rsplit(" ", 1)[-1].strip()
+    finally:
+        process.terminate()
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def client(base_url: str, **options) -> AsyncChatGPT:
+    return AsyncChatGPT(
+        session_token=SESSION_TOKEN,
+        base_url=base_url,
+        conversation_cache_size=0,
+        **options,
+    )
+
+
+async def timed_chat(chatgpt: AsyncChatGPT, prompt: str) -> dict:
+    conversation = chatgpt.create_new_conversation()
+    start = time.perf_counter()
+    first_token_at = None
+    deltas = 0
+    async for _ in conversation.chat(prompt):
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+        deltas += 1
+    end = time.perf_counter()
+    return {
+        "ttft": first_token_at - start,
+        "total": end - start,
+        "deltas": deltas,
+        "streaming": end - first_token_at,
+    }
+
+
+async def bench_stream(base_url: str, websocket: bool, chats: int, reply_tokens: int) -> dict:
+    async with client(base_url, websocket_mode=websocket) as chatgpt:
+        await timed_chat(chatgpt, "warmup")
+        runs = [await timed_chat(chatgpt, f"prompt {index}") for index in range(chats)]
+
+    ttfts = [run["ttft"] for run in runs]
+    deltas = sum(run["deltas"] for run in runs)
+    streaming = sum(run["streaming"] for run in runs)
+    return result(
+        "stream",
+        {"transport": "websocket" if websocket else "http", "reply_tokens": reply_tokens, "chats": chats},
+        {
+            "ttft_p50_s": percentile(ttfts, 0.5),
+            "ttft_p95_s": percentile(ttfts, 0.95),
+            "total_p50_s": statistics.median(run["total"] for run in runs),
+            "deltas_per_s": deltas / streaming if streaming else None,
+        },
+    )
+
+
+async def bench_memory(base_url: str, streams: int, reply_tokens: int) -> dict:
+    async with client(base_url) as chatgpt:
+        await timed_chat(chatgpt, "warmup")
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await asyncio.gather(*(timed_chat(chatgpt, f"prompt {index}") for index in range(streams)))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result(
+        "stream_memory",
+        {"streams": streams, "reply_tokens": reply_tokens},
+        {"peak_bytes": peak - baseline, "bytes_per_stream": (peak - baseline) / streams},
+    )
+
+
+async def time_async_enter(base_url: str, lazy: bool) -> float:
+    chatgpt = client(base_url, websocket_mode=True, lazy_startup=lazy)
+    start = time.perf_counter()
+    await chatgpt.__aenter__()
+    elapsed = time.perf_counter() - start
+    await chatgpt.__aexit__(None, None, None)
+    return elapsed
+
+
+def time_sync_enter(base_url: str) -> float:
+    chatgpt = SyncChatGPT(
+        session_token=SESSION_TOKEN,
+        base_url=base_url,
+        websocket_mode=True,
+        conversation_cache_size=0,
+    )
+    start = time.perf_counter()
+    chatgpt.__enter__()
+    elapsed = time.perf_counter() - start
+    chatgpt.__exit__(None, None, None)
+    return elapsed
+
+
+def bench_startup(base_url: str, latency: float, repeat: int) -> list:
+    results = []
+    for name, measure in (
+        ("async_enter_eager", lambda: asyncio.run(time_async_enter(base_url, False))),
+        ("async_enter_lazy", lambda: asyncio.run(time_async_enter(base_url, True))),
+        ("sync_enter", lambda: time_sync_enter(base_url)),
+    ):
+        timings = [measure() for _ in range(repeat)]
+        results.append(
+            result(
+                "startup",
+                {"client": name, "server_latency_s": latency},
+                {"min_s": min(timings), "median_s": statistics.median(timings)},
+            )
+        )
+    return results
+
+
+def run(chats: int = 20, repeat: int = 5) -> list:
+    results = []
+    for reply_tokens in (100, 1000):
+        for websocket in (False, True):
+            # a server with websockets upgrades even websocket_mode=False clients
+            with mock_server(
+                token_rate=0, reply_tokens=reply_tokens, latency=0.002, no_websocket=not websocket
+            ) as base_url:
+                results.append(asyncio.run(bench_stream(base_url, websocket, chats, reply_tokens)))
+
+    with mock_server(token_rate=0, reply_tokens=1000, no_websocket=True) as base_url:
+        results.append(asyncio.run(bench_memory(base_url, 16, 1000)))
+
+    latency = 0.02
+    with mock_server(latency=latency) as base_url:
+        results += bench_startup(base_url, latency, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.end_to_end")
+    parser.add_argument("--chats", type=int, default=20, help="chats per stream benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per startup benchmark")
+    parser.add_argument("--output", default="-", help='path of the JSON results, "-" for stdout')
+    args = parser.parse_args()
+    report("end_to_end", run(args.chats, args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Microbenchmarks of the streaming hot path: SSE line handling, event JSON
+decoding, filter_response and the delta slicing of chat(), for several reply
+lengths and network chunk sizes. Streams are synthetic and replayed in
+memory, nothing goes over the network.
+
+Run from the repository root:
+    python -m benchmarks.hot_path --output results/hot_path.json
+"""
+import argparse
+import asyncio
+import time
+
+from re_gpt.async_chatgpt import AsyncConversation
+from re_gpt.sse import SSEDecoder
+
+from .common import report, result, time_call
+from .latest_wins import ReplayClient, ReplayConversation, build_stream, group_chunks
+
+REPLY_TOKENS = (500, 2000)
+CHUNK_BYTES = (64, 1024, 16384)
+EVENTS_PER_CHUNK = (1, 16)
+
+# what web search replies repeat in every event, none of it is read by chat()
+CITATION_METADATA = {
+    "citations": [
+        {
+            "start_ix": i,
+            "end_ix": i + 5,
+            "metadata": {
+                "title": f"Page title {i}",
+                "url": f"https://example.com/{i}",
+                "text": "snippet text " * 20,
+            },
+        }
+        for i in range(30)
+    ],
+    "content_references": [
+        {"matched_text": "x", "type": "webpage", "items": [{"title": "t", "url": "u"}]}
+        for _ in range(30)
+    ],
+}
+
+
+def split_bytes(data: bytes, size: int) -> list:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def event_data(events: list) -> list:
+    # the data of every event, as the SSE decoder hands it to decode_raw_json
+    decoder = SSEDecoder()
+    data = []
+    for event in events:
+        data += decoder.feed(event)
+    return [item for item in data if item != "[DONE]"]
+
+
+def bench_sse(tokens: int, chunk_bytes: int, repeat: int) -> dict:
+    stream = b"".join(build_stream(tokens))
+    chunks = split_bytes(stream, chunk_bytes)
+
+    def decode():
+        decoder = SSEDecoder()
+        for chunk in chunks:
+            decoder.feed(chunk)
+        decoder.flush()
+
+    timing = time_call(decode, repeat)
+    return result(
+        "sse_decode",
+        {"tokens": tokens, "chunk_bytes": chunk_bytes},
+        {**timing, "mb_per_s": len(stream) / timing["median_s"] / 1e6},
+    )
+
+
+def bench_decode_json(tokens: int, typed: bool, repeat: int, citations: bool = False) -> dict:
+    data = event_data(build_stream(tokens, CITATION_METADATA if citations else None))
+
+    def decode():
+        for item in data:
+            AsyncConversation.decode_raw_json(item, typed)
+
+    timing = time_call(decode, repeat)
+    params = {"tokens": tokens, "typed": typed}
+    if citations:
+        params["citations"] = True
+    return result(
+        "decode_raw_json",
+        params,
+        {**timing, "events_per_s": len(data) / timing["median_s"]},
+    )
+
+
+def bench_filter_response(tokens: int, repeat: int) -> dict:
+    decoded = [
+        AsyncConversation.decode_raw_json(item) for item in event_data(build_stream(tokens))
+    ]
+
+    def filter_all():
+        for event in decoded:
+            AsyncConversation.filter_response(event)
+
+    timing = time_call(filter_all, repeat)
+    return result(
+        "filter_response",
+        {"tokens": tokens},
+        {**timing, "events_per_s": len(decoded) / timing["median_s"]},
+    )
+
+
+async def consume(chunks: list) -> int:
+    conversation = ReplayConversation(ReplayClient(), chunks)
+    deltas = 0
+    async for _ in conversation.chat(""):
+        deltas += 1
+    return deltas
+
+
+def bench_chat_deltas(tokens: int, events_per_chunk: int, repeat: int) -> dict:
+    chunks = group_chunks(build_stream(tokens), events_per_chunk)
+    cpu_times = []
+    for _ in range(repeat):
+        start = time.process_time()
+        deltas = asyncio.run(consume(chunks))
+        cpu_times.append(time.process_time() - start)
+
+    cpu = min(cpu_times)
+    return result(
+        "chat_deltas",
+        {"tokens": tokens, "events_per_chunk": events_per_chunk},
+        {"cpu_s": cpu, "deltas": deltas, "deltas_per_cpu_s": deltas / cpu if cpu else None},
+    )
+
+
+def run(repeat: int = 5) -> list:
+    results = []
+    for tokens in REPLY_TOKENS:
+        for chunk_bytes in CHUNK_BYTES:
+            results.append(bench_sse(tokens, chunk_bytes, repeat))
+        for typed in (False, True):
+            results.append(bench_decode_json(tokens, typed, repeat))
+            results.append(bench_decode_json(tokens, typed, repeat, citations=True))
+        results.append(bench_filter_response(tokens, repeat))
+        for events_per_chunk in EVENTS_PER_CHUNK:
+            results.append(bench_chat_deltas(tokens, events_per_chunk, min(repeat, 3)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.hot_path")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="-", help='path of the JSON results, "-" for stdout')
+    args = parser.parse_args()
+    report("hot_path", run(args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
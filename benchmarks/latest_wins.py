@@ -0,0 +1,118 @@
+"""
+Compare the CPU time chat() spends parsing a long cumulative SSE stream with and
+without latest-wins mode.
+
+Run from the repository root:
+    python -m benchmarks.latest_wins --output results/latest_wins.json
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Optional
+
+from re_gpt.async_chatgpt import AsyncChatGPT, AsyncConversation
+
+from .common import report, result
+
+TOKEN = "lorem "  # roughly one token per word
+
+
+def build_stream(tokens: int, metadata: Optional[dict] = None) -> list:
+    """
+    Build the SSE events the backend sends for an answer of the given length,
+    every event carrying the whole message so far, and `metadata` in every
+    message's metadata.
+    """
+    events = []
+    for i in range(1, tokens + 1):
+        event = {
+            "message": {
+                "id": "message-id",
+                "author": {"role": "assistant"},
+                "content": {"content_type": "text", "parts": [TOKEN * i]},
+                "metadata": {
+                    "parent_id": "parent-id",
+                    "finish_details": {"type": "stop"} if i == tokens else None,
+                    **(metadata or {}),
+                },
+            },
+            "conversation_id": "conversation-id",
+        }
+        events.append(f"data: {json.dumps(event)}\n\n".encode())
+    events.append(b"data: [DONE]\n\n")
+    return events
+
+
+def group_chunks(events: list, events_per_chunk: int) -> list:
+    return [
+        b"".join(events[i : i + events_per_chunk])
+        for i in range(0, len(events), events_per_chunk)
+    ]
+
+
+class ReplayClient(AsyncChatGPT):
+    def start_background_setup(self) -> None:
+        # nothing goes over the network, replies are replayed
+        pass
+
+
+class ReplayConversation(AsyncConversation):
+    def __init__(self, chatgpt, chunks):
+        super().__init__(chatgpt, model="gpt-3.5")
+        self.chunks = chunks
+
+    async def send_message(self, payload: dict):
+        for chunk in self.chunks:
+            yield chunk
+
+
+async def consume(latest_wins: bool, chunks: list) -> tuple:
+    chatgpt = ReplayClient(latest_wins=latest_wins)
+    conversation = ReplayConversation(chatgpt, chunks)
+
+    deltas = 0
+    content = []
+    start = time.process_time()
+    async for response in conversation.chat(""):
+        deltas += 1
+        content.append(response["content"])
+    return time.process_time() - start, deltas, "".join(content)
+
+
+def run(repeat: int = 3) -> list:
+    results = []
+    for tokens in (2000, 8000):
+        events = build_stream(tokens)
+        for events_per_chunk in (1, 4, 16):
+            chunks = group_chunks(events, events_per_chunk)
+            for latest_wins in (False, True):
+                cpu_times = []
+                for _ in range(repeat):
+                    cpu, deltas, content = asyncio.run(consume(latest_wins, chunks))
+                    assert content == TOKEN * tokens
+                    cpu_times.append(cpu)
+                results.append(
+                    result(
+                        "latest_wins",
+                        {
+                            "tokens": tokens,
+                            "events_per_chunk": events_per_chunk,
+                            "latest_wins": latest_wins,
+                        },
+                        {"cpu_s": min(cpu_times), "deltas": deltas},
+                    )
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.latest_wins")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="-", help='path of the JSON results, "-" for stdout')
+    args = parser.parse_args()
+    report("latest_wins", run(args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Compare how long it takes until the client is entered and until the first
+message goes out, with the startup steps run one after another (how __aenter__
+used to work), in parallel on enter (the default) and lazily on first use.
+Network round trips are simulated with fixed delays.
+
+Run from the repository root:
+    python -m benchmarks.startup --output results/startup.json
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from re_gpt import arkose
+from re_gpt.async_chatgpt import AsyncChatGPT
+
+from .common import report, result
+
+# seconds per simulated round trip
+LATENCIES = {
+    "auth": 0.15,
+    "websocket_check": 0.10,
+    "websocket_connect": 0.15,
+    "binary": 0.30,
+    "sentinel": 0.12,
+    "arkose": 0.05,
+}
+
+FINISHED_EVENT = {
+    "message": {
+        "id": "message-id",
+        "author": {"role": "assistant"},
+        "content": {"content_type": "text", "parts": ["hi"]},
+        "metadata": {"parent_id": "parent-id", "finish_details": {"type": "stop"}},
+    },
+    "conversation_id": "conversation-id",
+}
+
+
+async def resolve_binary(session, offline=False):
+    await asyncio.sleep(LATENCIES["binary"])
+    return None  # no binary, tokens come from the (simulated) backup generator
+
+
+arkose.async_get_binary_path = resolve_binary
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+
+class StartupClient(AsyncChatGPT):
+    def __init__(self, **kwargs):
+        super().__init__(session_token="session-token", generate_arkose_token=True, **kwargs)
+        self.first_message_at = None
+        self.arkose_provider.fetch_backup_token = self.fetch_arkose_token
+
+    async def fetch_arkose_token(self):
+        await asyncio.sleep(LATENCIES["arkose"])
+        return "arkose-token"
+
+    async def load_auth_token(self):
+        await asyncio.sleep(LATENCIES["auth"])
+        return "access-token"
+
+    async def check_websocket_availability(self):
+        await self.request_headers()
+        await asyncio.sleep(LATENCIES["websocket_check"])
+        return False
+
+    async def ensure_websocket(self):
+        await asyncio.sleep(LATENCIES["websocket_connect"])
+
+    async def fetch_chat_requirements_token(self):
+        await self.request_headers()
+        await asyncio.sleep(LATENCIES["sentinel"])
+        return "sentinel-token"
+
+    async def limited_request(self, endpoint, method, **kwargs):
+        if self.first_message_at is None:
+            self.first_message_at = time.perf_counter()
+        kwargs["content_callback"](f"data: {json.dumps(FINISHED_EVENT)}\n\n".encode())
+        return FakeResponse()
+
+
+async def sequential_enter(chatgpt: StartupClient):
+    # the steps of the old __aenter__, in its order
+    await chatgpt.warmup_arkose()
+    await chatgpt.ensure_auth_token()
+    chatgpt.websocket_mode = await chatgpt.check_websocket_availability()
+    if chatgpt.websocket_mode:
+        await chatgpt.ensure_websocket()
+    chatgpt.chat_requirements_cache.prefetch()
+
+
+async def measure(mode: str) -> tuple:
+    chatgpt = StartupClient(lazy_startup=mode == "lazy")
+    start = time.perf_counter()
+    if mode == "sequential":
+        chatgpt.lazy_startup = True
+        await chatgpt.__aenter__()
+        await sequential_enter(chatgpt)
+    else:
+        await chatgpt.__aenter__()
+    entered = time.perf_counter() - start
+
+    conversation = chatgpt.create_new_conversation()
+    async for _ in conversation.chat("hello"):
+        pass
+    first_message = chatgpt.first_message_at - start
+
+    await chatgpt.__aexit__(None, None, None)
+    return entered, first_message
+
+
+def run(repeat: int = 3) -> list:
+    results = []
+    for mode in ("sequential", "eager", "lazy"):
+        timings = [asyncio.run(measure(mode)) for _ in range(repeat)]
+        results.append(
+            result(
+                "startup",
+                {"mode": mode},
+                {
+                    "enter_s": min(entered for entered, _ in timings),
+                    "first_message_s": min(first_message for _, first_message in timings),
+                },
+            )
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="-", help='path of the JSON results, "-" for stdout')
+    args = parser.parse_args()
+    report("startup", run(args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,9 @@
 from .async_chatgpt import AsyncChatGPT
 from .sync_chatgpt import SyncChatGPT
+from .pool import AsyncChatGPTPool
+from .retry import RetryPolicy
+from .chat_list import ChatSummary
+from .export import AsyncConversationExporter
+from .search import ConversationIndex
+from .response_cache import DiskResponseCache, MemoryResponseCache
+from .instrumentation import OpenTelemetryHook
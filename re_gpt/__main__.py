@@ -0,0 +1,94 @@
+"""
+Command line tools of re_gpt.
+
+    python -m re_gpt export archive.jsonl.zst --session-token "..."
+
+The session token (or access token) can also be given with the
+RE_GPT_SESSION_TOKEN (RE_GPT_AUTH_TOKEN) environment variable.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from .async_chatgpt import BASE_URL, AsyncChatGPT
+from .export import COMPRESSIONS, AsyncConversationExporter
+
+
+def print_progress(stats: dict) -> None:
+    print(
+        f"exported {stats['exported']}, unchanged {stats['skipped']}, failed {len(stats['failed'])}",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+async def export(args: argparse.Namespace) -> int:
+    async with AsyncChatGPT(
+        session_token=args.session_token,
+        auth_token=args.auth_token,
+        base_url=args.base_url,
+        lazy_startup=True,
+        conversation_cache_size=0,
+    ) as chatgpt:
+        exporter = AsyncConversationExporter(
+            chatgpt,
+            args.output,
+            checkpoint_path=args.checkpoint,
+            compression=args.compression,
+            concurrency=args.concurrency,
+            page_size=args.page_size,
+            checkpoint_every=args.checkpoint_every,
+            progress_callback=print_progress,
+        )
+        stats = await exporter.run()
+
+    for conversation_id, error in stats["failed"].items():
+        print(f"{conversation_id}: {error!r}", file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m re_gpt")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser(
+        "export",
+        help="export every conversation to compressed JSONL, resumable and incremental",
+    )
+    export_parser.add_argument("output", help="path of the JSONL file")
+    export_parser.add_argument(
+        "--checkpoint", help="path of the checkpoint file (default: OUTPUT.checkpoint.json)"
+    )
+    export_parser.add_argument(
+        "--compression",
+        choices=COMPRESSIONS,
+        help="compression of a new export (default: zstd if zstandard is installed, else gzip)",
+    )
+    export_parser.add_argument("--concurrency", type=int, default=8)
+    export_parser.add_argument("--page-size", type=int, default=28)
+    export_parser.add_argument("--checkpoint-every", type=int, default=50)
+    export_parser.add_argument(
+        "--session-token", default=os.environ.get("RE_GPT_SESSION_TOKEN")
+    )
+    export_parser.add_argument(
+        "--auth-token", default=os.environ.get("RE_GPT_AUTH_TOKEN")
+    )
+    export_parser.add_argument(
+        "--base-url", default=BASE_URL, help="backend origin, e.g. a re_gpt.mock_server"
+    )
+    return parser
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+    if args.command == "export":
+        if not args.session_token and not args.auth_token:
+            print("A session token or an access token is needed.", file=sys.stderr)
+            return 2
+        return asyncio.run(export(args))
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
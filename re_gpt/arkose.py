@@ -0,0 +1,137 @@
+import asyncio
+import ctypes
+from concurrent.futures import Executor
+from typing import Optional
+
+from .errors import BackendError, RetryError
+from .token_pool import AsyncTokenPool
+from .utils import async_get_binary_path, backoff_delay
+
+BACKUP_ARKOSE_TOKEN_GENERATOR = "https://arkose-token-generator.zaieem.repl.co/token"
+
+loaded_binaries = {}
+
+
+def generate_binary_token(binary_path: str) -> str:
+    """
+    Generate an Arkose token with the funcaptcha binary. Blocking, meant to run
+    in a thread or process pool, the binary is loaded once per process.
+
+    Args:
+        binary_path (str): Path of the funcaptcha binary.
+
+    Returns:
+        str: Arkose token.
+    """
+    arkose = loaded_binaries.get(binary_path)
+    if arkose is None:
+        arkose = ctypes.CDLL(binary_path)
+        arkose.GetToken.restype = ctypes.c_char_p
+        loaded_binaries[binary_path] = arkose
+
+    result = arkose.GetToken()
+    return ctypes.string_at(result).decode("utf-8")
+
+
+class AsyncArkoseTokenProvider:
+    def __init__(
+        self,
+        chatgpt,
+        pool_size: Optional[int] = 0,
+        token_ttl: Optional[float] = 120,
+        executor: Optional[Executor] = None,
+        max_retries: Optional[int] = 5,
+        offline: Optional[bool] = False,
+    ):
+        """
+        Hands out Arkose tokens from a pool that is refilled in the background.
+        Tokens are generated with the funcaptcha binary off the event loop, or
+        fetched from the backup generator with exponential backoff.
+
+        Args:
+            chatgpt: The client whose session is used for downloads and the backup generator.
+            pool_size (Optional[int]): How many tokens to keep ready, 0 generates one per message. Every prefetched token costs a generator call even if it's never used. Defaults to 0.
+            token_ttl (Optional[float]): Seconds after which an unused token is thrown away. Defaults to 120.
+            executor (Optional[Executor]): Thread or process pool running the binary. Defaults to the loop's default executor.
+            max_retries (Optional[int]): Attempts on the backup generator. Defaults to 5.
+            offline (Optional[bool]): Use the local funcaptcha binary as is, without checking for updates. Defaults to False.
+        """
+        self.chatgpt = chatgpt
+        self.executor = executor
+        self.max_retries = max_retries
+        self.offline = offline
+
+        self.binary_path = None
+        self.tried_downloading_binary = False
+        self.binary_lock = None
+
+        self.pool = AsyncTokenPool(
+            self.generate_token, ttl=token_ttl, pool_size=pool_size
+        )
+
+    async def load_binary(self) -> Optional[str]:
+        """
+        Download the funcaptcha binary if needed, only tried once.
+
+        Returns:
+            Optional[str]: Path of the binary, None if there's none for this OS.
+        """
+        if self.tried_downloading_binary:
+            return self.binary_path
+
+        if self.binary_lock is None:
+            self.binary_lock = asyncio.Lock()
+
+        async with self.binary_lock:
+            if not self.tried_downloading_binary:
+                self.binary_path = await async_get_binary_path(
+                    self.chatgpt.session, offline=self.offline
+                )
+                self.tried_downloading_binary = True
+
+        return self.binary_path
+
+    async def get(self) -> str:
+        """
+        Get an Arkose token, from the pool if one is ready.
+
+        Returns:
+            str: Arkose token.
+        """
+        return await self.pool.get()
+
+    def prefetch(self) -> None:
+        self.pool.prefetch()
+
+    def close(self) -> None:
+        self.pool.close()
+
+    async def generate_token(self) -> str:
+        """
+        Generate a new Arkose token.
+
+        Returns:
+            str: Arkose token.
+        """
+        if await self.load_binary():
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self.executor, generate_binary_token, self.binary_path
+                )
+            except Exception:
+                # a cancellation has to propagate, not fall back to the network
+                pass
+
+        return await self.fetch_backup_token()
+
+    async def fetch_backup_token(self) -> str:
+        for attempt in range(self.max_retries):
+            response = await self.chatgpt.session.get(BACKUP_ARKOSE_TOKEN_GENERATOR)
+            if response.text == "null":
+                raise BackendError(error_code=505)
+            try:
+                return response.json()["token"]
+            except Exception:
+                await asyncio.sleep(backoff_delay(attempt))
+
+        raise RetryError(website=BACKUP_ARKOSE_TOKEN_GENERATOR)
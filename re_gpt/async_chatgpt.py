@@ -1,29 +1,50 @@
 import asyncio
-import ctypes
+import collections
+import time
 import inspect
 import json
+import logging
 import uuid
-import re
-import websockets
-import base64
-from typing import AsyncGenerator, Callable, Optional
+from concurrent.futures import Executor
+from datetime import datetime, timedelta, timezone
+from typing import AsyncGenerator, Callable, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
 from curl_cffi.requests import AsyncSession
 from .errors import (
     BackendError,
+    IncompleteStreamError,
     InvalidSessionToken,
-    RetryError,
     TokenNotProvided,
     UnexpectedResponseError,
     InvalidModelName,
 )
-from .utils import async_get_binary_path, get_model_slug
+from . import json_backend
+from .arkose import AsyncArkoseTokenProvider
+from .auth_cache import AuthTokenCache
+from .batch import AsyncChatBatch
+from .bulk import AsyncBulkOperation
+from .capture import ResponseCapture
+from .chat_cache import ConversationCache
+from .chat_list import ChatSummary, is_last_page
+from .instrumentation import NULL_TRACE, Instrumentation
+from .limiter import AsyncAdaptiveLimiter
+from .response_cache import DiskResponseCache, MemoryResponseCache, response_cache_key
+from .retry import RetryPolicy
+from .search import ConversationIndex, message_text
+from .token_pool import AsyncTokenPool
+from .websocket import AsyncWebSocketManager, extract_access_token
+from .sse import SSEDecoder
+from .tree import ConversationTree
+from .utils import get_jwt_expiry, parse_retry_after
+
+logger = logging.getLogger(__name__)
 
 # Constants
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36"
-CHATGPT_API = "https://chat.openai.com/backend-api/{}"
-BACKUP_ARKOSE_TOKEN_GENERATOR = "https://arkose-token-generator.zaieem.repl.co/token"
-WS_REGISTER_URL = CHATGPT_API.format("register-websocket")
+BASE_URL = "https://chat.openai.com"
+CHATGPT_API = BASE_URL + "/backend-api/{}"
+SENTINEL_REJECTED_STATUS_CODES = (401, 403)
 
 MODELS = {
     "gpt-4": {"slug": "gpt-4", "needs_arkose_token": True},
@@ -37,13 +58,16 @@ class AsyncConversation:
         self.conversation_id = conversation_id
         self.parent_id = None
         self.model = model
+        self.tree = None
+        # the lifecycle events of the running chat() turn
+        self.trace = NULL_TRACE
 
     async def fetch_chat(self) -> dict:
         """
         Fetches the chat of the conversation from the API.
 
         Returns:
-            dict: The JSON response from the API containing the chat if the conversation_id is not none, else returns an empty dict.
+            dict: The JSON response from the API containing the chat if the conversation_id is not none, else returns an empty dict. Chats served from the cache are decoded again, so the dict is the caller's to change.
 
         Raises:
             UnexpectedResponseError: If the response is not a valid JSON object or if the response json is not in the expected format
@@ -51,16 +75,28 @@ class AsyncConversation:
         if not self.conversation_id:
             return {}
 
-        url = CHATGPT_API.format(f"conversation/{self.conversation_id}")
-        response = await self.chatgpt.session.get(
-            url=url, headers=self.chatgpt.build_request_headers()
-        )
+        url = self.chatgpt.api_url(f"conversation/{self.conversation_id}")
+        headers = await self.chatgpt.request_headers()
+
+        cache = self.chatgpt.conversation_cache
+        cached = cache.get(self.conversation_id) if cache is not None else None
+        if cached is not None and cached.body is not None:
+            if cache.is_fresh(cached):
+                cache.record_hit(cached)
+                return self.use_cached_chat(cached)
+            headers.update(cache.validation_headers(cached))
+
+        response = await self.chatgpt.session.get(url=url, headers=headers)
+        if cached is not None and response.status_code == 304:
+            cache.record_hit(cached, revalidated=True)
+            return self.use_cached_chat(cached)
 
         error = None
         try:
-            chat = response.json()
-            self.parent_id = list(chat.get("mapping", {}))[-1]
-            model_slug = get_model_slug(chat)
+            chat = json_backend.loads(response.content)
+            self.tree = ConversationTree(chat)
+            self.parent_id = self.tree.active_leaf()
+            model_slug = self.tree.model_slug()
             self.model = [
                 key for key, value in MODELS.items() if value["slug"] == model_slug
             ][0]
@@ -69,8 +105,85 @@ class AsyncConversation:
         if error is not None:
             raise UnexpectedResponseError(error, response.text)
 
+        if self.chatgpt.search_index is not None:
+            try:
+                await asyncio.to_thread(
+                    self.chatgpt.search_index.index_chat, self.conversation_id, chat
+                )
+            except Exception:
+                logger.exception("Indexing conversation %s failed", self.conversation_id)
+
+        if cache is not None:
+            cache.record_miss()
+            cache.store(
+                self.conversation_id,
+                response.content,
+                self.tree,
+                self.model,
+                response.headers,
+            )
+
         return chat
 
+    async def index_turn(self, user_message: Optional[dict], full_message: dict) -> None:
+        """
+        Add a finished turn to the client's search index, in a worker thread.
+        Indexing is a side effect, its errors are logged and don't fail the turn.
+
+        Args:
+            user_message (Optional[dict]): The user message of the turn, None if it's indexed already.
+            full_message (dict): The last event of the assistant message.
+        """
+        messages = []
+        if user_message is not None:
+            messages.append((user_message["id"], "user", message_text(user_message)))
+        message = full_message["message"]
+        messages.append((message["id"], message["author"]["role"], message_text(message)))
+        try:
+            await asyncio.to_thread(
+                self.chatgpt.search_index.add_messages, self.conversation_id, messages
+            )
+        except Exception:
+            logger.exception("Indexing a turn of conversation %s failed", self.conversation_id)
+
+    def use_cached_chat(self, cached) -> dict:
+        self.tree = cached.tree
+        self.parent_id = cached.parent_id
+        self.model = cached.model
+        # a copy of its own, the caller may change it
+        return json_backend.loads(cached.body)
+
+    def restore_from_cache(self) -> bool:
+        """
+        Take parent_id and model of the conversation from the client's
+        conversation cache, without fetching the chat.
+
+        Returns:
+            bool: True if the cache knew the conversation and is still within its TTL.
+        """
+        cache = self.chatgpt.conversation_cache
+        cached = cache.get(self.conversation_id) if cache is not None else None
+        if cached is None or not cache.is_state_fresh(cached):
+            # another client may have continued the conversation since
+            return False
+
+        cache.record_hit(cached)
+        self.parent_id = cached.parent_id
+        self.model = cached.model
+        return True
+
+    async def load_state(self) -> None:
+        """
+        Make sure parent_id and model of an existing conversation are known,
+        from the conversation cache while it's fresh, fetching (or
+        revalidating) the chat otherwise.
+        """
+        if self.conversation_id and (self.parent_id is None or self.model is None):
+            if not self.restore_from_cache():
+                # it will automatically fetch the chat and set the parent id
+                with self.trace.phase("fetch_chat"):
+                    await self.fetch_chat()
+
     async def chat(self, user_input: str) -> AsyncGenerator[dict, None]:
         """
         As the name implies, chat with ChatGPT.
@@ -87,51 +200,172 @@ class AsyncConversation:
         Raises:
             UnexpectedResponseError: If the response is not a valid JSON object or if the response json is not in the expected format
         """
+        trace = self.trace = self.chatgpt.instrumentation.start_turn(
+            self, model=self.model, prompt_chars=len(user_input)
+        )
+        if self.chatgpt.response_cache is None:
+            responses = self.generate(user_input)
+        else:
+            responses = self.chat_cached(user_input)
 
-        payload = await self.build_message_payload(user_input)
+        if not trace.enabled:
+            async for response in responses:
+                yield response
+            return
 
-        server_response = (
-            ""  # To store what the server returned for debugging in case of an error
-        )
+        deltas = 0
+        chars = 0
+        status = "complete"
+        error = None
+        try:
+            async for response in responses:
+                if not deltas:
+                    trace.emit("first_delta")
+                deltas += 1
+                chars += len(response["content"])
+                yield response
+        except GeneratorExit:
+            status = "abandoned"
+            # so the phases still open end before the turn does
+            await responses.aclose()
+            raise
+        except BaseException as e:
+            status = "error"
+            error = repr(e)
+            raise
+        finally:
+            self.trace = NULL_TRACE
+            trace.emit("turn_end", status=status, deltas=deltas, chars=chars, error=error)
+
+    async def chat_cached(self, user_input: str) -> AsyncGenerator[dict, None]:
+        """
+        chat() through the client's response cache: a prompt sent before
+        with the same model at the same point of the conversation is
+        replayed from the cache, anything else is generated and recorded.
+        """
+        cache = self.chatgpt.response_cache
+        await self.load_state()
+
+        context = f"{self.conversation_id}:{self.parent_id}" if self.conversation_id else None
+        key = response_cache_key(self.model, user_input, context)
+        if cache.blocking:
+            recording = await asyncio.to_thread(cache.get, key)
+        else:
+            recording = cache.get(key)
+        if recording is not None:
+            self.trace.emit("cache_hit")
+            async for response in self.replay(recording, cache.replay_speed):
+                yield response
+            return
+
+        chunks = []
+        last_chunk_at = time.perf_counter()
+        async for response in self.generate(user_input):
+            now = time.perf_counter()
+            chunks.append([now - last_chunk_at, dict(response)])
+            last_chunk_at = now
+            yield response
+
+        # only complete responses are recorded, an abandoned chat() never gets here
+        recording = {
+            "chunks": chunks,
+            "conversation_id": self.conversation_id,
+            "parent_id": self.parent_id,
+        }
+        if cache.blocking:
+            await asyncio.to_thread(cache.put, key, recording)
+        else:
+            cache.put(key, recording)
+
+    async def replay(
+        self, recording: dict, replay_speed: Optional[float]
+    ) -> AsyncGenerator[dict, None]:
+        """
+        Yield the responses of a recording, continuing the conversation from
+        the recorded reply.
+
+        Args:
+            recording (dict): The recording, see MemoryResponseCache.put.
+            replay_speed (Optional[float]): Divides the recorded pauses, None replays at once.
+        """
+        for delay, response in recording["chunks"]:
+            if replay_speed:
+                await asyncio.sleep(delay / replay_speed)
+            yield dict(response)
+
+        self.conversation_id = recording["conversation_id"]
+        self.parent_id = recording["parent_id"]
+
+    async def generate(self, user_input: str) -> AsyncGenerator[dict, None]:
+        """
+        Send the message and stream the reply, see chat().
+        """
+        with self.trace.phase("build_payload", action="next"):
+            payload = await self.build_message_payload(user_input)
+        user_message = payload["messages"][0]
+
+        # To store what the server returned for debugging in case of an error
+        server_response = ResponseCapture(self.chatgpt.debug_capture_size)
         error = None
         try:
             full_message = None
+            attempt = 0
             while True:
-                response = self.send_message(payload=payload) if not self.chatgpt.websocket_mode else self.send_websocket_message(payload=payload)
-                async for chunk in response:
-                    decoded_chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
-                    
-                    server_response += decoded_chunk
-                    for line in decoded_chunk.splitlines():
-                        if not line.startswith("data: "):
-                            continue
-
-                        raw_json_data = line[6:]
-                        if not (decoded_json := self.decode_raw_json(raw_json_data)):
-                            continue
-
-                        if (
-                            "message" in decoded_json
-                            and decoded_json["message"]["author"]["role"] == "assistant"
-                        ):
-                            processed_response = self.filter_response(decoded_json)
-                            if full_message:
-                                prev_resp_len = len(
-                                    full_message["message"]["content"]["parts"][0]
-                                )
-                                processed_response["content"] = processed_response[
-                                    "content"
-                                ][prev_resp_len::]
-
+                received = False
+                try:
+                    with self.trace.phase("stream", attempt=attempt) as stream:
+                        response = self.open_stream(payload)
+                        decoder = SSEDecoder()
+                        received_bytes = 0
+                        chunks = 0
+                        async for chunk in response:
+                            if not received:
+                                self.trace.emit("first_byte", attempt=attempt)
+                                received = True
+                            received_bytes += len(chunk)
+                            chunks += 1
+                            server_response.append(chunk)
+                            processed_responses, full_message = self.handle_events(
+                                decoder.feed(chunk), full_message
+                            )
+                            for processed_response in processed_responses:
+                                yield processed_response
+
+                        processed_responses, full_message = self.handle_events(
+                            decoder.flush(), full_message
+                        )
+                        for processed_response in processed_responses:
                             yield processed_response
-                            full_message = decoded_json
+                        stream["bytes"] = received_bytes
+                        stream["chunks"] = chunks
+
+                    finish_details = self.get_finish_details(full_message)
+                except Exception as e:
+                    retry_action = self.plan_retry(e, attempt, full_message)
+                    if retry_action is None:
+                        raise
+                    await asyncio.sleep(self.chatgpt.retry_policy.error_delay(e, attempt))
+                    attempt += 1
+                    self.trace.emit("continuation", reason=repr(e), action=retry_action)
+                    with self.trace.phase("build_payload", action=retry_action):
+                        payload = await self.build_retry_payload(
+                            retry_action, payload, full_message
+                        )
+                    continue
+
                 self.conversation_id = full_message["conversation_id"]
                 self.parent_id = full_message["message"]["id"]
-                if (
-                    full_message["message"]["metadata"]["finish_details"]["type"]
-                    == "max_tokens"
-                ):
-                    payload = await self.build_message_continuation_payload()
+                if self.chatgpt.conversation_cache is not None:
+                    self.chatgpt.conversation_cache.advance(
+                        self.conversation_id, self.parent_id, self.model
+                    )
+                if self.chatgpt.search_index is not None:
+                    await self.index_turn(user_message, full_message)
+                    user_message = None
+                if finish_details["type"] == "max_tokens":
+                    self.trace.emit("continuation", reason="max_tokens", action="continue")
+                    with self.trace.phase("build_payload", action="continue"):
+                        payload = await self.build_message_continuation_payload()
                 else:
                     break
         except Exception as e:
@@ -139,7 +373,7 @@ class AsyncConversation:
 
         # raising the error outside the 'except' block to prevent the 'During handling of the above exception, another exception occurred' error
         if error is not None:
-            raise UnexpectedResponseError(error, server_response)
+            raise UnexpectedResponseError(error, server_response.excerpt())
 
     async def send_message(self, payload: dict) -> AsyncGenerator[bytes, None]:
         """
@@ -152,25 +386,37 @@ class AsyncConversation:
             bytes: Chunk of data received as a response.
         """
         response_queue = asyncio.Queue()
+        # the request task can outlive the turn, it keeps the turn's trace
+        trace = self.trace
 
         async def perform_request():
             def content_callback(chunk):
                 response_queue.put_nowait(chunk)
 
-            url = CHATGPT_API.format("conversation")
-            
-            headers = self.chatgpt.build_request_headers()
-            # Add Chat Requirements Token
-            chat_requriments_token = await self.chatgpt.create_chat_requirements_token()
-            if chat_requriments_token:
-                headers["openai-sentinel-chat-requirements-token"] = chat_requriments_token
-
-            await self.chatgpt.session.post(
-                url=url,
-                headers=headers,
-                json=payload,
-                content_callback=content_callback,
-            )
+            url = self.chatgpt.api_url("conversation")
+            try:
+                headers = await self.chatgpt.request_headers()
+                # Add Chat Requirements Token
+                with trace.phase("sentinel"):
+                    chat_requriments_token = await self.chatgpt.create_chat_requirements_token()
+                if chat_requriments_token:
+                    headers["openai-sentinel-chat-requirements-token"] = chat_requriments_token
+
+                with trace.phase("post", **self.request_fields(payload, "http")) as post:
+                    response = await self.chatgpt.limited_request(
+                        "conversation",
+                        "post",
+                        url=url,
+                        headers=headers,
+                        json=payload,
+                        content_callback=content_callback,
+                    )
+                    post["status"] = response.status_code
+                self.chatgpt.check_response_status(response)
+            except Exception as e:
+                # handed over to the consumer, an exception in this task would be lost
+                await response_queue.put(e)
+                return
             await response_queue.put(None)
 
         asyncio.create_task(perform_request())
@@ -179,6 +425,8 @@ class AsyncConversation:
             chunk = await response_queue.get()
             if chunk is None:
                 break
+            if isinstance(chunk, Exception):
+                raise chunk
             yield chunk
     
     async def send_websocket_message(self, payload: dict) -> AsyncGenerator[str, None]:
@@ -191,45 +439,74 @@ class AsyncConversation:
         Yields:
             str: Chunk of data received as a response.
         """
-        await self.chatgpt.ensure_websocket()
-
-        response_queue = asyncio.Queue()
-        websocket_request_id = None
+        websocket = self.chatgpt.websocket
+        websocket_request_id = payload["websocket_request_id"]
+        # routed before sending, the first messages can arrive before the POST returns
+        response_queue = websocket.open_route(websocket_request_id)
+        # the request task can outlive the turn, it keeps the turn's trace
+        trace = self.trace
 
         async def perform_request():
-            nonlocal websocket_request_id
-            
-            url = CHATGPT_API.format("conversation")
-            headers = self.chatgpt.build_request_headers()
-            # Add Chat Requirements Token
-            chat_requriments_token = await self.chatgpt.create_chat_requirements_token()
-            if chat_requriments_token:
-                headers["openai-sentinel-chat-requirements-token"] = chat_requriments_token
-
-            response = (await self.chatgpt.session.post(
-                url=url,
-                headers=headers,
-                json=payload,
-            )).json()
-
-            websocket_request_id = response.get("websocket_request_id")
-            
-            if websocket_request_id is None:
-                raise UnexpectedResponseError("WebSocket request ID not found in response", response)
-            
-            if websocket_request_id not in self.chatgpt.ws_conversation_map:
-                self.chatgpt.ws_conversation_map[websocket_request_id] = response_queue
-            
+            url = self.chatgpt.api_url("conversation")
+            try:
+                headers = await self.chatgpt.request_headers()
+                # Add Chat Requirements Token
+                with trace.phase("sentinel"):
+                    chat_requriments_token = await self.chatgpt.create_chat_requirements_token()
+                if chat_requriments_token:
+                    headers["openai-sentinel-chat-requirements-token"] = chat_requriments_token
+
+                with trace.phase("post", **self.request_fields(payload, "websocket")) as post:
+                    response = await self.chatgpt.limited_request(
+                        "conversation",
+                        "post",
+                        url=url,
+                        headers=headers,
+                        json=payload,
+                    )
+                    post["status"] = response.status_code
+                self.chatgpt.check_response_status(response)
+                response = response.json()
+
+                if response.get("websocket_request_id") is None:
+                    raise UnexpectedResponseError("WebSocket request ID not found in response", response)
+            except Exception as e:
+                websocket.fail_route(websocket_request_id, e)
+
         asyncio.create_task(perform_request())
 
-        while True:
-            chunk = await response_queue.get()
-            if chunk is None:
-                break
-            yield chunk
+        try:
+            while True:
+                chunk = await response_queue.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            websocket.close_route(websocket_request_id)
 
-        del self.chatgpt.ws_conversation_map[websocket_request_id]
-    
+    def request_fields(self, payload: dict, transport: str) -> dict:
+        # the size of the body is only worth encoding it twice for a listener
+        if not self.trace.enabled:
+            return {}
+        return {"transport": transport, "request_bytes": len(json.dumps(payload))}
+
+    def open_stream(self, payload: dict):
+        """
+        Send a payload over the websocket while it's connected, over HTTP otherwise.
+
+        Args:
+            payload (dict): Payload containing message information.
+
+        Returns:
+            The generator of the response chunks.
+        """
+        if payload.get("websocket_request_id"):
+            if self.chatgpt.websocket_mode and self.chatgpt.websocket.is_connected():
+                return self.send_websocket_message(payload=payload)
+            payload = {**payload, "websocket_request_id": None}
+        return self.send_message(payload=payload)
 
     async def build_message_payload(self, user_input: str) -> dict:
         """
@@ -238,8 +515,8 @@ class AsyncConversation:
         Returns:
             dict: Payload containing message information.
         """
-        if self.conversation_id and (self.parent_id is None or self.model is None):
-            await self.fetch_chat()  # it will automatically fetch the chat and set the parent id
+        self.chatgpt.start_background_setup()
+        await self.load_state()
 
         payload = {
             "conversation_mode": {"conversation_mode": {"kind": "primary_assistant"}},
@@ -294,39 +571,76 @@ class AsyncConversation:
 
         return payload
 
-    async def arkose_token_generator(self) -> str:
+    @staticmethod
+    def get_finish_details(full_message: Optional[dict]) -> dict:
         """
-        Generate an Arkose token.
+        Get the finish details of the last assistant message of a stream.
 
-        Returns:
-            str: Arkose token.
+        Raises:
+            IncompleteStreamError: If the stream ended before the message was finished.
         """
-        if not self.chatgpt.tried_downloading_binary:
-            self.chatgpt.binary_path = await async_get_binary_path(self.chatgpt.session)
+        if full_message is None:
+            raise IncompleteStreamError
+        finish_details = full_message["message"]["metadata"].get("finish_details")
+        if not finish_details:
+            raise IncompleteStreamError
+        return finish_details
+
+    def plan_retry(
+        self,
+        error: Exception,
+        attempt: int,
+        full_message: Optional[dict],
+    ) -> Optional[str]:
+        """
+        Decide how a failed message request can be retried.
 
-            if self.chatgpt.binary_path:
-                self.chatgpt.arkose = ctypes.CDLL(self.chatgpt.binary_path)
-                self.chatgpt.arkose.GetToken.restype = ctypes.c_char_p
+        Args:
+            error (Exception): The error of the failed attempt.
+            attempt (int): Number of the failed attempt, starting at 0.
+            full_message (Optional[dict]): The last assistant message seen.
 
-            self.chatgpt.tried_downloading_binary = True
+        Returns:
+            Optional[str]: "continue" to resume the known assistant message, "resend" to send
+            the same payload again, None if the error should be raised.
+        """
+        if not self.chatgpt.retry_policy.should_retry(error, attempt):
+            return None
+        if full_message is not None:
+            return "continue"
+        if isinstance(error, BackendError):
+            # the server turned the request down, nothing was created yet. Over
+            # HTTP the error body has already been streamed in, but it carries
+            # no events, so it doesn't count as a started reply
+            return "resend"
+        return None
+
+    async def build_retry_payload(
+        self, retry_action: str, payload: dict, full_message: Optional[dict]
+    ) -> dict:
+        """
+        Build the payload of the next attempt, see plan_retry.
+        """
+        if retry_action == "continue":
+            # the continuation carries the whole message again, handle_events
+            # slices off what was already yielded
+            self.conversation_id = full_message["conversation_id"]
+            self.parent_id = full_message["message"]["id"]
+            return await self.build_message_continuation_payload()
+
+        if payload["arkose_token"]:
+            payload["arkose_token"] = await self.arkose_token_generator()
+        return payload
 
-        if self.chatgpt.binary_path:
-            try:
-                result = self.chatgpt.arkose.GetToken()
-                return ctypes.string_at(result).decode("utf-8")
-            except:
-                pass
-
-        for _ in range(5):
-            response = await self.chatgpt.session.get(BACKUP_ARKOSE_TOKEN_GENERATOR)
-            if response.text == "null":
-                raise BackendError(error_code=505)
-            try:
-                return response.json()["token"]
-            except:
-                await asyncio.sleep(0.7)
+    async def arkose_token_generator(self) -> str:
+        """
+        Generate an Arkose token.
 
-        raise RetryError(website=BACKUP_ARKOSE_TOKEN_GENERATOR)
+        Returns:
+            str: Arkose token.
+        """
+        with self.trace.phase("arkose"):
+            return await self.chatgpt.arkose_provider.get()
 
     async def delete(self) -> None:
         """
@@ -338,20 +652,67 @@ class AsyncConversation:
             self.conversation_id = None
             self.parent_id = None
 
+    def handle_events(
+        self, events: List[str], full_message: Optional[dict]
+    ) -> Tuple[List[dict], Optional[dict]]:
+        """
+        Turn the data of complete SSE events into assistant responses.
+
+        Args:
+            events (List[str]): Data of the events, as returned by SSEDecoder.
+            full_message (Optional[dict]): The last assistant message seen in this stream.
+
+        Returns:
+            Tuple[List[dict], Optional[dict]]: The responses to yield and the new last assistant message.
+        """
+        processed_responses = []
+        if self.chatgpt.latest_wins:
+            # every assistant event carries the whole message so far, so only the newest one needs decoding
+            events = reversed(events)
+
+        for raw_json_data in events:
+            if not (
+                decoded_json := self.decode_raw_json(
+                    raw_json_data, self.chatgpt.typed_decoding
+                )
+            ):
+                continue
+
+            if (
+                "message" in decoded_json
+                and decoded_json["message"]["author"]["role"] == "assistant"
+            ):
+                processed_response = self.filter_response(decoded_json)
+                if full_message:
+                    prev_resp_len = len(full_message["message"]["content"]["parts"][0])
+                    processed_response["content"] = processed_response["content"][
+                        prev_resp_len::
+                    ]
+
+                processed_responses.append(processed_response)
+                full_message = decoded_json
+
+                if self.chatgpt.latest_wins:
+                    break
+
+        return processed_responses, full_message
+
     @staticmethod
-    def decode_raw_json(raw_json_data: str) -> dict or bool:
+    def decode_raw_json(raw_json_data: str, typed: bool = False) -> dict or bool:
         """
         Decode JSON.
 
         Args:
             raw_json_data (str): JSON as a string.
+            typed (bool): Only extract the fields chat() needs instead of decoding the whole event. Defaults to False.
 
         Returns:
             dict: Decoded JSON.
         """
         try:
-            decoded_json = json.loads(raw_json_data.strip())
-            return decoded_json
+            if typed:
+                return json_backend.decode_event(raw_json_data)
+            return json_backend.loads(raw_json_data)
         except:
             return False
 
@@ -376,6 +737,30 @@ class AsyncChatGPT:
         auth_token: Optional[str] = None,
         generate_arkose_token: Optional[bool] = False,
         websocket_mode: Optional[bool] = False,
+        latest_wins: Optional[bool] = False,
+        typed_decoding: Optional[bool] = False,
+        debug_capture_size: Optional[int] = 64 * 1024,
+        sentinel_token_ttl: Optional[float] = 60,
+        sentinel_token_pool_size: Optional[int] = 0,
+        sentinel_token_max_uses: Optional[int] = 1,
+        arkose_pool_size: Optional[int] = 0,
+        arkose_token_ttl: Optional[float] = 120,
+        arkose_executor: Optional[Executor] = None,
+        auth_token_cache_dir: Optional[str] = None,
+        auth_token_refresh_margin: Optional[float] = 300,
+        arkose_binary_offline: Optional[bool] = False,
+        max_concurrency: Optional[int] = 64,
+        retry_policy: Optional[RetryPolicy] = None,
+        websocket_heartbeat: Optional[float] = 20,
+        websocket_max_reconnects: Optional[int] = 5,
+        websocket_queue_size: Optional[int] = 256,
+        lazy_startup: Optional[bool] = False,
+        conversation_cache_size: Optional[int] = 32 * 1024 * 1024,
+        conversation_cache_ttl: Optional[float] = 300,
+        search_index: Optional[ConversationIndex] = None,
+        response_cache: Optional[Union[MemoryResponseCache, DiskResponseCache]] = None,
+        base_url: Optional[str] = BASE_URL,
+        instrumentation_hooks: Optional[List[Callable[[dict], None]]] = None,
     ):
         """
         Initializes an instance of the class.
@@ -387,48 +772,156 @@ class AsyncChatGPT:
             auth_token (Optional[str]): An authentication token. Defaults to None.
             generate_arkose_token (Optional[bool]): Toggle whether to generate and send arkose-token in the payload. Defaults to False.
             websocket_mode (Optional[bool]): Toggle whether to use WebSocket for chat. Defaults to False.
+            latest_wins (Optional[bool]): Only decode the newest assistant event of every received chunk, yielding one delta per chunk. Defaults to False.
+            typed_decoding (Optional[bool]): Only extract the fields chat() reads from each event instead of decoding all of it (needs msgspec). Faster when events carry metadata chat() ignores, like web search citations, see json_backend.decode_event. Defaults to False.
+            debug_capture_size (Optional[int]): How many characters of a chat stream to keep for UnexpectedResponseError, 0 disables it. Defaults to 64 KB.
+            sentinel_token_ttl (Optional[float]): Seconds a chat requirements token is reused/kept ready for. Defaults to 60.
+            sentinel_token_pool_size (Optional[int]): How many chat requirements tokens to prefetch, 0 fetches one per message. Prefetched tokens that expire unused still cost a request. Defaults to 0.
+            sentinel_token_max_uses (Optional[int]): How many messages may share one chat requirements token. Defaults to 1.
+            arkose_pool_size (Optional[int]): How many Arkose tokens to keep ready, 0 generates one per message. Prefetched tokens that expire unused still cost a generator call. Defaults to 0.
+            arkose_token_ttl (Optional[float]): Seconds after which an unused Arkose token is thrown away. Defaults to 120.
+            arkose_executor (Optional[Executor]): Thread or process pool generating Arkose tokens. Defaults to the loop's default executor.
+            auth_token_cache_dir (Optional[str]): Directory of an on-disk access token cache shared between processes. Defaults to None (no cache).
+            auth_token_refresh_margin (Optional[float]): Seconds before expiry at which the access token is refreshed in the background. Defaults to 300.
+            arkose_binary_offline (Optional[bool]): Use the local funcaptcha binary without checking GitHub for updates. Defaults to False.
+            max_concurrency (Optional[int]): Upper bound of the adaptive (AIMD) in-flight limit of each endpoint, None disables the limiter. Defaults to 64.
+            retry_policy (Optional[RetryPolicy]): Retries of messages and of the sentinel/auth requests. Defaults to RetryPolicy().
+            websocket_heartbeat (Optional[float]): Seconds between websocket pings, and how long a pong may take. Defaults to 20.
+            websocket_max_reconnects (Optional[int]): Websocket reconnect attempts in a row before chats fall back to HTTP. Defaults to 5.
+            websocket_queue_size (Optional[int]): Websocket messages buffered per request, older ones are dropped once it's full. Defaults to 256.
+            lazy_startup (Optional[bool]): Only open the session on enter, the access token, websocket and funcaptcha binary are set up on first use (see warmup()). Defaults to False.
+            conversation_cache_size (Optional[int]): Bytes of fetched conversations to keep, 0 disables the conversation cache. Defaults to 32 MB.
+            conversation_cache_ttl (Optional[float]): Seconds a cached conversation is used without revalidating it. Defaults to 300.
+            search_index (Optional[ConversationIndex]): Index that every fetched chat and every finished turn is added to. Defaults to None.
+            response_cache (Optional[Union[MemoryResponseCache, DiskResponseCache]]): Cache that replays chat() responses to repeated prompts instead of generating them again. Defaults to None.
+            base_url (Optional[str]): Origin of the backend, e.g. "http://127.0.0.1:8800" for re_gpt.mock_server. Defaults to "https://chat.openai.com".
+            instrumentation_hooks (Optional[List[Callable[[dict], None]]]): Called with the lifecycle events of every chat() turn, see re_gpt.instrumentation. Defaults to None.
         """
         self.proxies = proxies
         self.exit_callback_function = exit_callback_function
 
-        self.arkose = None
-        self.binary_path = None
-        self.tried_downloading_binary = False
         self.generate_arkose_token = generate_arkose_token
+        self.arkose_provider = AsyncArkoseTokenProvider(
+            self,
+            pool_size=arkose_pool_size,
+            token_ttl=arkose_token_ttl,
+            executor=arkose_executor,
+            offline=arkose_binary_offline,
+        )
 
         self.session_token = session_token
         self.auth_token = auth_token
         self.session = None
-        
+
+        self.auth_token_cache = (
+            AuthTokenCache(auth_token_cache_dir, auth_token_refresh_margin)
+            if auth_token_cache_dir
+            else None
+        )
+        self.auth_token_refresh_margin = auth_token_refresh_margin
+        self.auth_token_refresh_at = None
+        self.auth_token_refresh_task = None
+        self.auth_token_task = None
+
+        self.lazy_startup = lazy_startup
         self.websocket_mode = websocket_mode
-        self.ws_loop = None
-        self.ws_conversation_map = {}
+        self.websocket_setup_task = None
+        self.websocket = AsyncWebSocketManager(
+            self,
+            heartbeat=websocket_heartbeat,
+            max_reconnects=websocket_max_reconnects,
+            queue_size=websocket_queue_size,
+        )
+
+        self.max_concurrency = max_concurrency
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.limiters = {}
+
+        self.conversation_cache = (
+            ConversationCache(conversation_cache_size, conversation_cache_ttl)
+            if conversation_cache_size
+            else None
+        )
+        self.search_index = search_index
+        self.response_cache = response_cache
+        self.base_url = base_url.rstrip("/")
+        self.host = urlsplit(self.base_url).netloc
+        self.instrumentation = Instrumentation(instrumentation_hooks)
+
+        self.latest_wins = latest_wins
+        self.typed_decoding = typed_decoding
+        self.debug_capture_size = debug_capture_size
+
+        self.chat_requirements_cache = AsyncTokenPool(
+            self.fetch_chat_requirements_token,
+            ttl=sentinel_token_ttl,
+            pool_size=sentinel_token_pool_size,
+            max_uses=sentinel_token_max_uses,
+        )
 
     async def __aenter__(self):
         self.session = AsyncSession(
             impersonate="chrome110", timeout=99999, proxies=self.proxies
         )
+        if not self.auth_token and self.session_token is None:
+            raise TokenNotProvided
+
+        if not self.lazy_startup:
+            await self.warmup()
+
+        return self
+
+    async def warmup(self) -> None:
+        """
+        Do every startup step now instead of on first use: get the access token,
+        then prefetch a chat requirements token and set up the websocket, while
+        the funcaptcha binary is resolved and Arkose tokens are prefetched
+        alongside. Called on enter unless lazy_startup is set.
+        """
+        await asyncio.gather(self.warmup_arkose(), self.warmup_session())
+
+    async def warmup_arkose(self) -> None:
         if self.generate_arkose_token:
-            self.binary_path = await async_get_binary_path(self.session)
+            await self.arkose_provider.load_binary()
+            self.arkose_provider.prefetch()
 
-            if self.binary_path:
-                self.arkose = ctypes.CDLL(self.binary_path)
-                self.arkose.GetToken.restype = ctypes.c_char_p
+    async def warmup_session(self) -> None:
+        await self.ensure_auth_token()
+        self.chat_requirements_cache.prefetch()
+        await self.start_websocket_setup()
 
-            self.tried_downloading_binary = True
+    def start_background_setup(self) -> None:
+        """
+        Start what sending a message needs (access token, chat requirements
+        token, websocket) without waiting for it, so with lazy_startup the
+        first message runs those steps concurrently.
+        """
+        self.start_auth_token()
+        self.chat_requirements_cache.prefetch()
+        self.start_websocket_setup()
 
-        if not self.auth_token:
-            if self.session_token is None:
-                raise TokenNotProvided
-            self.auth_token = await self.fetch_auth_token()
+    def start_websocket_setup(self) -> asyncio.Task:
+        """
+        Check whether the account has websockets and connect one in the
+        background, once. Chats go over HTTP until it's connected.
 
-        if not self.websocket_mode:
-           self.websocket_mode = await self.check_websocket_availability()
+        Returns:
+            asyncio.Task: The setup task.
+        """
+        if self.websocket_setup_task is None:
+            self.websocket_setup_task = asyncio.create_task(self.setup_websocket())
+        return self.websocket_setup_task
 
-        if self.websocket_mode:
-            await self.ensure_websocket()
+    async def setup_websocket(self) -> None:
+        try:
+            if not self.websocket_mode:
+                self.websocket_mode = await self.check_websocket_availability()
 
-        return self
+            if self.websocket_mode:
+                await self.ensure_websocket()
+        except Exception:
+            # chats go over HTTP until the websocket is back
+            pass
 
     async def __aexit__(self, *_):
         try:
@@ -436,7 +929,156 @@ class AsyncChatGPT:
                 if not inspect.iscoroutinefunction(self.exit_callback_function):
                     self.exit_callback_function(self)
         finally:
-            await self.session.close()
+            self.chat_requirements_cache.close()
+            self.arkose_provider.close()
+            if self.websocket_setup_task is not None:
+                self.websocket_setup_task.cancel()
+            await self.websocket.close()
+            await self.close_session()
+
+    async def close_session(self) -> None:
+        # AsyncSession.close() is only a coroutine in newer curl_cffi releases
+        closing = self.session.close()
+        if inspect.isawaitable(closing):
+            await closing
+
+    def create_limiter(self) -> AsyncAdaptiveLimiter:
+        # starts at the bound, a slot is held until the whole reply was streamed
+        return AsyncAdaptiveLimiter(self.max_concurrency)
+
+    def get_limiter(self, endpoint: str) -> Optional[AsyncAdaptiveLimiter]:
+        """
+        Get the adaptive concurrency limiter of an endpoint.
+
+        Args:
+            endpoint (str): Name of the endpoint, e.g. "conversation", "sentinel" or "auth".
+
+        Returns:
+            Optional[AsyncAdaptiveLimiter]: The limiter, None if limiting is disabled.
+        """
+        if not self.max_concurrency:
+            return None
+
+        limiter = self.limiters.get(endpoint)
+        if limiter is None:
+            limiter = self.limiters[endpoint] = self.create_limiter()
+        return limiter
+
+    def limiter_stats(self) -> dict:
+        """
+        Report the current limit, in-flight requests and queue depth of every endpoint.
+
+        Returns:
+            dict: Stats of every endpoint's limiter.
+        """
+        return {endpoint: limiter.stats() for endpoint, limiter in self.limiters.items()}
+
+    def conversation_cache_stats(self) -> Optional[dict]:
+        """
+        Report the hits, revalidations and bytes saved by the conversation cache.
+
+        Returns:
+            Optional[dict]: Stats of the conversation cache, None if it's disabled.
+        """
+        if self.conversation_cache is None:
+            return None
+        return self.conversation_cache.stats()
+
+    async def limited_request(self, endpoint: str, method: str, **kwargs):
+        """
+        Send a request through the endpoint's limiter, waiting for a free slot
+        and feeding the status code (and Retry-After) back into it.
+
+        Args:
+            endpoint (str): Name of the endpoint.
+            method (str): HTTP method of the session, e.g. "get" or "post".
+            **kwargs: Arguments of the request.
+
+        Returns:
+            The server response.
+        """
+        limiter = self.get_limiter(endpoint)
+        if limiter is None:
+            return await getattr(self.session, method)(**kwargs)
+
+        await limiter.acquire()
+        response = None
+        try:
+            response = await getattr(self.session, method)(**kwargs)
+        finally:
+            limiter.release(response)
+        return response
+
+    async def retry_request(self, endpoint: str, method: str, **kwargs):
+        """
+        Send an idempotent request through limited_request, retrying network
+        errors and retryable status codes as the retry policy says.
+
+        Args:
+            endpoint (str): Name of the endpoint.
+            method (str): HTTP method of the session, e.g. "get" or "post".
+            **kwargs: Arguments of the request.
+
+        Returns:
+            The server response, the last one if every attempt failed.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = await self.limited_request(endpoint, method, **kwargs)
+            except Exception as e:
+                if not self.retry_policy.should_retry(e, attempt):
+                    raise
+                delay = self.retry_policy.error_delay(e, attempt)
+            else:
+                if (
+                    response.status_code not in self.retry_policy.retry_status_codes
+                    or attempt >= self.retry_policy.max_retries
+                ):
+                    return response
+                delay = self.retry_policy.response_delay(response, attempt)
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def check_response_status(self, response) -> None:
+        """
+        Check the status of a conversation request.
+
+        Args:
+            response: The server response.
+
+        Raises:
+            BackendError: If the server answered with an error status.
+        """
+        if response.status_code in SENTINEL_REJECTED_STATUS_CODES:
+            self.chat_requirements_cache.invalidate()
+        if response.status_code >= 400:
+            raise BackendError(
+                error_code=response.status_code,
+                retry_after=parse_retry_after(response.headers.get("retry-after")),
+            )
+
+    async def request_headers(self) -> dict:
+        """
+        Build headers for HTTP requests, getting the access token first if it
+        isn't there yet.
+
+        Returns:
+            dict: Request headers.
+        """
+        await self.ensure_auth_token()
+        return self.build_request_headers()
+
+    def api_url(self, path: str) -> str:
+        """
+        Args:
+            path (str): Path of the endpoint under backend-api, e.g. "conversations".
+
+        Returns:
+            str: URL of the endpoint on the client's backend.
+        """
+        return f"{self.base_url}/backend-api/{path}"
 
     def build_request_headers(self) -> dict:
         """
@@ -445,6 +1087,12 @@ class AsyncChatGPT:
         Returns:
             dict: Request headers.
         """
+        if (
+            self.auth_token_refresh_at is not None
+            and time.time() >= self.auth_token_refresh_at
+        ):
+            self.schedule_auth_token_refresh()
+
         headers = {
             "User-Agent": USER_AGENT,
             "Accept": "text/event-stream",
@@ -452,8 +1100,8 @@ class AsyncChatGPT:
             "Accept-Encoding": "gzip, deflate, br",
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.auth_token}",
-            "Origin": "https://chat.openai.com",
-            "Alt-Used": "chat.openai.com",
+            "Origin": self.base_url,
+            "Alt-Used": self.host,
             "Connection": "keep-alive",
         }
 
@@ -479,6 +1127,29 @@ class AsyncChatGPT:
             raise InvalidModelName(model, MODELS)
         return AsyncConversation(self, model=model)
 
+    def chat_many(
+        self,
+        prompts: Iterable[str],
+        concurrency: Optional[int] = 4,
+        model: Optional[str] = "gpt-3.5",
+        ordered: Optional[bool] = False,
+    ) -> AsyncChatBatch:
+        """
+        Chat with many prompts concurrently, each one in a new conversation.
+
+        Args:
+            prompts (Iterable[str]): The prompts.
+            concurrency (Optional[int]): How many prompts run at the same time. Defaults to 4.
+            model (Optional[str]): Model of the conversations. Defaults to "gpt-3.5".
+            ordered (Optional[bool]): Yield results in input order instead of completion order. Defaults to False.
+
+        Returns:
+            AsyncChatBatch: Use `async for result in batch` to get a dict per prompt (index, prompt, content, conversation_id, message_id, error, latency). `batch.stats` holds prompts/sec and p50/p95 latency once it's done.
+        """
+        if model not in MODELS:
+            raise InvalidModelName(model, MODELS)
+        return AsyncChatBatch(self, prompts, concurrency, model, ordered)
+
     async def delete_conversation(self, conversation_id: str) -> dict:
         """
         Delete a conversation.
@@ -489,12 +1160,200 @@ class AsyncChatGPT:
         Returns:
             dict: Server response json.
         """
-        url = CHATGPT_API.format(f"conversation/{conversation_id}")
-        response = await self.session.patch(
-            url=url, headers=self.build_request_headers(), json={"is_visible": False}
+        response = await self.send_delete_request(conversation_id)
+        return response.json()
+
+    async def send_delete_request(self, conversation_id: str):
+        response = await self.retry_request(
+            "delete",
+            "patch",
+            url=self.api_url(f"conversation/{conversation_id}"),
+            headers=await self.request_headers(),
+            json={"is_visible": False},
         )
+        if self.conversation_cache is not None:
+            self.conversation_cache.invalidate(conversation_id)
+        if self.search_index is not None and response.status_code < 400:
+            try:
+                await asyncio.to_thread(self.search_index.remove, conversation_id)
+            except Exception:
+                logger.exception("Removing conversation %s from the index failed", conversation_id)
+        return response
+
+    async def delete_conversation_checked(self, conversation_id: str) -> None:
+        response = await self.send_delete_request(conversation_id)
+        if response.status_code >= 400:
+            raise BackendError(
+                error_code=response.status_code,
+                retry_after=parse_retry_after(response.headers.get("retry-after")),
+            )
 
-        return response.json()
+    async def delete_conversations(
+        self,
+        conversation_ids: Iterable[str],
+        concurrency: Optional[int] = 8,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """
+        Delete many conversations, at most `concurrency` at a time and through
+        the client's limiter. A failed deletion doesn't stop the others.
+
+        Args:
+            conversation_ids (Iterable[str]): IDs of the conversations.
+            concurrency (Optional[int]): How many deletions run at the same time. Defaults to 8.
+            progress_callback (Optional[Callable[[dict], None]]): Called after every conversation with {"conversation_id", "error", "done", "failed"}.
+
+        Returns:
+            dict: Summary with the "succeeded" IDs, the "failed" IDs mapped to their error, and "elapsed" seconds.
+        """
+        operation = AsyncBulkOperation(
+            self.delete_conversation_checked, concurrency, progress_callback
+        )
+        return await operation.run(conversation_ids)
+
+    async def hide_conversations(
+        self,
+        predicate: Callable[[ChatSummary], bool],
+        concurrency: Optional[int] = 8,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """
+        Delete (hide) every conversation of the account the predicate selects.
+        The whole list is read before the first deletion, deleting while
+        paging would shift the pages.
+
+        Args:
+            predicate (Callable[[ChatSummary], bool]): Returns True for the conversations to delete.
+            concurrency (Optional[int]): How many deletions run at the same time. Defaults to 8.
+            progress_callback (Optional[Callable[[dict], None]]): Called after every conversation with {"conversation_id", "error", "done", "failed"}.
+
+        Returns:
+            dict: Summary with the "succeeded" IDs, the "failed" IDs mapped to their error, and "elapsed" seconds.
+        """
+        conversation_ids = [
+            summary.id async for summary in self.iter_chats() if predicate(summary)
+        ]
+        return await self.delete_conversations(
+            conversation_ids, concurrency, progress_callback
+        )
+
+    async def delete_conversations_older_than(
+        self,
+        older_than: Union[datetime, timedelta],
+        concurrency: Optional[int] = 8,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """
+        Delete every conversation not updated since a point in time.
+
+        Args:
+            older_than (Union[datetime, timedelta]): The point in time, or the age of the conversations (a naive datetime is taken as UTC).
+            concurrency (Optional[int]): How many deletions run at the same time. Defaults to 8.
+            progress_callback (Optional[Callable[[dict], None]]): Called after every conversation with {"conversation_id", "error", "done", "failed"}.
+
+        Returns:
+            dict: Summary with the "succeeded" IDs, the "failed" IDs mapped to their error, and "elapsed" seconds.
+        """
+        if isinstance(older_than, timedelta):
+            cutoff = time.time() - older_than.total_seconds()
+        else:
+            if older_than.tzinfo is None:
+                older_than = older_than.replace(tzinfo=timezone.utc)
+            cutoff = older_than.timestamp()
+
+        def is_older(summary: ChatSummary) -> bool:
+            updated_at = summary.updated_at()
+            return updated_at is not None and updated_at < cutoff
+
+        return await self.hide_conversations(is_older, concurrency, progress_callback)
+
+    def set_auth_token(self, auth_token: str) -> None:
+        """
+        Switch to a new access token and plan its refresh from the JWT expiry.
+        Requests already sent keep the headers they were built with.
+
+        Args:
+            auth_token (str): The access token.
+        """
+        self.auth_token = auth_token
+        expires_at = get_jwt_expiry(auth_token)
+        if expires_at is None or self.session_token is None:
+            self.auth_token_refresh_at = None
+        else:
+            self.auth_token_refresh_at = max(
+                expires_at - self.auth_token_refresh_margin, time.time() + 60
+            )
+
+    async def ensure_auth_token(self) -> None:
+        """
+        Get the access token if it isn't there yet, once for all the requests
+        waiting for it. A failed attempt is retried by the next request.
+        """
+        task = self.start_auth_token()
+        try:
+            await asyncio.shield(task)
+        except Exception:
+            if self.auth_token_task is task:
+                self.auth_token_task = None
+            raise
+
+    def start_auth_token(self) -> asyncio.Task:
+        if self.auth_token_task is None:
+            self.auth_token_task = asyncio.create_task(self.obtain_auth_token())
+        return self.auth_token_task
+
+    async def obtain_auth_token(self) -> None:
+        if not self.auth_token:
+            if self.session_token is None:
+                raise TokenNotProvided
+            self.set_auth_token(await self.load_auth_token())
+        else:
+            self.set_auth_token(self.auth_token)
+
+    def reset_auth_token(self) -> None:
+        """
+        Drop the access token, a new one is loaded on the next request.
+        """
+        self.auth_token = None
+        self.auth_token_task = None
+
+    async def load_auth_token(self) -> str:
+        """
+        Get an access token for the session token, from the on-disk cache when
+        the cached one isn't about to expire.
+
+        Returns: authentication token.
+        """
+        cache = self.auth_token_cache
+        if cache is None:
+            return await self.fetch_auth_token()
+
+        auth_token = await asyncio.to_thread(cache.read, self.session_token)
+        if auth_token is not None:
+            return auth_token
+
+        lock_file = await cache.acquire(self.session_token)
+        try:
+            # another process may have refreshed it while we were waiting for the lock
+            auth_token = cache.read(self.session_token)
+            if auth_token is None:
+                auth_token = await self.fetch_auth_token()
+                await asyncio.to_thread(cache.write, self.session_token, auth_token)
+        finally:
+            cache.release(lock_file)
+
+        return auth_token
+
+    def schedule_auth_token_refresh(self) -> None:
+        if self.auth_token_refresh_task is None or self.auth_token_refresh_task.done():
+            self.auth_token_refresh_task = asyncio.create_task(self.refresh_auth_token())
+
+    async def refresh_auth_token(self) -> None:
+        try:
+            self.set_auth_token(await self.load_auth_token())
+        except Exception:
+            # keep using the current token and try again a bit later
+            self.auth_token_refresh_at = time.time() + 60
 
     async def fetch_auth_token(self) -> str:
         """
@@ -505,14 +1364,14 @@ class AsyncChatGPT:
 
         Returns: authentication token.
         """
-        url = "https://chat.openai.com/api/auth/session"
+        url = f"{self.base_url}/api/auth/session"
         cookies = {"__Secure-next-auth.session-token": self.session_token}
 
         headers = {
             "User-Agent": USER_AGENT,
             "Accept": "*/*",
             "Accept-Language": "en-US,en;q=0.5",
-            "Alt-Used": "chat.openai.com",
+            "Alt-Used": self.host,
             "Connection": "keep-alive",
             "Sec-Fetch-Dest": "empty",
             "Sec-Fetch-Mode": "cors",
@@ -526,7 +1385,7 @@ class AsyncChatGPT:
             ),
         }
 
-        response = await self.session.get(url=url, headers=headers)
+        response = await self.retry_request("auth", "get", url=url, headers=headers)
         response_json = response.json()
 
         if "accessToken" in response_json:
@@ -555,9 +1414,9 @@ class AsyncChatGPT:
             "about_model_message": about_model,
             "enabled": enable_for_new_chats,
         }
-        url = CHATGPT_API.format("user_system_messages")
+        url = self.api_url("user_system_messages")
         response = await self.session.post(
-            url=url, headers=self.build_request_headers(), json=data
+            url=url, headers=await self.request_headers(), json=data
         )
 
         return response.json()
@@ -570,13 +1429,98 @@ class AsyncChatGPT:
             "limit": limit,
             "order": "updated",
         }
-        url = CHATGPT_API.format("conversations")
+        url = self.api_url("conversations")
         response = await self.session.get(
-            url=url, params=params, headers=self.build_request_headers()
+            url=url, params=params, headers=await self.request_headers()
         )
 
         return response.json()
 
+    async def fetch_chats_page(self, offset: int, limit: int) -> dict:
+        """
+        Fetch one page of the conversation list, retrying as the retry policy says.
+
+        Args:
+            offset (int): Index of the first conversation.
+            limit (int): Number of conversations.
+
+        Returns:
+            dict: The page, with "items", "total" and "has_missing_conversations".
+
+        Raises:
+            BackendError: If the server answered with an error status.
+            UnexpectedResponseError: If the response is not valid JSON.
+        """
+        response = await self.retry_request(
+            "conversations",
+            "get",
+            url=self.api_url("conversations"),
+            params={"offset": offset, "limit": limit, "order": "updated"},
+            headers=await self.request_headers(),
+        )
+        self.check_response_status(response)
+        try:
+            return json_backend.loads(response.content)
+        except Exception as e:
+            raise UnexpectedResponseError(e, response.text)
+
+    async def iter_chats(
+        self, page_size: Optional[int] = 28, prefetch: Optional[int] = 2
+    ) -> AsyncGenerator[ChatSummary, None]:
+        """
+        Iterate over every conversation of the account, newest update first.
+        While a page is consumed the next `prefetch` pages are already being
+        fetched. A conversation that moves up the list mid-way (because it was
+        updated) is yielded once.
+
+        Args:
+            page_size (Optional[int]): Conversations per request. Defaults to 28.
+            prefetch (Optional[int]): Pages fetched ahead of the one being consumed. Defaults to 2.
+
+        Yields:
+            ChatSummary: One summary per conversation.
+        """
+        pages = collections.deque()
+        next_offset = 0
+        total = None
+        may_have_more = True
+        seen = set()
+
+        def schedule() -> None:
+            nonlocal next_offset
+            while len(pages) < max(prefetch, 0) + 1 and may_have_more:
+                if total is not None and next_offset >= total:
+                    break
+                task = asyncio.create_task(self.fetch_chats_page(next_offset, page_size))
+                pages.append((next_offset, task))
+                next_offset += page_size
+
+        try:
+            pages.append((0, asyncio.create_task(self.fetch_chats_page(0, page_size))))
+            next_offset = page_size
+            while pages:
+                offset, task = pages.popleft()
+                page = await task
+                if is_last_page(page, offset, page_size):
+                    may_have_more = False
+                    for _, pending in pages:
+                        pending.cancel()
+                    pages.clear()
+                elif not page.get("has_missing_conversations"):
+                    total = page.get("total")
+                schedule()
+
+                for item in page.get("items") or ():
+                    if item["id"] in seen:
+                        continue
+                    seen.add(item["id"])
+                    yield ChatSummary.from_item(item)
+        finally:
+            for _, pending in pages:
+                pending.cancel()
+            if pages:
+                await asyncio.gather(*(task for _, task in pages), return_exceptions=True)
+
     async def check_websocket_availability(self) -> bool:
         """
         Check if WebSocket is available.
@@ -584,9 +1528,9 @@ class AsyncChatGPT:
         Returns:
             bool: True if WebSocket is available, otherwise False.
         """
-        url = CHATGPT_API.format("accounts/check/v4-2023-04-27")
+        url = self.api_url("accounts/check/v4-2023-04-27")
         response = (await self.session.get(
-            url=url, headers=self.build_request_headers()
+            url=url, headers=await self.request_headers()
         )).json()
         
         if 'account_ordering' in response and 'accounts' in response:
@@ -596,50 +1540,37 @@ class AsyncChatGPT:
 
         return False
     
-    async def ensure_websocket(self):
-        if not self.ws_loop:
-            ws_url_rsp = (await self.session.post(WS_REGISTER_URL, headers=self.build_request_headers())).json()
-            ws_url = ws_url_rsp['wss_url']
-            access_token = self.extract_access_token(ws_url)
-            self.ws_loop = asyncio.create_task(self.listen_to_websocket(ws_url, access_token))
+    async def ensure_websocket(self) -> None:
+        """
+        Connect the websocket if it isn't connected, or reconnecting already.
+
+        Raises:
+            WebSocketError: If no connection could be made.
+        """
+        await self.websocket.start()
 
     def extract_access_token(self, url):
-        match = re.search(r'access_token=([^&]*)', url)
-        if match:
-            return match.group(1)
-        else:
-            return None
-        
-    async def listen_to_websocket(self, ws_url: str, access_token: str):
-        headers = {'Authorization': f'Bearer {access_token}'}
-        async with websockets.connect(ws_url, extra_headers=headers) as websocket:
-            while True:
-                message = await websocket.recv()
-                message_data = json.loads(message)
-                body_encoded = message_data.get("body", "")
-                ws_id = message_data.get("websocket_request_id", "")
-                decoded_body = base64.b64decode(body_encoded).decode('utf-8')
-                response_queue = self.ws_conversation_map.get(ws_id)
-                if response_queue is None:
-                    continue
-                if 'title_generation' in decoded_body:
-                    # skip
-                    continue
-                response_queue.put_nowait(decoded_body)
-                if '[DONE]' in decoded_body or '[ERROR]' in decoded_body:
-                    await response_queue.put(None)
-                    continue
+        return extract_access_token(url)
 
     async def create_chat_requirements_token(self):
+        """
+        Get a chat requirements token, reusing a cached or prefetched one when possible.
+
+        Returns:
+            str: chat requirements token
+        """
+        return await self.chat_requirements_cache.get()
+
+    async def fetch_chat_requirements_token(self):
         """
         Get a chat requirements token from chatgpt server
 
         Returns:
             str: chat requirements token
         """
-        url = CHATGPT_API.format("sentinel/chat-requirements")
-        response = await self.session.post(
-            url=url, headers=self.build_request_headers()
+        url = self.api_url("sentinel/chat-requirements")
+        response = await self.retry_request(
+            "sentinel", "post", url=url, headers=await self.request_headers()
         )
         body = response.json()
         token = body.get("token", None)
@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Optional
+
+from .utils import get_jwt_expiry
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class AuthTokenCache:
+    def __init__(
+        self,
+        cache_dir: str,
+        refresh_margin: Optional[float] = 300,
+        max_age: Optional[float] = 3600,
+    ):
+        """
+        On-disk cache of access tokens keyed by a hash of the session token, safe
+        to share between processes: writes are atomic and refreshes are done
+        under a per-key file lock so only one process hits /api/auth/session.
+
+        Args:
+            cache_dir (str): Directory holding the cache files.
+            refresh_margin (Optional[float]): Tokens expiring within this many seconds are refreshed. Defaults to 300.
+            max_age (Optional[float]): Seconds a token without a JWT expiry is used for. Defaults to an hour.
+        """
+        self.cache_dir = cache_dir
+        self.refresh_margin = refresh_margin
+        self.max_age = max_age
+
+    def key(self, session_token: str) -> str:
+        return hashlib.sha256(session_token.encode()).hexdigest()
+
+    def path(self, session_token: str, extension: str = "json") -> str:
+        return os.path.join(self.cache_dir, f"{self.key(session_token)}.{extension}")
+
+    def read(self, session_token: str) -> Optional[str]:
+        """
+        Read the cached access token of a session token.
+
+        Args:
+            session_token (str): The session token.
+
+        Returns:
+            Optional[str]: The cached access token, None if there's none or it expires within the refresh margin.
+        """
+        try:
+            with open(self.path(session_token)) as file:
+                entry = json.load(file)
+            access_token = entry["access_token"]
+            expires_at = entry["expires_at"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # entries written without an expiry are refreshed as well
+        if not access_token or expires_at is None:
+            return None
+        if expires_at - self.refresh_margin <= time.time():
+            return None
+        return access_token
+
+    def write(self, session_token: str, access_token: str) -> None:
+        """
+        Atomically replace the cached access token of a session token.
+
+        Args:
+            session_token (str): The session token.
+            access_token (str): The new access token.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(file_descriptor, "w") as file:
+                expires_at = get_jwt_expiry(access_token)
+                if expires_at is None:
+                    # the margin is taken off by read()
+                    expires_at = time.time() + self.max_age + self.refresh_margin
+                json.dump({"access_token": access_token, "expires_at": expires_at}, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path(session_token))
+        except:
+            os.unlink(temp_path)
+            raise
+
+    def try_acquire(self, session_token: str):
+        """
+        Take the inter-process lock of a session token if it's free, without waiting.
+
+        Args:
+            session_token (str): The session token.
+
+        Returns:
+            The lock handle to pass to release(), None if the lock is held elsewhere.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        lock_file = open(self.path(session_token, "lock"), "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return None
+        except:
+            lock_file.close()
+            raise
+        return lock_file
+
+    async def acquire(self, session_token: str, poll_interval: float = 0.05):
+        """
+        Wait until the inter-process lock of a session token is held. The lock
+        is polled without blocking, a thread waiting on it would take it after
+        its caller was cancelled and never release it.
+
+        Args:
+            session_token (str): The session token.
+            poll_interval (float): Seconds between attempts. Defaults to 0.05.
+
+        Returns:
+            The lock handle to pass to release().
+        """
+        while True:
+            lock_file = self.try_acquire(session_token)
+            if lock_file is not None:
+                return lock_file
+            await asyncio.sleep(poll_interval)
+
+    def release(self, lock_file) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            lock_file.close()
@@ -0,0 +1,179 @@
+import asyncio
+import time
+from typing import Iterable, Optional
+
+
+def percentile(sorted_values: list, fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class AsyncChatBatch:
+    def __init__(
+        self,
+        chatgpt,
+        prompts: Iterable[str],
+        concurrency: Optional[int] = 4,
+        model: Optional[str] = "gpt-3.5",
+        ordered: Optional[bool] = False,
+    ):
+        """
+        Runs every prompt in a new conversation, at most `concurrency` at a time,
+        and yields one result per prompt. A failing prompt doesn't stop the batch,
+        its result carries the error instead.
+
+        Iterate over it with `async for`, `stats` is filled in once it's done.
+
+        Args:
+            chatgpt: The client to chat through.
+            prompts (Iterable[str]): The prompts, consumed lazily.
+            concurrency (Optional[int]): How many prompts run at the same time. Defaults to 4.
+            model (Optional[str]): Model of the conversations. Defaults to "gpt-3.5".
+            ordered (Optional[bool]): Yield results in input order instead of completion order. Defaults to False.
+
+        Raises:
+            ValueError: If concurrency is less than 1.
+        """
+        if not concurrency or concurrency < 1:
+            raise ValueError(f"concurrency has to be at least 1, got {concurrency}.")
+
+        self.chatgpt = chatgpt
+        self.prompts = prompts
+        self.concurrency = concurrency
+        self.model = model
+        self.ordered = ordered
+
+        self.latencies = []
+        self.failed = 0
+        self.started_at = None
+        self.stats = None
+
+    def build_result(self, index, prompt, conversation, content, error, started_at):
+        latency = time.perf_counter() - started_at
+        self.latencies.append(latency)
+        if error is not None:
+            self.failed += 1
+
+        return {
+            "index": index,
+            "prompt": prompt,
+            "content": "".join(content),
+            "conversation_id": conversation.conversation_id,
+            "message_id": conversation.parent_id,
+            "error": error,
+            "latency": latency,
+        }
+
+    def finish(self) -> dict:
+        elapsed = time.perf_counter() - self.started_at
+        latencies = sorted(self.latencies)
+        self.stats = {
+            "prompts": len(latencies),
+            "failed": self.failed,
+            "elapsed": elapsed,
+            "prompts_per_second": len(latencies) / elapsed if elapsed else 0.0,
+            "latency_p50": percentile(latencies, 0.5),
+            "latency_p95": percentile(latencies, 0.95),
+        }
+        return self.stats
+
+    def reorder(self, result: dict, pending: dict, next_index: int):
+        """
+        Buffer out of order results, returning the ones that can be yielded now.
+        """
+        if not self.ordered:
+            return [result], next_index
+
+        pending[result["index"]] = result
+        ready = []
+        while next_index in pending:
+            ready.append(pending.pop(next_index))
+            next_index += 1
+        return ready, next_index
+
+    async def chat(self, index: int, prompt: str) -> dict:
+        conversation = self.chatgpt.create_new_conversation(self.model)
+        started_at = time.perf_counter()
+        content = []
+        error = None
+        try:
+            async for message in conversation.chat(prompt):
+                content.append(message["content"])
+        except Exception as e:
+            error = e
+
+        return self.build_result(index, prompt, conversation, content, error, started_at)
+
+    def __aiter__(self):
+        return self.run()
+
+    async def run(self):
+        self.started_at = time.perf_counter()
+        prompts = enumerate(self.prompts)
+        results = asyncio.Queue()
+
+        async def worker():
+            for index, prompt in prompts:
+                await results.put(await self.chat(index, prompt))
+            await results.put(None)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            running = len(workers)
+            pending, next_index = {}, 0
+            while running:
+                result = await results.get()
+                if result is None:
+                    running -= 1
+                    continue
+
+                ready, next_index = self.reorder(result, pending, next_index)
+                for result in ready:
+                    yield result
+        finally:
+            for task in workers:
+                task.cancel()
+            # so no worker outlives the batch, e.g. when the caller stopped early
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.finish()
+
+
+class SyncChatBatch:
+    def __init__(
+        self,
+        chatgpt,
+        prompts: Iterable[str],
+        concurrency: Optional[int] = 4,
+        model: Optional[str] = "gpt-3.5",
+        ordered: Optional[bool] = False,
+    ):
+        """
+        Runs every prompt in a new conversation, at most `concurrency` at a time,
+        and yields one result per prompt. A failing prompt doesn't stop the batch,
+        its result carries the error instead.
+
+        Iterate over it with `for`, `stats` is filled in once it's done.
+
+        Args:
+            chatgpt (SyncChatGPT): The client to chat through, the batch runs on its loop.
+            prompts (Iterable[str]): The prompts, consumed lazily.
+            concurrency (Optional[int]): How many prompts run at the same time. Defaults to 4.
+            model (Optional[str]): Model of the conversations. Defaults to "gpt-3.5".
+            ordered (Optional[bool]): Yield results in input order instead of completion order. Defaults to False.
+        """
+        self.chatgpt = chatgpt
+        self.batch = AsyncChatBatch(
+            chatgpt.chatgpt, prompts, concurrency, model, ordered
+        )
+        self.stats = None
+
+    def __iter__(self):
+        return self.run()
+
+    def run(self):
+        try:
+            yield from self.chatgpt.iterate(self.batch.run())
+        finally:
+            self.stats = self.batch.stats
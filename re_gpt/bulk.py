@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBulkOperation:
+    def __init__(
+        self,
+        operation: Callable[[str], Awaitable],
+        concurrency: Optional[int] = 8,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+    ):
+        """
+        Runs `operation` for many conversation IDs, at most `concurrency` at a
+        time. A failing ID doesn't stop the others, its error ends up in the
+        summary instead.
+
+        Args:
+            operation (Callable[[str], Awaitable]): Coroutine function taking a conversation ID, raising on failure.
+            concurrency (Optional[int]): How many IDs are processed at the same time. Defaults to 8.
+            progress_callback (Optional[Callable[[dict], None]]): Called after every ID with {"conversation_id", "error", "done", "failed"}. Its errors are logged and don't stop the operation.
+        """
+        self.operation = operation
+        self.concurrency = max(concurrency, 1)
+        self.progress_callback = progress_callback
+
+        self.succeeded = []
+        self.failed = {}
+
+    def report(self, conversation_id: str, error: Optional[Exception]) -> None:
+        if error is None:
+            self.succeeded.append(conversation_id)
+        else:
+            self.failed[conversation_id] = error
+
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback(
+                {
+                    "conversation_id": conversation_id,
+                    "error": error,
+                    "done": len(self.succeeded) + len(self.failed),
+                    "failed": len(self.failed),
+                }
+            )
+        except Exception:
+            # the ID is processed already, a broken callback must not hide the rest
+            logger.exception("progress_callback failed for conversation %s", conversation_id)
+
+    async def process(self, conversation_id: str) -> None:
+        try:
+            await self.operation(conversation_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.report(conversation_id, e)
+        else:
+            self.report(conversation_id, None)
+
+    async def run(self, conversation_ids: Iterable[str]) -> dict:
+        """
+        Args:
+            conversation_ids (Iterable[str]): The IDs, consumed lazily.
+
+        Returns:
+            dict: Summary with the "succeeded" IDs, the "failed" IDs mapped to their error, and "elapsed" seconds.
+        """
+        started_at = time.perf_counter()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def producer():
+            for conversation_id in conversation_ids:
+                await queue.put(conversation_id)
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def worker():
+            while True:
+                conversation_id = await queue.get()
+                if conversation_id is None:
+                    return
+                await self.process(conversation_id)
+
+        tasks = [asyncio.create_task(producer())]
+        tasks += [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return {
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed": time.perf_counter() - started_at,
+        }
@@ -0,0 +1,73 @@
+from collections import deque
+from typing import Union
+
+
+class ResponseCapture:
+    def __init__(self, max_size: int = 64 * 1024):
+        """
+        Keeps a bounded excerpt of a raw server stream for error reports: the
+        first event and the last `max_size` bytes/characters, so memory stays
+        flat however long the stream is. Chunks are only decoded when the
+        excerpt is built.
+
+        Args:
+            max_size (int): Size of the kept tail (and cap on the first event). 0 disables the capture. Defaults to 64 KB.
+        """
+        self.max_size = max_size
+        self.head = []
+        self.head_size = 0
+        self.head_complete = not max_size
+        self.tail = deque()
+        self.tail_size = 0
+        self.total_size = 0
+
+    def append(self, chunk: Union[bytes, str]) -> None:
+        """
+        Add a raw chunk of the stream.
+
+        Args:
+            chunk (Union[bytes, str]): Chunk as received from the HTTP stream or the websocket.
+        """
+        if not self.max_size:
+            return
+
+        self.total_size += len(chunk)
+
+        if not self.head_complete:
+            end = chunk.find(b"\n\n" if isinstance(chunk, bytes) else "\n\n")
+            head = chunk if end == -1 else chunk[: end + 2]
+            head = head[: self.max_size - self.head_size]
+            self.head.append(head)
+            self.head_size += len(head)
+            self.head_complete = end != -1 or self.head_size >= self.max_size
+            chunk = chunk[len(head) :]
+            if not chunk:
+                return
+
+        if len(chunk) > self.max_size:
+            chunk = chunk[-self.max_size :]
+        self.tail.append(chunk)
+        self.tail_size += len(chunk)
+        while self.tail_size - len(self.tail[0]) >= self.max_size:
+            self.tail_size -= len(self.tail.popleft())
+
+    def excerpt(self) -> dict:
+        """
+        Get the captured excerpt.
+
+        Returns:
+            dict: The first event, the last characters of the stream, the total size of the stream and how much of it was left out.
+        """
+        head = "".join(self.decode(part) for part in self.head)
+        tail = "".join(self.decode(part) for part in self.tail)
+        tail = tail[-self.max_size :] if self.max_size else ""
+        return {
+            "first_event": head,
+            "tail": tail,
+            "total_size": self.total_size,
+            "omitted_size": self.total_size - len(head) - len(tail),
+        }
+
+    @staticmethod
+    def decode(chunk: Union[bytes, str]) -> str:
+        return chunk.decode(errors="replace") if isinstance(chunk, bytes) else chunk
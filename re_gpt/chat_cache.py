@@ -0,0 +1,189 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# what an entry without a stored chat is counted as
+STATE_ENTRY_SIZE = 256
+
+
+class CachedConversation:
+    __slots__ = (
+        "body",
+        "tree",
+        "parent_id",
+        "model",
+        "size",
+        "expires_at",
+        "state_expires_at",
+        "etag",
+        "last_modified",
+    )
+
+    def __init__(self):
+        # the JSON of the chat, every hit decodes its own copy
+        self.body = None
+        self.tree = None
+        self.parent_id = None
+        self.model = None
+        self.size = STATE_ENTRY_SIZE
+        self.expires_at = 0.0
+        # until when parent_id and model are trusted without asking the backend
+        self.state_expires_at = 0.0
+        self.etag = None
+        self.last_modified = None
+
+
+class ConversationCache:
+    def __init__(self, max_bytes: Optional[int] = 32 * 1024 * 1024, ttl: Optional[float] = 300):
+        """
+        LRU cache of fetched conversations, bounded by the size of their JSON.
+        Besides the chat, every entry keeps the conversation's parent_id and
+        model, which chat() updates as it goes, so reopening a conversation
+        doesn't need the mapping at all, as long as they were confirmed less than
+        `ttl` ago. Chats older than `ttl` (or advanced
+        locally since) are revalidated with If-None-Match/If-Modified-Since
+        when the backend sent a validator, and downloaded again otherwise.
+
+        Args:
+            max_bytes (Optional[int]): Upper bound of the summed size of the cached chats. Defaults to 32 MB.
+            ttl (Optional[float]): Seconds a fetched chat is served without asking the backend. Defaults to 300.
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.bytes_saved = 0
+
+    def get(self, conversation_id: str) -> Optional[CachedConversation]:
+        entry = self.entries.get(conversation_id)
+        if entry is not None:
+            self.entries.move_to_end(conversation_id)
+        return entry
+
+    def is_fresh(self, entry: CachedConversation) -> bool:
+        return entry.body is not None and time.monotonic() < entry.expires_at
+
+    def is_state_fresh(self, entry: CachedConversation) -> bool:
+        """
+        Returns:
+            bool: True if the entry's parent_id and model were confirmed less than `ttl` ago.
+        """
+        return (
+            entry.parent_id is not None
+            and entry.model is not None
+            and time.monotonic() < entry.state_expires_at
+        )
+
+    def record_hit(self, entry: CachedConversation, revalidated: bool = False) -> None:
+        self.hits += 1
+        if revalidated:
+            self.revalidations += 1
+            entry.expires_at = entry.state_expires_at = time.monotonic() + self.ttl
+        self.bytes_saved += entry.size
+
+    def record_miss(self) -> None:
+        self.misses += 1
+
+    def validation_headers(self, entry: CachedConversation) -> dict:
+        """
+        Returns:
+            dict: Conditional request headers for the entry's chat, empty if the backend sent no validator.
+        """
+        headers = {}
+        if entry.body is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(
+        self,
+        conversation_id: str,
+        body: bytes,
+        tree,
+        model: Optional[str],
+        response_headers,
+    ) -> None:
+        """
+        Cache a freshly fetched chat. Its JSON is kept rather than the decoded
+        dict, so what callers do with the chats they get can't change the cache.
+
+        Args:
+            conversation_id (str): The ID of the conversation.
+            body (bytes): The chat's JSON as the backend sent it.
+            tree (ConversationTree): The index of the chat.
+            model (Optional[str]): The conversation's model.
+            response_headers: Headers of the response, for its ETag/Last-Modified.
+        """
+        size = len(body)
+        entry = self.pop(conversation_id) or CachedConversation()
+
+        entry.parent_id = tree.active_leaf()
+        entry.model = model
+        entry.state_expires_at = time.monotonic() + self.ttl
+        if size <= self.max_bytes:
+            entry.body = body
+            entry.tree = tree
+            entry.size = size
+            entry.expires_at = time.monotonic() + self.ttl
+            entry.etag = response_headers.get("etag")
+            entry.last_modified = response_headers.get("last-modified")
+        else:
+            entry.body = entry.tree = entry.etag = entry.last_modified = None
+            entry.size = STATE_ENTRY_SIZE
+
+        self.insert(conversation_id, entry)
+
+    def advance(self, conversation_id: str, parent_id: str, model: Optional[str]) -> None:
+        """
+        Record that a conversation continued locally, its cached chat is
+        revalidated before it's served again.
+
+        Args:
+            conversation_id (str): The ID of the conversation.
+            parent_id (str): The ID of the newest message.
+            model (Optional[str]): The conversation's model.
+        """
+        entry = self.pop(conversation_id) or CachedConversation()
+
+        entry.parent_id = parent_id
+        entry.model = model
+        entry.expires_at = 0.0
+        entry.state_expires_at = time.monotonic() + self.ttl
+        self.insert(conversation_id, entry)
+
+    def insert(self, conversation_id: str, entry: CachedConversation) -> None:
+        self.entries[conversation_id] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def pop(self, conversation_id: str) -> Optional[CachedConversation]:
+        entry = self.entries.pop(conversation_id, None)
+        if entry is not None:
+            self.size -= entry.size
+        return entry
+
+    def invalidate(self, conversation_id: str) -> None:
+        self.pop(conversation_id)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Hits, misses, revalidations, bytes not downloaded thanks to the cache, and its current size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "bytes_saved": self.bytes_saved,
+            "entries": len(self.entries),
+            "size": self.size,
+        }
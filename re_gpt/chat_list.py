@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+from typing import Optional, Union
+
+
+def parse_timestamp(value: Optional[Union[str, float]]) -> Optional[float]:
+    """
+    Args:
+        value (Optional[Union[str, float]]): A time as sent by the backend, epoch seconds or ISO 8601.
+
+    Returns:
+        Optional[float]: Epoch seconds, None if the value is missing or can't be parsed.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class ChatSummary:
+    __slots__ = (
+        "id",
+        "title",
+        "create_time",
+        "update_time",
+        "is_archived",
+        "gizmo_id",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        title: Optional[str] = None,
+        create_time: Optional[Union[str, float]] = None,
+        update_time: Optional[Union[str, float]] = None,
+        is_archived: Optional[bool] = False,
+        gizmo_id: Optional[str] = None,
+    ):
+        """
+        One entry of the conversation list. Only the fields needed to show or
+        pick a conversation are kept, pass `id` to get_conversation() for the
+        rest.
+
+        Args:
+            id (str): The ID of the conversation.
+            title (Optional[str]): Its title.
+            create_time (Optional[Union[str, float]]): When it was created, as sent by the backend.
+            update_time (Optional[Union[str, float]]): When it was last updated, as sent by the backend.
+            is_archived (Optional[bool]): Whether it's archived. Defaults to False.
+            gizmo_id (Optional[str]): The GPT it was held with, if any.
+        """
+        self.id = id
+        self.title = title
+        self.create_time = create_time
+        self.update_time = update_time
+        self.is_archived = is_archived
+        self.gizmo_id = gizmo_id
+
+    @classmethod
+    def from_item(cls, item: dict) -> "ChatSummary":
+        return cls(
+            id=item["id"],
+            title=item.get("title"),
+            create_time=item.get("create_time"),
+            update_time=item.get("update_time"),
+            is_archived=bool(item.get("is_archived")),
+            gizmo_id=item.get("gizmo_id"),
+        )
+
+    def updated_at(self) -> Optional[float]:
+        """
+        Returns:
+            Optional[float]: Epoch seconds of the last update (of the creation if there's none), None if unknown.
+        """
+        updated_at = parse_timestamp(self.update_time)
+        if updated_at is None:
+            updated_at = parse_timestamp(self.create_time)
+        return updated_at
+
+    def __repr__(self) -> str:
+        return f"ChatSummary(id={self.id!r}, title={self.title!r})"
+
+
+def is_last_page(page: dict, offset: int, page_size: int) -> bool:
+    """
+    Args:
+        page (dict): A page returned by the conversations endpoint.
+        offset (int): Offset the page was requested with.
+        page_size (int): Limit the page was requested with.
+
+    Returns:
+        bool: True if no conversations come after the page.
+    """
+    items = page.get("items") or []
+    if not items:
+        return True
+    if page.get("has_missing_conversations"):
+        # some conversations were left out, neither the total nor a short page can be trusted
+        return False
+    total = page.get("total")
+    return len(items) < page_size or (total is not None and offset + len(items) >= total)
@@ -18,8 +18,9 @@ class RetryError(Exception):
 
 
 class BackendError(Exception):
-    def __init__(self, error_code):
+    def __init__(self, error_code, retry_after=None):
         self.error_code = error_code
+        self.retry_after = retry_after
         self.message = (
             f"An error occurred on the backend. Error code: {self.error_code}"
         )
@@ -40,3 +41,53 @@ class InvalidModelName(Exception):
         self.avalible_models = avalible_models
         self.message = f'"{model}" is not a valid model. Avalible models: {[model for model in avalible_models]}'
         super().__init__(self.message)
+
+
+class InvalidJSONBackend(Exception):
+    def __init__(self, backend, avalible_backends):
+        self.backend = backend
+        self.avalible_backends = avalible_backends
+        self.message = f'"{backend}" is not an installed JSON backend. Avalible backends: {[backend for backend in avalible_backends]}'
+        super().__init__(self.message)
+
+
+class NoAvailableAccount(Exception):
+    def __init__(self, retry_in):
+        self.retry_in = retry_in
+        self.message = f"Every account of the pool is rate limited or failing. Next one is available in {retry_in:.0f} seconds."
+        super().__init__(self.message)
+
+
+class UnknownPoolConversation(Exception):
+    def __init__(self, conversation_id):
+        self.conversation_id = conversation_id
+        self.message = f"The pool doesn't know which account owns the conversation {conversation_id}, pass its account index."
+        super().__init__(self.message)
+
+
+class InvalidBinaryDownload(Exception):
+    def __init__(self, url, reason):
+        self.url = url
+        self.reason = reason
+        self.message = f"The funcaptcha binary downloaded from {url} was rejected: {reason}."
+        super().__init__(self.message)
+
+
+class IncompleteStreamError(Exception):
+    def __init__(self):
+        self.message = "The response stream ended before the assistant message was finished."
+        super().__init__(self.message)
+
+
+class WebSocketError(ConnectionError):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+class InvalidExportCheckpoint(Exception):
+    def __init__(self, path, reason):
+        self.path = path
+        self.reason = reason
+        self.message = f'The export checkpoint "{path}" can\'t be used: {reason}.'
+        super().__init__(self.message)
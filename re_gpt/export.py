@@ -0,0 +1,321 @@
+import asyncio
+import gzip
+import io
+import json
+import os
+import time
+from typing import Callable, Iterator, Optional
+
+from . import json_backend
+from .chat_list import ChatSummary
+from .errors import InvalidExportCheckpoint
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIONS = ("zstd", "gzip", "none")
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def default_compression() -> str:
+    """
+    Returns:
+        str: "zstd" if zstandard is installed, otherwise "gzip".
+    """
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def read_export(path: str) -> Iterator[dict]:
+    """
+    Read an export back, whatever its compression.
+
+    Args:
+        path (str): Path of the JSONL file.
+
+    Yields:
+        dict: One {"id", "update_time", "conversation"} record per line, in file order (the last record of an ID is the newest).
+    """
+    with open(path, "rb") as raw_file:
+        magic = raw_file.read(4)
+        raw_file.seek(0)
+        if magic[:2] == GZIP_MAGIC:
+            file = gzip.GzipFile(fileobj=raw_file, mode="rb")
+        elif magic == ZSTD_MAGIC:
+            if zstandard is None:
+                raise ImportError('Reading zstd exports needs the "zstandard" package.')
+            file = io.BufferedReader(
+                zstandard.ZstdDecompressor().stream_reader(raw_file, read_across_frames=True)
+            )
+        else:
+            file = raw_file
+
+        for line in file:
+            if line.strip():
+                yield json_backend.loads(line)
+
+
+class CompressedWriter:
+    def __init__(self, path: str, compression: str, offset: int):
+        """
+        Appends lines to a compressed file as a sequence of independent
+        gzip members or zstd frames, one per commit. Everything after the last
+        commit is cut off when the file is opened again at that offset, so an
+        interrupted write never leaves a broken archive behind.
+
+        Args:
+            path (str): Path of the file.
+            compression (str): "zstd", "gzip" or "none".
+            offset (int): Size of the file at the last commit, anything after it is discarded.
+        """
+        if compression == "zstd" and zstandard is None:
+            raise ImportError('zstd compression needs the "zstandard" package.')
+
+        self.compression = compression
+        self.file = open(path, "r+b" if os.path.exists(path) else "wb")
+        self.file.truncate(offset)
+        self.file.seek(offset)
+        self.stream = None
+
+    def open_stream(self):
+        if self.compression == "gzip":
+            return gzip.GzipFile(fileobj=self.file, mode="wb")
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor().stream_writer(self.file, closefd=False)
+        return self.file
+
+    def write(self, data: bytes) -> None:
+        if self.stream is None:
+            self.stream = self.open_stream()
+        self.stream.write(data)
+
+    def commit(self) -> int:
+        """
+        End the current gzip member or zstd frame and sync the file to disk.
+
+        Returns:
+            int: Size of the file, the offset to resume from.
+        """
+        if self.stream is not None and self.stream is not self.file:
+            self.stream.close()
+        self.stream = None
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class AsyncConversationExporter:
+    def __init__(
+        self,
+        chatgpt,
+        output_path: str,
+        checkpoint_path: Optional[str] = None,
+        compression: Optional[str] = None,
+        concurrency: Optional[int] = 8,
+        page_size: Optional[int] = 28,
+        checkpoint_every: Optional[int] = 50,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+    ):
+        """
+        Exports every conversation of the account to a compressed JSONL file,
+        one {"id", "update_time", "conversation"} line per conversation. Bodies
+        are fetched `concurrency` at a time and written as they arrive, the
+        account is never held in memory.
+
+        The checkpoint file records the committed size of the output and the
+        update_time of every exported conversation. An interrupted export
+        continues from the last commit, and a later run over the same files
+        only fetches conversations that changed since, appending their new
+        version (the last line of an ID wins).
+
+        Args:
+            chatgpt (AsyncChatGPT): The client to export through.
+            output_path (str): Path of the JSONL file.
+            checkpoint_path (Optional[str]): Path of the checkpoint file. Defaults to output_path + ".checkpoint.json".
+            compression (Optional[str]): "zstd", "gzip" or "none". Defaults to the checkpoint's, else zstd if zstandard is installed, else gzip.
+            concurrency (Optional[int]): How many conversations are fetched at the same time. Defaults to 8.
+            page_size (Optional[int]): Conversations per list request. Defaults to 28.
+            checkpoint_every (Optional[int]): Conversations written between two commits. Defaults to 50.
+            progress_callback (Optional[Callable[[dict], None]]): Called with the stats after every commit.
+        """
+        self.chatgpt = chatgpt
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path or output_path + ".checkpoint.json"
+        self.compression = compression
+        self.concurrency = max(concurrency, 1)
+        self.page_size = page_size
+        self.checkpoint_every = max(checkpoint_every, 1)
+        self.progress_callback = progress_callback
+
+        self.exported = {}
+        self.stats = {"exported": 0, "skipped": 0, "failed": {}, "elapsed": 0.0}
+
+    def load_checkpoint(self) -> int:
+        """
+        Returns:
+            int: Offset of the output to resume from.
+
+        Raises:
+            InvalidExportCheckpoint: If the checkpoint doesn't match the output or the requested compression.
+        """
+        output_size = (
+            os.path.getsize(self.output_path) if os.path.exists(self.output_path) else 0
+        )
+        if not os.path.exists(self.checkpoint_path):
+            if output_size:
+                raise InvalidExportCheckpoint(
+                    self.checkpoint_path,
+                    "it's missing but the output already exists, refusing to overwrite it",
+                )
+            self.compression = self.compression or default_compression()
+            return 0
+
+        with open(self.checkpoint_path, "r", encoding="utf-8") as file:
+            checkpoint = json.load(file)
+
+        if self.compression and self.compression != checkpoint["compression"]:
+            raise InvalidExportCheckpoint(
+                self.checkpoint_path,
+                f'the output is compressed with {checkpoint["compression"]}, not {self.compression}',
+            )
+        if output_size < checkpoint["offset"]:
+            raise InvalidExportCheckpoint(
+                self.checkpoint_path, "the output is shorter than the checkpoint says"
+            )
+
+        self.compression = checkpoint["compression"]
+        self.exported = checkpoint["conversations"]
+        return checkpoint["offset"]
+
+    def save_checkpoint(self, offset: int) -> None:
+        checkpoint = {
+            "compression": self.compression,
+            "offset": offset,
+            "conversations": self.exported,
+        }
+        temporary_path = self.checkpoint_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(checkpoint, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.checkpoint_path)
+
+    def commit(self, writer: CompressedWriter) -> None:
+        self.save_checkpoint(writer.commit())
+        if self.progress_callback is not None:
+            self.progress_callback(self.stats)
+
+    async def fetch(self, summary: ChatSummary) -> bytes:
+        """
+        Fetch the raw JSON of a conversation, without decoding it.
+
+        Raises:
+            BackendError: If the server answered with an error status.
+        """
+        response = await self.chatgpt.retry_request(
+            "fetch",
+            "get",
+            url=self.chatgpt.api_url(f"conversation/{summary.id}"),
+            headers=await self.chatgpt.request_headers(),
+        )
+        self.chatgpt.check_response_status(response)
+        return response.content
+
+    def build_line(self, summary: ChatSummary, body: bytes) -> bytes:
+        # raw line breaks in JSON can only be whitespace between tokens
+        body = body.replace(b"\r", b" ").replace(b"\n", b" ")
+        return b"".join(
+            (
+                b'{"id":',
+                json.dumps(summary.id).encode(),
+                b',"update_time":',
+                json.dumps(summary.update_time).encode(),
+                b',"conversation":',
+                body,
+                b"}\n",
+            )
+        )
+
+    async def run(self) -> dict:
+        """
+        Run the export.
+
+        Returns:
+            dict: Number of conversations "exported" and "skipped" (unchanged), the "failed" IDs mapped to their error and "elapsed" seconds. Failed conversations are retried by the next run.
+        """
+        started_at = time.perf_counter()
+        offset = self.load_checkpoint()
+        writer = CompressedWriter(self.output_path, self.compression, offset)
+
+        summaries = asyncio.Queue(maxsize=self.concurrency * 2)
+        results = asyncio.Queue(maxsize=self.concurrency)
+
+        listing_errors = []
+
+        async def producer():
+            try:
+                async for summary in self.chatgpt.iter_chats(page_size=self.page_size):
+                    if self.exported.get(summary.id) == summary.update_time:
+                        self.stats["skipped"] += 1
+                        continue
+                    await summaries.put(summary)
+            except Exception as e:
+                # finish what's queued, then fail the run
+                listing_errors.append(e)
+            for _ in range(self.concurrency):
+                await summaries.put(None)
+
+        async def worker():
+            while True:
+                summary = await summaries.get()
+                if summary is None:
+                    await results.put(None)
+                    return
+                try:
+                    body = await self.fetch(summary)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    await results.put((summary, None, e))
+                else:
+                    await results.put((summary, body, None))
+
+        tasks = [asyncio.create_task(producer())]
+        tasks += [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            running = self.concurrency
+            uncommitted = 0
+            while running:
+                result = await results.get()
+                if result is None:
+                    running -= 1
+                    continue
+
+                summary, body, error = result
+                if error is not None:
+                    self.stats["failed"][summary.id] = error
+                    continue
+
+                writer.write(self.build_line(summary, body))
+                self.exported[summary.id] = summary.update_time
+                self.stats["exported"] += 1
+                uncommitted += 1
+                if uncommitted >= self.checkpoint_every:
+                    self.commit(writer)
+                    uncommitted = 0
+            if listing_errors:
+                raise listing_errors[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.stats["elapsed"] = time.perf_counter() - started_at
+            self.commit(writer)
+            writer.close()
+
+        return self.stats
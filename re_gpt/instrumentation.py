@@ -0,0 +1,241 @@
+"""
+Lifecycle events of chat() turns, to see where the latency of a turn goes.
+
+    def print_event(event):
+        print(event["event"], round(event["elapsed"], 3), event.get("duration"))
+
+    async with AsyncChatGPT(..., instrumentation_hooks=[print_event]) as chatgpt:
+        ...
+
+Every event is a dict with
+    event:           name of the event, see below
+    turn_id:         shared by the events of one chat() call
+    conversation_id: of the turn, None until the server assigned one
+    time:            time.perf_counter() when the event was emitted
+    wall_time:       time.time() at the same moment
+    elapsed:         seconds since the turn started
+
+Phases are emitted when they end and also carry "duration" in seconds, and
+"error" if they failed:
+    fetch_chat      loading the conversation before the first message
+    build_payload   {"action"}: building the payload, "next", "continue" or "resend"
+    arkose          getting an Arkose token
+    sentinel        getting a chat requirements token
+    post            {"transport", "request_bytes", "status"}: the conversation POST,
+                    over HTTP it lasts until the whole reply was received
+    stream          {"attempt", "bytes", "chunks"}: one streamed reply, from
+                    sending the request to the last chunk
+
+Point events:
+    turn_start      {"model", "prompt_chars"}
+    cache_hit       the reply is replayed from the response cache
+    first_byte      {"attempt"}: the first chunk of a reply arrived
+    first_delta     the first response was handed to the caller
+    continuation    {"reason", "action"}: the reply is continued after "max_tokens" or
+                    a retried error, with a "continue" payload or by resending it
+    turn_end        {"status", "deltas", "chars", "error"}: status is "complete",
+                    "error" or "abandoned" (the caller stopped iterating)
+
+Hooks are called synchronously on the event loop of the client, with
+SyncChatGPT on its background thread, so they should be quick. A hook that
+raises is logged and skipped, it never changes what chat() does. Without hooks
+chat() gets a shared no-op trace and skips the bookkeeping.
+"""
+import contextlib
+import logging
+import time
+import uuid
+from typing import Callable, Iterable, Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+# fields every event has, the adapters turn the rest into attributes
+EVENT_FIELDS = ("event", "turn_id", "conversation_id", "time", "wall_time", "elapsed")
+
+
+class TurnTrace:
+    """
+    Emits the events of one chat() turn, see Instrumentation.start_turn.
+    """
+
+    enabled = True
+
+    def __init__(self, instrumentation, conversation):
+        self.instrumentation = instrumentation
+        self.conversation = conversation
+        self.turn_id = str(uuid.uuid4())
+        self.started_at = time.perf_counter()
+
+    def emit(self, event: str, **fields) -> None:
+        now = time.perf_counter()
+        self.instrumentation.emit(
+            {
+                "event": event,
+                "turn_id": self.turn_id,
+                "conversation_id": self.conversation.conversation_id,
+                "time": now,
+                "wall_time": time.time(),
+                "elapsed": now - self.started_at,
+                **fields,
+            }
+        )
+
+    @contextlib.contextmanager
+    def phase(self, name: str, **fields):
+        """
+        Time the body as the phase `name`, emitted when it ends.
+
+        Yields:
+            dict: The fields of the event, for sizes only known at the end.
+        """
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            fields["error"] = repr(e)
+            raise
+        finally:
+            self.emit(name, duration=time.perf_counter() - start, **fields)
+
+
+class NullTrace:
+    """
+    The trace of turns nobody listens to, every method does nothing.
+    """
+
+    enabled = False
+    null_phase = contextlib.nullcontext({})
+
+    def emit(self, event: str, **fields) -> None:
+        pass
+
+    def phase(self, name: str, **fields):
+        return self.null_phase
+
+
+NULL_TRACE = NullTrace()
+
+
+class Instrumentation:
+    def __init__(self, hooks: Optional[Iterable[Callable[[dict], None]]] = None):
+        """
+        Event bus of the turn lifecycle events, see the module docstring.
+
+        Args:
+            hooks (Optional[Iterable[Callable[[dict], None]]]): Called with every event. Defaults to None.
+        """
+        self.hooks = list(hooks or ())
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.hooks)
+
+    def subscribe(self, hook: Callable[[dict], None]) -> None:
+        """
+        Call `hook` with every event from now on, turns already running included.
+        """
+        self.hooks.append(hook)
+
+    def unsubscribe(self, hook: Callable[[dict], None]) -> None:
+        self.hooks.remove(hook)
+
+    def start_turn(self, conversation, **fields):
+        """
+        Start the trace of a chat() turn and emit its turn_start event.
+
+        Args:
+            conversation (AsyncConversation): The conversation of the turn.
+            **fields: Fields of the turn_start event.
+
+        Returns:
+            Union[TurnTrace, NullTrace]: The trace, a shared no-op one without hooks.
+        """
+        if not self.hooks:
+            return NULL_TRACE
+
+        trace = TurnTrace(self, conversation)
+        trace.emit("turn_start", **fields)
+        return trace
+
+    def emit(self, event: dict) -> None:
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception:
+                logger.exception("Instrumentation hook %r failed on %s", hook, event["event"])
+
+
+def to_ns(wall_time: float) -> int:
+    return int(wall_time * 1e9)
+
+
+class OpenTelemetryHook:
+    def __init__(self, tracer=None):
+        """
+        Instrumentation hook recording every chat() turn as an OpenTelemetry
+        span named "re_gpt.chat", with a child span per phase and the point
+        events as span events.
+
+            chatgpt.instrumentation.subscribe(OpenTelemetryHook())
+
+        Args:
+            tracer (Optional[opentelemetry.trace.Tracer]): Tracer of the spans. Defaults to the "re_gpt" tracer of the global provider.
+
+        Raises:
+            ImportError: If opentelemetry-api isn't installed.
+        """
+        if otel_trace is None:
+            raise ImportError('The OpenTelemetry adapter needs the "opentelemetry-api" package.')
+
+        self.tracer = tracer if tracer is not None else otel_trace.get_tracer("re_gpt")
+        self.spans = {}
+
+    @staticmethod
+    def attributes(event: dict) -> dict:
+        attributes = {
+            f"re_gpt.{key}": value
+            for key, value in event.items()
+            if key not in EVENT_FIELDS and key != "duration" and value is not None
+        }
+        if event["conversation_id"] is not None:
+            attributes["re_gpt.conversation_id"] = event["conversation_id"]
+        return attributes
+
+    def __call__(self, event: dict) -> None:
+        name = event["event"]
+        if name == "turn_start":
+            self.spans[event["turn_id"]] = self.tracer.start_span(
+                "re_gpt.chat",
+                start_time=to_ns(event["wall_time"]),
+                attributes=self.attributes(event),
+            )
+            return
+
+        span = self.spans.get(event["turn_id"])
+        if span is None:
+            # the hook was subscribed in the middle of the turn
+            return
+
+        if name == "turn_end":
+            del self.spans[event["turn_id"]]
+            span.set_attributes(self.attributes(event))
+            if event["status"] == "error":
+                span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, event.get("error")))
+            span.end(end_time=to_ns(event["wall_time"]))
+        elif "duration" in event:
+            child = self.tracer.start_span(
+                f"re_gpt.{name}",
+                context=otel_trace.set_span_in_context(span),
+                start_time=to_ns(event["wall_time"] - event["duration"]),
+                attributes=self.attributes(event),
+            )
+            if "error" in event:
+                child.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, event["error"]))
+            child.end(end_time=to_ns(event["wall_time"]))
+        else:
+            span.add_event(name, self.attributes(event), timestamp=to_ns(event["wall_time"]))
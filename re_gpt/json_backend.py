@@ -0,0 +1,145 @@
+import json
+from typing import Any, Optional, Union
+
+from .errors import InvalidJSONBackend
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+JSON_BACKENDS = {"json": json.loads}
+if msgspec is not None:
+    JSON_BACKENDS["msgspec"] = msgspec.json.decode
+if orjson is not None:
+    JSON_BACKENDS["orjson"] = orjson.loads
+
+# fastest installed backend first
+backend_name = next(
+    name for name in ("orjson", "msgspec", "json") if name in JSON_BACKENDS
+)
+backend_loads = JSON_BACKENDS[backend_name]
+
+
+def get_json_backend() -> str:
+    """
+    Get the name of the JSON backend in use.
+
+    Returns:
+        str: "orjson", "msgspec" or "json".
+    """
+    return backend_name
+
+
+def set_json_backend(name: str) -> None:
+    """
+    Swap the JSON backend used to decode server responses.
+
+    Args:
+        name (str): "orjson", "msgspec" or "json". The backend has to be installed.
+
+    Raises:
+        InvalidJSONBackend: If the backend is unknown or not installed.
+    """
+    global backend_name, backend_loads
+
+    if name not in JSON_BACKENDS:
+        raise InvalidJSONBackend(name, JSON_BACKENDS)
+
+    backend_name = name
+    backend_loads = JSON_BACKENDS[name]
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Decode JSON with the current backend.
+
+    Args:
+        data (Union[str, bytes]): JSON document.
+
+    Returns:
+        Any: Decoded JSON.
+    """
+    return backend_loads(data)
+
+
+if msgspec is not None:
+
+    class Author(msgspec.Struct):
+        role: Any = None
+
+    class Content(msgspec.Struct):
+        parts: Any = None
+
+    class Metadata(msgspec.Struct):
+        parent_id: Any = None
+        finish_details: Any = None
+
+    class Message(msgspec.Struct):
+        id: Any = None
+        author: Optional[Author] = None
+        content: Optional[Content] = None
+        metadata: Optional[Metadata] = None
+
+    class Event(msgspec.Struct):
+        message: Optional[Message] = None
+        conversation_id: Any = None
+
+    event_decoder = msgspec.json.Decoder(Event)
+
+else:
+    event_decoder = None
+
+
+def decode_event(data: Union[str, bytes]) -> Any:
+    """
+    Decode a conversation event, keeping only the fields chat() reads:
+    message.id, message.author.role, message.content.parts[0],
+    message.metadata.parent_id/finish_details and conversation_id.
+
+    Falls back to a full decode with the current backend when msgspec is not
+    installed or the event does not have the expected shape.
+
+    It pays off when events carry fields chat() never reads, e.g. the
+    citations and content references web search replies repeat in every
+    event: close to 3x faster than orjson there (benchmarks.hot_path,
+    decode_raw_json with citations). On lean events it is no faster than
+    orjson and a bit slower on short replies, but still about twice as fast
+    as the json module.
+
+    Args:
+        data (Union[str, bytes]): JSON document of the event.
+
+    Returns:
+        Any: The decoded event, as a dict with the same layout as the full one.
+    """
+    if event_decoder is None:
+        return backend_loads(data)
+
+    try:
+        event = event_decoder.decode(data)
+    except msgspec.ValidationError:
+        return backend_loads(data)
+
+    decoded_event = {"conversation_id": event.conversation_id}
+    message = event.message
+    if message is None:
+        return decoded_event
+
+    author, content, metadata = message.author, message.content, message.metadata
+    decoded_event["message"] = {
+        "id": message.id,
+        "author": {"role": author.role if author else None},
+        "content": {"parts": content.parts if content and content.parts else [""]},
+        "metadata": {
+            "parent_id": metadata.parent_id if metadata else None,
+            "finish_details": metadata.finish_details if metadata else None,
+        },
+    }
+    return decoded_event
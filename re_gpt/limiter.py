@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from .utils import parse_retry_after
+
+OVERLOAD_STATUS_CODES = (429, 503)
+
+
+class AsyncAdaptiveLimiter:
+    def __init__(
+        self,
+        max_limit: Optional[int] = 64,
+        initial_limit: Optional[int] = None,
+        min_limit: Optional[int] = 1,
+        decrease_factor: Optional[float] = 0.5,
+        decrease_interval: Optional[float] = 1.0,
+    ):
+        """
+        AIMD concurrency limit for one endpoint: every successful request raises
+        the limit by 1/limit (about +1 per round of requests), a 429/503 halves
+        it, and a Retry-After holds back every request until it has passed.
+        Other error statuses, network errors and cancelled requests leave the
+        limit alone. Requests over the limit wait in a FIFO queue.
+
+        Args:
+            max_limit (Optional[int]): Upper bound of the limit. Defaults to 64.
+            initial_limit (Optional[int]): Limit to start with. Defaults to max_limit.
+            min_limit (Optional[int]): Lower bound of the limit. Defaults to 1.
+            decrease_factor (Optional[float]): Factor applied to the limit on overload. Defaults to 0.5.
+            decrease_interval (Optional[float]): Overloads within this many seconds of a decrease count once. Defaults to 1.
+        """
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        if initial_limit is None:
+            initial_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.decrease_factor = decrease_factor
+        self.decrease_interval = decrease_interval
+
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.waiters = deque()
+        self.wake_handle = None
+
+    def has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit) and time.monotonic() >= self.blocked_until
+
+    def record(self, response) -> None:
+        """
+        Adjust the limit from the outcome of a request.
+
+        Args:
+            response: The server response, None if the request failed or was cancelled.
+        """
+        if response is None:
+            # no answer says nothing about the load of the server
+            return
+        if response.status_code not in OVERLOAD_STATUS_CODES:
+            if response.status_code < 400:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            return
+
+        now = time.monotonic()
+        retry_after = parse_retry_after(response.headers.get("retry-after"))
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+        if now - self.last_decrease >= self.decrease_interval:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self.last_decrease = now
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: The current limit, requests in flight, queued requests and for how long Retry-After still holds them back.
+        """
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "blocked_for": max(self.blocked_until - time.monotonic(), 0.0),
+        }
+
+    async def acquire(self) -> None:
+        """
+        Wait for a free slot.
+        """
+        if not self.waiters and self.has_capacity():
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        self.wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was handed over right before the cancellation
+                self.in_flight -= 1
+                self.wake()
+            else:
+                self.waiters.remove(future)
+            raise
+
+    def release(self, response) -> None:
+        """
+        Free a slot and adjust the limit.
+
+        Args:
+            response: The server response, None if the request failed or was cancelled.
+        """
+        self.in_flight -= 1
+        self.record(response)
+        self.wake()
+
+    def wake(self) -> None:
+        delay = self.blocked_until - time.monotonic()
+        if delay > 0:
+            if self.waiters and self.wake_handle is None:
+                self.wake_handle = asyncio.get_running_loop().call_later(
+                    delay, self.wake_after_block
+                )
+            return
+
+        while self.waiters and self.in_flight < int(self.limit):
+            future = self.waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def wake_after_block(self) -> None:
+        self.wake_handle = None
+        self.wake()
@@ -0,0 +1,585 @@
+"""
+Local stand-in for the ChatGPT backend, for offline tests and benchmarks.
+
+    python -m re_gpt.mock_server --port 8800 --token-rate 200 --latency 0.05
+
+Point a client at it with `AsyncChatGPT(base_url="http://127.0.0.1:8800",
+session_token="anything")`. Replies are deterministic, generated from the
+prompt and the seed. Only gpt-3.5 conversations work offline, gpt-4 needs an
+Arkose token from the real service.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import socket
+import time
+import uuid
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+
+WORDS = (
+    "the of and to in is that for it as with was on be by this are or from at an "
+    "which but not have has can will one all there their more about when so what "
+    "model token stream server client request response cache network latency"
+).split()
+
+HTTP_REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+
+def make_access_token(lifetime: float = 3600) -> str:
+    """
+    Returns:
+        str: An unsigned JWT with an "exp" claim, enough for the client's refresh planning.
+    """
+
+    def encode(part: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+
+    header = encode({"alg": "none", "typ": "JWT"})
+    claims = encode({"exp": int(time.time() + lifetime), "sub": "mock-user"})
+    return f"{header}.{claims}.mock"
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers", "body")
+
+    def __init__(self, method: str, target: str, headers: dict, body: bytes):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body) if self.body else {}
+
+
+class MockChatGPTServer:
+    def __init__(
+        self,
+        host: Optional[str] = "127.0.0.1",
+        port: Optional[int] = 8800,
+        websocket_port: Optional[int] = 8801,
+        token_rate: Optional[float] = 200,
+        chunk_tokens: Optional[int] = 1,
+        fragments: Optional[int] = 1,
+        latency: Optional[float] = 0.0,
+        reply_tokens: Optional[int] = 40,
+        max_tokens: Optional[int] = 0,
+        error_rate: Optional[float] = 0.0,
+        error_status: Optional[int] = 429,
+        disconnect_rate: Optional[float] = 0.0,
+        websocket: Optional[bool] = True,
+        conversations: Optional[int] = 0,
+        seed: Optional[int] = 0,
+    ):
+        """
+        Serves the endpoints the clients call: /api/auth/session,
+        backend-api/conversation (cumulative SSE events, over HTTP or the
+        websocket), sentinel/chat-requirements, accounts/check,
+        register-websocket, conversations, conversation/{id} (with ETags) and
+        user_system_messages.
+
+        Args:
+            host (Optional[str]): Interface to listen on. Defaults to "127.0.0.1".
+            port (Optional[int]): HTTP port, 0 picks a free one. Defaults to 8800.
+            websocket_port (Optional[int]): Websocket port, 0 picks a free one. Defaults to 8801.
+            token_rate (Optional[float]): Reply tokens per second, 0 streams as fast as possible. Defaults to 200.
+            chunk_tokens (Optional[int]): Tokens per SSE event. Defaults to 1.
+            fragments (Optional[int]): Separate writes every event is split into, to exercise partial lines. Defaults to 1.
+            latency (Optional[float]): Seconds before every response starts. Defaults to 0.
+            reply_tokens (Optional[int]): Length of every reply in tokens. Defaults to 40.
+            max_tokens (Optional[int]): Tokens after which a reply stops with finish_details "max_tokens" until it's continued, 0 disables it. Defaults to 0.
+            error_rate (Optional[float]): Fraction of conversation requests answered with `error_status`. Defaults to 0.
+            error_status (Optional[int]): Status of injected errors, sent with "Retry-After: 1". Defaults to 429.
+            disconnect_rate (Optional[float]): Fraction of reply streams cut off halfway. Defaults to 0.
+            websocket (Optional[bool]): Advertise the shared websocket feature. Defaults to True.
+            conversations (Optional[int]): Conversations the account starts with. Defaults to 0.
+            seed (Optional[int]): Seed of replies and injected failures. Defaults to 0.
+        """
+        self.host = host
+        self.port = port
+        self.websocket_port = websocket_port
+        self.token_rate = token_rate
+        self.chunk_tokens = max(chunk_tokens, 1)
+        self.fragments = max(fragments, 1)
+        self.latency = latency
+        self.reply_tokens = reply_tokens
+        self.max_tokens = max_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.disconnect_rate = disconnect_rate
+        self.websocket_enabled = websocket
+        self.seed = seed
+
+        self.random = random.Random(seed)
+        self.conversations = {}
+        # reply tokens and how many were sent, per assistant message, for continuations
+        self.replies = {}
+        self.websockets = {}
+        # handle_connection() tasks, cancelled by close()
+        self.connections = set()
+        self.server = None
+        self.websocket_server = None
+        self.stats = {"requests": 0, "conversation_requests": 0, "errors": 0, "disconnects": 0}
+
+        for index in range(conversations):
+            self.seed_conversation(index)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        if self.websocket_enabled:
+            self.websocket_server = await websockets.serve(
+                self.handle_websocket, self.host, self.websocket_port
+            )
+            self.websocket_port = next(iter(self.websocket_server.sockets)).getsockname()[1]
+
+    async def close(self) -> None:
+        if self.websocket_server is not None:
+            self.websocket_server.close()
+            await self.websocket_server.wait_closed()
+        if self.server is not None:
+            self.server.close()
+            # kept-alive client connections would hold wait_closed() forever
+            for task in self.connections:
+                task.cancel()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    # conversations
+
+    def reply_text(self, prompt: str, length: int) -> list:
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode()).digest()
+        words = random.Random(digest).choices(WORDS, k=length)
+        return [(" " if index else "") + word for index, word in enumerate(words)]
+
+    def add_node(self, conversation: dict, parent_id: Optional[str], role: str, text: str, node_id: Optional[str] = None) -> str:
+        node_id = node_id or str(uuid.uuid4())
+        mapping = conversation["mapping"]
+        if parent_id not in mapping:
+            parent_id = conversation["root"]
+        mapping[parent_id]["children"].append(node_id)
+        mapping[node_id] = {
+            "id": node_id,
+            "parent": parent_id,
+            "children": [],
+            "message": {
+                "id": node_id,
+                "author": {"role": role},
+                "create_time": time.time(),
+                "content": {"content_type": "text", "parts": [text]},
+                "status": "finished_successfully",
+                "metadata": {"model_slug": "text-davinci-002-render-sha"}
+                if role == "assistant"
+                else {},
+            },
+        }
+        conversation["current_node"] = node_id
+        conversation["update_time"] = time.time()
+        return node_id
+
+    def create_conversation(self, title: str, create_time: Optional[float] = None) -> dict:
+        root = str(uuid.uuid4())
+        conversation_id = str(uuid.uuid4())
+        create_time = create_time or time.time()
+        conversation = {
+            "conversation_id": conversation_id,
+            "title": title,
+            "create_time": create_time,
+            "update_time": create_time,
+            "mapping": {root: {"id": root, "parent": None, "children": [], "message": None}},
+            "current_node": root,
+            "root": root,
+            "is_visible": True,
+        }
+        self.conversations[conversation_id] = conversation
+        return conversation
+
+    def seed_conversation(self, index: int) -> None:
+        conversation = self.create_conversation(
+            f"Conversation {index}", create_time=time.time() - 3600 * (index + 1)
+        )
+        prompt = f"seeded prompt {index}"
+        user_id = self.add_node(conversation, None, "user", prompt)
+        self.add_node(
+            conversation, user_id, "assistant", "".join(self.reply_text(prompt, self.reply_tokens))
+        )
+        conversation["update_time"] = conversation["create_time"]
+
+    def conversation_json(self, conversation: dict) -> dict:
+        return {
+            key: value
+            for key, value in conversation.items()
+            if key not in ("root", "is_visible")
+        }
+
+    # HTTP
+
+    async def handle_connection(self, reader, writer) -> None:
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                request = await self.read_request(reader, writer)
+                if request is None:
+                    break
+                self.stats["requests"] += 1
+                keep_alive = await self.dispatch(request, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # the server is closing. Before Python 3.12 the done callback of
+            # asyncio.start_server reports a cancelled handler as an error
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    async def read_request(self, reader, writer) -> Optional[Request]:
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        return Request(method, target, headers, body)
+
+    async def send(self, writer, status: int, body=b"", headers: Optional[dict] = None) -> None:
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        head = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Unknown')}"]
+        headers = {"Content-Type": "application/json", **(headers or {})}
+        headers["Content-Length"] = str(len(body))
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    async def dispatch(self, request: Request, writer) -> bool:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        path = request.path
+        if path == "/api/auth/session":
+            await self.send(writer, 200, {"accessToken": make_access_token(), "user": {"id": "mock-user"}})
+            return True
+        if not path.startswith("/backend-api/"):
+            await self.send(writer, 404, {"detail": "Not found"})
+            return True
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            await self.send(writer, 401, {"detail": "Unauthorized"})
+            return True
+
+        endpoint = path[len("/backend-api/"):]
+        if endpoint == "conversation" and request.method == "POST":
+            return await self.handle_conversation(request, writer)
+        if endpoint == "sentinel/chat-requirements":
+            await self.send(writer, 200, {"token": f"mock-sentinel-{uuid.uuid4()}", "arkose": {"required": False}})
+        elif endpoint.startswith("accounts/check"):
+            features = ["shared_websocket"] if self.websocket_enabled else []
+            await self.send(writer, 200, {"account_ordering": ["mock-account"], "accounts": {"mock-account": {"features": features}}})
+        elif endpoint == "register-websocket":
+            access_token = uuid.uuid4().hex
+            await self.send(writer, 200, {"wss_url": f"ws://{self.host}:{self.websocket_port}/?access_token={access_token}"})
+        elif endpoint == "conversations":
+            await self.handle_conversation_list(request, writer)
+        elif endpoint.startswith("conversation/"):
+            await self.handle_conversation_item(request, writer, endpoint[len("conversation/"):])
+        elif endpoint == "user_system_messages":
+            await self.send(writer, 200, request.json())
+        else:
+            await self.send(writer, 404, {"detail": "Not found"})
+        return True
+
+    async def handle_conversation_list(self, request: Request, writer) -> None:
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", 28))
+        visible = sorted(
+            (conversation for conversation in self.conversations.values() if conversation["is_visible"]),
+            key=lambda conversation: conversation["update_time"],
+            reverse=True,
+        )
+        items = [
+            {
+                "id": conversation["conversation_id"],
+                "title": conversation["title"],
+                "create_time": conversation["create_time"],
+                "update_time": conversation["update_time"],
+                "mapping": None,
+                "current_node": None,
+            }
+            for conversation in visible[offset : offset + limit]
+        ]
+        await self.send(writer, 200, {"items": items, "total": len(visible), "limit": limit, "offset": offset, "has_missing_conversations": False})
+
+    async def handle_conversation_item(self, request: Request, writer, conversation_id: str) -> None:
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None or not conversation["is_visible"]:
+            await self.send(writer, 404, {"detail": "Can't load conversation"})
+            return
+
+        if request.method == "PATCH":
+            conversation.update(request.json())
+            await self.send(writer, 200, {"success": True})
+            return
+
+        etag = f'"{conversation_id}-{conversation["update_time"]}"'
+        if request.headers.get("if-none-match") == etag:
+            await self.send(writer, 304, b"", {"ETag": etag})
+            return
+        await self.send(writer, 200, self.conversation_json(conversation), {"ETag": etag})
+
+    # generation
+
+    def build_event(self, conversation: dict, message_id: str, parent_id: str, text: str, finish_type: Optional[str]) -> bytes:
+        event = {
+            "message": {
+                "id": message_id,
+                "author": {"role": "assistant"},
+                "content": {"content_type": "text", "parts": [text]},
+                "status": "finished_successfully" if finish_type else "in_progress",
+                "end_turn": finish_type == "stop" if finish_type else None,
+                "metadata": {
+                    "parent_id": parent_id,
+                    "model_slug": "text-davinci-002-render-sha",
+                    "finish_details": {"type": finish_type} if finish_type else None,
+                },
+            },
+            "conversation_id": conversation["conversation_id"],
+            "error": None,
+        }
+        return f"data: {json.dumps(event)}\n\n".encode()
+
+    def plan_reply(self, payload: dict):
+        """
+        Apply the request to the conversation and plan the reply.
+
+        Returns:
+            The conversation, the assistant message ID, its parent ID, the tokens already sent and the tokens of the whole reply.
+        """
+        conversation = self.conversations.get(payload.get("conversation_id") or "")
+        if conversation is None:
+            conversation = self.create_conversation("New chat")
+
+        if payload.get("action") == "continue":
+            message_id = payload["parent_message_id"]
+            node = conversation["mapping"].get(message_id)
+            if message_id in self.replies:
+                reply = self.replies[message_id]
+                return conversation, message_id, node["parent"], reply["sent"], reply["tokens"]
+
+        prompt = payload["messages"][0]["content"]["parts"][0]
+        if conversation["title"] == "New chat":
+            conversation["title"] = prompt[:40]
+        user_id = self.add_node(
+            conversation,
+            payload.get("parent_message_id"),
+            "user",
+            prompt,
+            payload["messages"][0].get("id"),
+        )
+        tokens = self.reply_text(prompt, self.reply_tokens)
+        message_id = self.add_node(conversation, user_id, "assistant", "")
+        return conversation, message_id, user_id, 0, tokens
+
+    async def generate(self, payload: dict, emit) -> bool:
+        """
+        Stream a reply through `emit(bytes)`.
+
+        Returns:
+            bool: False if the stream was cut off on purpose.
+        """
+        conversation, message_id, parent_id, sent, tokens = self.plan_reply(payload)
+        node = conversation["mapping"][message_id]
+        reply = self.replies[message_id] = {"tokens": tokens, "sent": sent}
+
+        end = len(tokens)
+        finish_type = "stop"
+        if self.max_tokens and end - sent > self.max_tokens:
+            end = sent + self.max_tokens
+            finish_type = "max_tokens"
+        cut_at = None
+        if self.disconnect_rate and self.random.random() < self.disconnect_rate:
+            cut_at = sent + max((end - sent) // 2, 1)
+
+        delay = self.chunk_tokens / self.token_rate if self.token_rate else 0
+        position = sent
+        while position < end:
+            position = min(position + self.chunk_tokens, end)
+            if cut_at is not None and position >= cut_at:
+                self.stats["disconnects"] += 1
+                return False
+            text = "".join(tokens[:position])
+            node["message"]["content"]["parts"] = [text]
+            reply["sent"] = position
+            await emit(self.build_event(conversation, message_id, parent_id, text, finish_type if position == end else None))
+            if delay:
+                await asyncio.sleep(delay)
+
+        if end == sent:
+            text = "".join(tokens[:end])
+            await emit(self.build_event(conversation, message_id, parent_id, text, finish_type))
+        conversation["update_time"] = time.time()
+        await emit(b"data: [DONE]\n\n")
+        return True
+
+    async def handle_conversation(self, request: Request, writer) -> bool:
+        self.stats["conversation_requests"] += 1
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            await self.send(writer, self.error_status, {"detail": "Injected error"}, {"Retry-After": "1"})
+            return True
+
+        payload = request.json()
+        websocket_request_id = payload.get("websocket_request_id")
+        if websocket_request_id and self.websockets:
+            websocket = next(reversed(self.websockets.values()))
+            conversation_id = payload.get("conversation_id")
+            await self.send(writer, 200, {"websocket_request_id": websocket_request_id, "conversation_id": conversation_id})
+            asyncio.create_task(self.stream_websocket(websocket, websocket_request_id, payload))
+            return True
+
+        head = (
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/event-stream; charset=utf-8\r\n"
+            "Transfer-Encoding: chunked\r\n"
+            "Cache-Control: no-cache\r\n\r\n"
+        )
+        writer.write(head.encode())
+
+        async def emit(data: bytes) -> None:
+            for fragment in self.split(data):
+                writer.write(b"%x\r\n%s\r\n" % (len(fragment), fragment))
+                await writer.drain()
+
+        if not await self.generate(payload, emit):
+            # cut off without the terminating chunk, the client sees a broken stream
+            return False
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return True
+
+    def split(self, data: bytes) -> list:
+        if self.fragments == 1 or len(data) < self.fragments:
+            return [data]
+        cuts = sorted(self.random.sample(range(1, len(data)), self.fragments - 1))
+        return [data[start:end] for start, end in zip([0] + cuts, cuts + [len(data)])]
+
+    # websocket
+
+    async def handle_websocket(self, websocket, path: Optional[str] = None) -> None:
+        key = id(websocket)
+        self.websockets[key] = websocket
+        try:
+            await websocket.wait_closed()
+        finally:
+            self.websockets.pop(key, None)
+
+    async def stream_websocket(self, websocket, websocket_request_id: str, payload: dict) -> None:
+        async def emit(data: bytes) -> None:
+            message = {
+                "websocket_request_id": websocket_request_id,
+                "body": base64.b64encode(data).decode(),
+            }
+            await websocket.send(json.dumps(message))
+
+        try:
+            if not await self.generate(payload, emit):
+                await websocket.close()
+        except websockets.ConnectionClosed:
+            pass
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m re_gpt.mock_server",
+        description="Local stand-in for the ChatGPT backend.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--websocket-port", type=int, default=8801)
+    parser.add_argument("--token-rate", type=float, default=200, help="reply tokens per second, 0 for unthrottled")
+    parser.add_argument("--chunk-tokens", type=int, default=1, help="tokens per SSE event")
+    parser.add_argument("--fragments", type=int, default=1, help="writes every event is split into")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before every response")
+    parser.add_argument("--reply-tokens", type=int, default=40)
+    parser.add_argument("--max-tokens", type=int, default=0, help="cut replies with max_tokens after this many tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--no-websocket", action="store_true")
+    parser.add_argument("--conversations", type=int, default=0, help="conversations the account starts with")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+async def serve(args: argparse.Namespace) -> None:
+    server = MockChatGPTServer(
+        host=args.host,
+        port=args.port,
+        websocket_port=args.websocket_port,
+        token_rate=args.token_rate,
+        chunk_tokens=args.chunk_tokens,
+        fragments=args.fragments,
+        latency=args.latency,
+        reply_tokens=args.reply_tokens,
+        max_tokens=args.max_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        disconnect_rate=args.disconnect_rate,
+        websocket=not args.no_websocket,
+        conversations=args.conversations,
+        seed=args.seed,
+    )
+    async with server:
+        print(f"Mock ChatGPT backend on {server.url}", flush=True)
+        await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(build_parser().parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,248 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from .async_chatgpt import MODELS, AsyncChatGPT, AsyncConversation
+from .errors import (
+    BackendError,
+    InvalidModelName,
+    InvalidSessionToken,
+    NoAvailableAccount,
+    UnexpectedResponseError,
+    UnknownPoolConversation,
+)
+
+RATE_LIMIT_STATUS_CODES = (429,)
+AUTH_FAILURE_STATUS_CODES = (401, 403)
+
+
+class PoolAccount:
+    __slots__ = (
+        "index",
+        "client",
+        "entered",
+        "active_chats",
+        "total_chats",
+        "conversations",
+        "failures",
+        "disabled_until",
+        "disabled_reason",
+    )
+
+    def __init__(self, index: int, client: AsyncChatGPT):
+        self.index = index
+        self.client = client
+        self.entered = False
+        self.active_chats = 0
+        self.total_chats = 0
+        # conversations pinned to the account, started or not
+        self.conversations = 0
+        self.failures = 0
+        self.disabled_until = 0.0
+        self.disabled_reason = None
+
+    def is_available(self, now: float) -> bool:
+        return self.disabled_until <= now
+
+
+class AsyncPoolConversation(AsyncConversation):
+    def __init__(self, pool, account: PoolAccount, conversation_id=None, model=None):
+        super().__init__(account.client, conversation_id, model)
+        self.pool = pool
+        self.account = account
+
+    async def chat(self, user_input: str):
+        """
+        Chat through the account owning the conversation, see AsyncConversation.chat.
+        """
+        self.account.active_chats += 1
+        self.account.total_chats += 1
+        try:
+            async for message in super().chat(user_input):
+                self.pool.conversation_owners[message["conversation_id"]] = self.account
+                yield message
+        except Exception as e:
+            # account-level errors like InvalidSessionToken can come from before the request too
+            self.pool.report_error(
+                self.account,
+                e.original_exception if isinstance(e, UnexpectedResponseError) else e,
+            )
+            raise
+        finally:
+            self.account.active_chats -= 1
+
+
+class AsyncChatGPTPool:
+    def __init__(
+        self,
+        accounts: List[dict],
+        cooldown: Optional[float] = 300,
+        **client_options,
+    ):
+        """
+        Spreads conversations over many accounts. Every account gets its own
+        AsyncChatGPT client (and so its own session and token caches), new
+        conversations go to the available account with the fewest running chats,
+        then the fewest conversations, and existing ones always go back to the
+        account that owns them. Accounts that get rate limited or fail to
+        authenticate are left out for `cooldown` seconds.
+
+        Args:
+            accounts (List[dict]): AsyncChatGPT arguments of every account, e.g. {"session_token": ...}.
+            cooldown (Optional[float]): Seconds a failing account is left out for. Defaults to 300.
+            **client_options: AsyncChatGPT arguments shared by every account.
+        """
+        self.cooldown = cooldown
+        self.accounts = [
+            PoolAccount(index, AsyncChatGPT(**{**client_options, **account}))
+            for index, account in enumerate(accounts)
+        ]
+        self.conversation_owners = {}
+
+    async def __aenter__(self):
+        await asyncio.gather(*(self.enter_account(account) for account in self.accounts))
+        return self
+
+    async def __aexit__(self, *_):
+        await asyncio.gather(
+            *(
+                account.client.__aexit__(None, None, None)
+                for account in self.accounts
+                if account.entered
+            ),
+            return_exceptions=True,
+        )
+
+    async def enter_account(self, account: PoolAccount) -> bool:
+        if account.entered:
+            await account.client.__aexit__(None, None, None)
+            account.entered = False
+
+        try:
+            await account.client.__aenter__()
+        except Exception as e:
+            if account.client.session is not None:
+                await account.client.close_session()
+            self.disable(account, f"startup failed: {e!r}")
+            return False
+
+        account.entered = True
+        return True
+
+    def disable(self, account: PoolAccount, reason: str) -> None:
+        account.failures += 1
+        account.disabled_until = time.monotonic() + self.cooldown
+        account.disabled_reason = reason
+
+    def report_error(self, account: PoolAccount, error: Exception) -> None:
+        """
+        Leave an account out of rotation if the error shows it's rate limited or
+        its tokens stopped working.
+
+        Args:
+            account (PoolAccount): The account the error happened on.
+            error (Exception): The error.
+        """
+        if isinstance(error, InvalidSessionToken):
+            self.disable(account, "invalid session token")
+        elif isinstance(error, BackendError):
+            if error.error_code in RATE_LIMIT_STATUS_CODES:
+                self.disable(account, "rate limited")
+            elif error.error_code in AUTH_FAILURE_STATUS_CODES:
+                self.disable(account, "authentication failed")
+                if account.client.session_token:
+                    # get a new access token when it's back
+                    account.client.reset_auth_token()
+
+    async def pick_account(self) -> PoolAccount:
+        now = time.monotonic()
+        available = [account for account in self.accounts if account.is_available(now)]
+        if not available:
+            retry_in = min(account.disabled_until for account in self.accounts) - now
+            raise NoAvailableAccount(retry_in)
+
+        for account in sorted(
+            available, key=lambda account: (account.active_chats, account.conversations)
+        ):
+            if account.entered:
+                return account
+            # its startup failed, try again now that the cooldown is over
+            if await self.enter_account(account):
+                return account
+
+        raise NoAvailableAccount(self.cooldown)
+
+    async def create_new_conversation(
+        self, model: Optional[str] = "gpt-3.5"
+    ) -> AsyncPoolConversation:
+        """
+        Start a conversation on the least loaded available account.
+
+        Args:
+            model (Optional[str]): Model of the conversation. Defaults to "gpt-3.5".
+
+        Returns:
+            AsyncPoolConversation: Conversation object.
+        """
+        if model not in MODELS:
+            raise InvalidModelName(model, MODELS)
+        account = await self.pick_account()
+        account.conversations += 1
+        return AsyncPoolConversation(self, account, model=model)
+
+    async def get_conversation(
+        self, conversation_id: str, account: Optional[int] = None
+    ) -> AsyncPoolConversation:
+        """
+        Get a conversation on the account that owns it. Conversations started
+        through the pool are known, others need the index of their account.
+
+        Args:
+            conversation_id (str): The ID of the conversation to fetch.
+            account (Optional[int]): Index of the owning account, required for conversations the pool hasn't seen.
+
+        Returns:
+            AsyncPoolConversation: Conversation object.
+
+        Raises:
+            UnknownPoolConversation: If the pool hasn't seen the conversation and no account was given.
+            ValueError: If there's no account with the given index.
+        """
+        if account is not None and not 0 <= account < len(self.accounts):
+            raise ValueError(
+                f"There is no account {account}, the pool has {len(self.accounts)} accounts."
+            )
+        owner = self.conversation_owners.get(conversation_id)
+        if owner is None:
+            if account is None:
+                # another account would answer with a 404
+                raise UnknownPoolConversation(conversation_id)
+            owner = self.accounts[account]
+            owner.conversations += 1
+            self.conversation_owners[conversation_id] = owner
+        return AsyncPoolConversation(self, owner, conversation_id)
+
+    def stats(self) -> List[dict]:
+        """
+        Report the load and health of every account.
+
+        Returns:
+            List[dict]: One dict per account.
+        """
+        now = time.monotonic()
+        return [
+            {
+                "account": account.index,
+                "available": account.is_available(now) and account.entered,
+                "active_chats": account.active_chats,
+                "total_chats": account.total_chats,
+                "conversations": account.conversations,
+                "failures": account.failures,
+                "disabled_for": max(account.disabled_until - now, 0.0),
+                "limiters": account.client.limiter_stats(),
+                "disabled_reason": account.disabled_reason
+                if not account.is_available(now)
+                else None,
+            }
+            for account in self.accounts
+        ]
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt for the cache key: Unicode NFC, whitespace runs
+    collapsed to one space, leading and trailing whitespace removed.
+    """
+    return " ".join(unicodedata.normalize("NFC", prompt).split())
+
+
+def response_cache_key(model: str, prompt: str, context: Optional[str] = None) -> str:
+    """
+    Args:
+        model (str): Name of the model, e.g. "gpt-3.5".
+        prompt (str): The user's input message.
+        context (Optional[str]): Where in a conversation the prompt is sent, None for a new conversation.
+
+    Returns:
+        str: Hex digest identifying the request.
+    """
+    key = json.dumps([model, normalize_prompt(prompt), context], ensure_ascii=False)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class MemoryResponseCache:
+    # get() and put() are called on the event loop
+    blocking = False
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = 1024,
+        ttl: Optional[float] = None,
+        replay_speed: Optional[float] = None,
+    ):
+        """
+        In-memory LRU cache of chat() responses, see AsyncChatGPT's
+        `response_cache` option.
+
+        Args:
+            max_entries (Optional[int]): Number of responses kept. Defaults to 1024.
+            ttl (Optional[float]): Seconds a response stays valid, None for no expiry. Defaults to None.
+            replay_speed (Optional[float]): Replay hits with the recorded pauses between chunks divided by this (1.0 is the recorded speed), None replays at once. Defaults to None.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.replay_speed = replay_speed
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Args:
+            key (str): Key from response_cache_key().
+
+        Returns:
+            Optional[dict]: The recording, None on a miss.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            stored_at, recording = entry
+            if self.ttl is None or time.time() - stored_at < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return recording
+            del self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, recording: dict) -> None:
+        """
+        Args:
+            key (str): Key from response_cache_key().
+            recording (dict): {"chunks": [[delay, response], ...], "conversation_id", "parent_id"}.
+        """
+        self.entries[key] = (time.time(), recording)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+class DiskResponseCache:
+    # get() and put() commit to SQLite, the client calls them in a worker thread
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: Optional[int] = 256 * 1024 * 1024,
+        ttl: Optional[float] = None,
+        replay_speed: Optional[float] = None,
+    ):
+        """
+        On-disk cache of chat() responses in an SQLite file, shared by every
+        process pointed at it. Least recently used responses are evicted
+        beyond `max_bytes`. It can be used from any thread, calls are serialized.
+
+        Args:
+            path (str): Path of the database file.
+            max_bytes (Optional[int]): Upper bound of the summed size of the stored responses. Defaults to 256 MB.
+            ttl (Optional[float]): Seconds a response stays valid, None for no expiry. Defaults to None.
+            replay_speed (Optional[float]): Replay hits with the recorded pauses between chunks divided by this (1.0 is the recorded speed), None replays at once. Defaults to None.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.replay_speed = replay_speed
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, recording BLOB NOT NULL, size INTEGER NOT NULL, "
+            "stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)"
+        )
+        self.connection.commit()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Args:
+            key (str): Key from response_cache_key().
+
+        Returns:
+            Optional[dict]: The recording, None on a miss.
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT recording, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] >= self.ttl:
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.connection.execute(
+                "UPDATE responses SET used_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, recording: dict) -> None:
+        """
+        Args:
+            key (str): Key from response_cache_key().
+            recording (dict): {"chunks": [[delay, response], ...], "conversation_id", "parent_id"}.
+        """
+        data = json.dumps(recording).encode()
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, recording, size, stored_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now),
+            )
+            self.evict()
+
+    def evict(self) -> None:
+        if self.ttl is not None:
+            self.connection.execute(
+                "DELETE FROM responses WHERE stored_at <= ?", (time.time() - self.ttl,)
+            )
+        (total,) = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+
+        rows = self.connection.execute(
+            "SELECT key, size FROM responses ORDER BY used_at"
+        )
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries, size = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "size": size}
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Optional, Tuple
+
+from curl_cffi import CurlError
+
+from .errors import BackendError, IncompleteStreamError
+from .utils import backoff_delay, parse_retry_after
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_retries: Optional[int] = 3,
+        base_delay: Optional[float] = 0.5,
+        max_delay: Optional[float] = 8.0,
+        retry_status_codes: Optional[Tuple[int, ...]] = RETRY_STATUS_CODES,
+    ):
+        """
+        When and how long to wait before retrying a request. Delays grow
+        exponentially with jitter, a Retry-After sent by the server wins.
+
+        Args:
+            max_retries (Optional[int]): Retries after the first attempt, 0 disables retrying. Defaults to 3.
+            base_delay (Optional[float]): Delay after the first failure. Defaults to 0.5.
+            max_delay (Optional[float]): Upper bound of the delay. Defaults to 8.
+            retry_status_codes (Optional[Tuple[int, ...]]): Status codes worth retrying. Defaults to 429 and 5xx gateway errors.
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_status_codes = retry_status_codes
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Check whether an error is transient.
+
+        Args:
+            error (Exception): The error.
+
+        Returns:
+            bool: True for network errors, timeouts, cut off streams and retryable status codes.
+        """
+        if isinstance(error, BackendError):
+            return error.error_code in self.retry_status_codes
+        return isinstance(
+            error,
+            (
+                CurlError,
+                ConnectionError,
+                TimeoutError,
+                asyncio.TimeoutError,
+                IncompleteStreamError,
+            ),
+        )
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        """
+        Args:
+            error (Exception): The error of the failed attempt.
+            attempt (int): Number of the failed attempt, starting at 0.
+
+        Returns:
+            bool: True if another attempt should be made.
+        """
+        return attempt < self.max_retries and self.is_retryable(error)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Args:
+            attempt (int): Number of the failed attempt, starting at 0.
+            retry_after (Optional[float]): Seconds the server asked to wait.
+
+        Returns:
+            float: Seconds to wait before the next attempt.
+        """
+        if retry_after is not None:
+            return retry_after
+        return backoff_delay(attempt, self.base_delay, self.max_delay)
+
+    def error_delay(self, error: Exception, attempt: int) -> float:
+        return self.delay(attempt, getattr(error, "retry_after", None))
+
+    def response_delay(self, response, attempt: int) -> float:
+        return self.delay(
+            attempt, parse_retry_after(response.headers.get("retry-after"))
+        )
@@ -0,0 +1,255 @@
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Tuple, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    conversation_id TEXT PRIMARY KEY,
+    update_time TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    rowid INTEGER PRIMARY KEY,
+    conversation_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    role TEXT,
+    UNIQUE (conversation_id, message_id)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS message_text USING fts5(
+    content, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def message_text(message: Optional[dict]) -> str:
+    """
+    Args:
+        message (Optional[dict]): A message of a conversation mapping.
+
+    Returns:
+        str: Its text, empty for messages without any (images, tool calls, system messages).
+    """
+    if not message:
+        return ""
+    content = message.get("content") or {}
+    parts = content.get("parts")
+    if parts:
+        return "\n".join(part for part in parts if isinstance(part, str))
+    text = content.get("text")
+    return text if isinstance(text, str) else ""
+
+
+def normalize_update_time(update_time: Optional[Union[str, float]]) -> Optional[str]:
+    # stored as text, so float and ISO update times compare the same way
+    return None if update_time is None else str(update_time)
+
+
+class SearchResult:
+    __slots__ = ("conversation_id", "message_id", "role", "snippet")
+
+    def __init__(self, conversation_id: str, message_id: str, role: Optional[str], snippet: str):
+        self.conversation_id = conversation_id
+        self.message_id = message_id
+        self.role = role
+        self.snippet = snippet
+
+    def __repr__(self) -> str:
+        return (
+            f"SearchResult(conversation_id={self.conversation_id!r}, "
+            f"message_id={self.message_id!r}, snippet={self.snippet!r})"
+        )
+
+
+class ConversationIndex:
+    def __init__(self, path: Optional[str] = ":memory:"):
+        """
+        Full-text index of conversation messages, stored in SQLite FTS5.
+        Conversations are (re)indexed as a whole when their update_time
+        changes, and single messages can be added as a conversation goes on.
+        Pass it to AsyncChatGPT/SyncChatGPT as `search_index` to index every
+        fetched chat and every finished turn, and fill it from an export with
+        `index_records(read_export(path))`.
+
+        It can be used from any thread, calls are serialized. The clients
+        write to it through asyncio.to_thread, so commits and FTS inserts
+        don't hold up the event loop.
+
+        Args:
+            path (Optional[str]): Path of the database file. Defaults to an in-memory index.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def is_current(self, conversation_id: str, update_time: Optional[Union[str, float]]) -> bool:
+        """
+        Args:
+            conversation_id (str): The ID of the conversation.
+            update_time (Optional[Union[str, float]]): Its update_time as sent by the backend.
+
+        Returns:
+            bool: True if the conversation is indexed at this update_time.
+        """
+        update_time = normalize_update_time(update_time)
+        if update_time is None:
+            return False
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT update_time FROM conversations WHERE conversation_id = ?",
+                (conversation_id,),
+            ).fetchone()
+        return row is not None and row[0] == update_time
+
+    def delete_messages(self, conversation_id: str) -> None:
+        self.connection.execute(
+            "DELETE FROM message_text WHERE rowid IN "
+            "(SELECT rowid FROM messages WHERE conversation_id = ?)",
+            (conversation_id,),
+        )
+        self.connection.execute(
+            "DELETE FROM messages WHERE conversation_id = ?", (conversation_id,)
+        )
+
+    def insert_message(self, conversation_id: str, message_id: str, role: Optional[str], text: str) -> None:
+        row = self.connection.execute(
+            "SELECT rowid FROM messages WHERE conversation_id = ? AND message_id = ?",
+            (conversation_id, message_id),
+        ).fetchone()
+        if row is not None:
+            self.connection.execute("DELETE FROM message_text WHERE rowid = ?", row)
+            self.connection.execute("DELETE FROM messages WHERE rowid = ?", row)
+
+        rowid = self.connection.execute(
+            "INSERT INTO messages (conversation_id, message_id, role) VALUES (?, ?, ?)",
+            (conversation_id, message_id, role),
+        ).lastrowid
+        self.connection.execute(
+            "INSERT INTO message_text (rowid, content) VALUES (?, ?)", (rowid, text)
+        )
+
+    def index_chat(
+        self,
+        conversation_id: str,
+        chat: dict,
+        update_time: Optional[Union[str, float]] = None,
+    ) -> bool:
+        """
+        Index a conversation, replacing what was indexed for it before.
+
+        Args:
+            conversation_id (str): The ID of the conversation.
+            chat (dict): The chat as returned by fetch_chat().
+            update_time (Optional[Union[str, float]]): Its update_time. Defaults to the chat's.
+
+        Returns:
+            bool: False if the conversation was indexed at this update_time already.
+        """
+        if update_time is None:
+            update_time = chat.get("update_time")
+        if self.is_current(conversation_id, update_time):
+            return False
+
+        with self.lock, self.connection:
+            self.delete_messages(conversation_id)
+            for node_id, node in (chat.get("mapping") or {}).items():
+                message = node.get("message")
+                text = message_text(message)
+                if text:
+                    self.insert_message(
+                        conversation_id,
+                        message.get("id") or node_id,
+                        message["author"]["role"],
+                        text,
+                    )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO conversations (conversation_id, update_time) VALUES (?, ?)",
+                (conversation_id, normalize_update_time(update_time)),
+            )
+        return True
+
+    def index_records(self, records: Iterable[dict]) -> int:
+        """
+        Index the records of an export, see export.read_export.
+
+        Args:
+            records (Iterable[dict]): {"id", "update_time", "conversation"} records.
+
+        Returns:
+            int: Number of conversations (re)indexed, unchanged ones are skipped.
+        """
+        indexed = 0
+        for record in records:
+            if self.index_chat(record["id"], record["conversation"], record.get("update_time")):
+                indexed += 1
+        return indexed
+
+    def add_message(
+        self, conversation_id: str, message_id: str, role: Optional[str], text: str
+    ) -> None:
+        """
+        Index one new (or continued) message of a conversation. The
+        conversation is indexed again as a whole the next time it's fetched.
+
+        Args:
+            conversation_id (str): The ID of the conversation.
+            message_id (str): The ID of the message.
+            role (Optional[str]): Author role of the message.
+            text (str): Text of the message.
+        """
+        self.add_messages(conversation_id, [(message_id, role, text)])
+
+    def add_messages(
+        self, conversation_id: str, messages: Iterable[Tuple[str, Optional[str], str]]
+    ) -> None:
+        """
+        Index new messages of a conversation in one transaction, see add_message.
+
+        Args:
+            conversation_id (str): The ID of the conversation.
+            messages (Iterable[Tuple[str, Optional[str], str]]): (message_id, role, text) of every message.
+        """
+        with self.lock, self.connection:
+            for message_id, role, text in messages:
+                self.insert_message(conversation_id, message_id, role, text)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO conversations (conversation_id, update_time) VALUES (?, NULL)",
+                (conversation_id,),
+            )
+
+    def remove(self, conversation_id: str) -> None:
+        """
+        Drop a conversation from the index.
+
+        Args:
+            conversation_id (str): The ID of the conversation.
+        """
+        with self.lock, self.connection:
+            self.delete_messages(conversation_id)
+            self.connection.execute(
+                "DELETE FROM conversations WHERE conversation_id = ?", (conversation_id,)
+            )
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[SearchResult]:
+        """
+        Find the messages matching a query, best matches first.
+
+        Args:
+            query (str): FTS5 query, e.g. `word`, `"a phrase"`, `pref*` or `a AND b`.
+            limit (Optional[int]): Maximum number of results. Defaults to 20.
+
+        Returns:
+            List[SearchResult]: Conversation ID, message ID, role and a snippet with the matches in [brackets].
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT messages.conversation_id, messages.message_id, messages.role, "
+                "snippet(message_text, 0, '[', ']', '...', 12) "
+                "FROM message_text JOIN messages ON messages.rowid = message_text.rowid "
+                "WHERE message_text MATCH ? ORDER BY rank LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        return [SearchResult(*row) for row in rows]
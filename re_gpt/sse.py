@@ -0,0 +1,80 @@
+import codecs
+from typing import List, Union
+
+
+class SSEDecoder:
+    def __init__(self):
+        """
+        Incremental decoder for a server-sent events stream.
+
+        Raw network chunks can be fed in as they arrive, they may split a line (or a
+        multi-byte UTF-8 character) anywhere. Only the data of complete events is
+        returned, everything else is buffered until the next chunk arrives.
+        """
+        self.utf8_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.pending_line = []
+        self.data_lines = []
+
+    def feed(self, chunk: Union[bytes, str]) -> List[str]:
+        """
+        Feed a chunk of the stream to the decoder.
+
+        Args:
+            chunk (Union[bytes, str]): Raw bytes from the HTTP stream or text from the websocket.
+
+        Returns:
+            List[str]: The data of every event completed by this chunk.
+        """
+        if isinstance(chunk, (bytes, bytearray)):
+            chunk = self.utf8_decoder.decode(chunk)
+
+        if "\n" not in chunk:
+            if chunk:
+                self.pending_line.append(chunk)
+            return []
+
+        lines = chunk.split("\n")
+        if self.pending_line:
+            self.pending_line.append(lines[0])
+            lines[0] = "".join(self.pending_line)
+            self.pending_line = []
+
+        tail = lines.pop()
+        if tail:
+            self.pending_line.append(tail)
+
+        events = []
+        for line in lines:
+            self.process_line(line, events)
+
+        return events
+
+    def flush(self) -> List[str]:
+        """
+        Finish the stream, returning whatever event was left without a terminating blank line.
+
+        Returns:
+            List[str]: The data of the remaining events.
+        """
+        events = self.feed(self.utf8_decoder.decode(b"", final=True))
+        if self.pending_line:
+            line = "".join(self.pending_line)
+            self.pending_line = []
+            self.process_line(line, events)
+        self.process_line("", events)
+
+        return events
+
+    def process_line(self, line: str, events: List[str]) -> None:
+        if line.endswith("\r"):
+            line = line[:-1]
+
+        if not line:
+            if self.data_lines:
+                events.append("\n".join(self.data_lines))
+                self.data_lines = []
+            return
+
+        if line.startswith("data:"):
+            value = line[5:]
+            self.data_lines.append(value[1:] if value.startswith(" ") else value)
@@ -1,41 +1,47 @@
-import ctypes
-import inspect
-import time
-import uuid
-import websockets
-from websockets.exceptions import ConnectionClosed
-import json
-import base64
 import asyncio
-from queue import Queue
+import inspect
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
 from threading import Thread
-from typing import Callable, Generator, Optional
-
-from curl_cffi.requests import Session
-
-from .async_chatgpt import (
-    BACKUP_ARKOSE_TOKEN_GENERATOR,
-    CHATGPT_API,
-    USER_AGENT,
-    AsyncChatGPT,
-    AsyncConversation,
-    MODELS,
-    WS_REGISTER_URL,
-)
-from .errors import (
-    BackendError,
-    InvalidSessionToken,
-    RetryError,
-    TokenNotProvided,
-    UnexpectedResponseError,
-    InvalidModelName,
-)
-from .utils import sync_get_binary_path, get_model_slug
-
-
-class SyncConversation(AsyncConversation):
+from typing import Callable, Generator, Iterable, List, Optional, Union
+
+from .async_chatgpt import BASE_URL, MODELS, AsyncChatGPT, AsyncConversation
+from .batch import SyncChatBatch
+from .chat_list import ChatSummary
+from .errors import InvalidModelName
+from .response_cache import DiskResponseCache, MemoryResponseCache
+from .retry import RetryPolicy
+from .search import ConversationIndex
+
+
+class SyncConversation:
+    # attributes of the wrapper, every other one is set on the wrapped conversation
+    OWN_ATTRIBUTES = ("chatgpt", "conversation")
+
     def __init__(self, chatgpt, conversation_id: Optional[str] = None, model=None):
-        super().__init__(chatgpt, conversation_id, model)
+        """
+        Blocking wrapper of an AsyncConversation, run on the loop of its SyncChatGPT.
+        Attributes like conversation_id, parent_id and model are read from and
+        set on the wrapped conversation.
+
+        Args:
+            chatgpt (SyncChatGPT): The client the conversation belongs to.
+            conversation_id (Optional[str]): The ID of an existing conversation. Defaults to None.
+            model (Optional[str]): Model of the conversation. Defaults to None.
+        """
+        self.chatgpt = chatgpt
+        self.conversation = AsyncConversation(chatgpt.chatgpt, conversation_id, model)
+
+    def __getattr__(self, name):
+        if name == "conversation":
+            raise AttributeError(name)
+        return getattr(self.conversation, name)
+
+    def __setattr__(self, name, value):
+        if name in self.OWN_ATTRIBUTES:
+            super().__setattr__(name, value)
+        else:
+            setattr(self.conversation, name, value)
 
     def fetch_chat(self) -> dict:
         """
@@ -47,28 +53,7 @@ class SyncConversation(AsyncConversation):
         Raises:
             UnexpectedResponseError: If the response is not a valid JSON object or if the response json is not in the expected format
         """
-        if not self.conversation_id:
-            return {}
-
-        url = CHATGPT_API.format(f"conversation/{self.conversation_id}")
-        response = self.chatgpt.session.get(
-            url=url, headers=self.chatgpt.build_request_headers()
-        )
-
-        error = None
-        try:
-            chat = response.json()
-            self.parent_id = list(chat.get("mapping", {}))[-1]
-            model_slug = get_model_slug(chat)
-            self.model = [
-                key for key, value in MODELS.items() if value["slug"] == model_slug
-            ][0]
-        except Exception as e:
-            error = e
-        if error is not None:
-            raise UnexpectedResponseError(error, response.text)
-
-        return chat
+        return self.chatgpt.run(self.conversation.fetch_chat())
 
     def chat(self, user_input: str) -> Generator[dict, None, None]:
         """
@@ -86,256 +71,19 @@ class SyncConversation(AsyncConversation):
         Raises:
             UnexpectedResponseError: If the response is not a valid JSON object or if the response json is not in the expected format
         """
-
-        payload = self.build_message_payload(user_input)
-
-        server_response = (
-            ""  # To store what the server returned for debugging in case of an error
-        )
-        error = None
-        try:
-            full_message = None
-            while True:
-                response = self.send_message(payload=payload) if not self.chatgpt.websocket_mode else self.send_websocket_message(payload=payload)
-                for chunk in response:
-                    decoded_chunk = chunk.decode() if not self.chatgpt.websocket_mode else chunk
-
-                    server_response += decoded_chunk
-                    for line in decoded_chunk.splitlines():
-                        if not line.startswith("data: "):
-                            continue
-
-                        raw_json_data = line[6:]
-                        if not (decoded_json := self.decode_raw_json(raw_json_data)):
-                            continue
-
-                        if (
-                            "message" in decoded_json
-                            and decoded_json["message"]["author"]["role"] == "assistant"
-                        ):
-                            processed_response = self.filter_response(decoded_json)
-                            if full_message:
-                                prev_resp_len = len(
-                                    full_message["message"]["content"]["parts"][0]
-                                )
-                                processed_response["content"] = processed_response[
-                                    "content"
-                                ][prev_resp_len::]
-
-                            yield processed_response
-                            full_message = decoded_json
-                self.conversation_id = full_message["conversation_id"]
-                self.parent_id = full_message["message"]["id"]
-                if (
-                    full_message["message"]["metadata"]["finish_details"]["type"]
-                    == "max_tokens"
-                ):
-                    payload = self.build_message_continuation_payload()
-                else:
-                    break
-        except Exception as e:
-            error = e
-
-        # raising the error outside the 'except' block to prevent the 'During handling of the above exception, another exception occurred' error
-        if error is not None:
-            raise UnexpectedResponseError(error, server_response)
-
-    def send_message(self, payload: dict) -> Generator[bytes, None, None]:
-        """
-        Send a message payload to the server and receive the response.
-
-        Args:
-            payload (dict): Payload containing message information.
-
-        Yields:
-            bytes: Chunk of data received as a response.
-        """
-        response_queue = Queue()
-
-        def perform_request():
-            def content_callback(chunk):
-                response_queue.put(chunk)
-
-            url = CHATGPT_API.format("conversation")
-            headers = self.chatgpt.build_request_headers()
-            # Add Chat Requirements Token
-            chat_requriments_token = self.chatgpt.create_chat_requirements_token()
-            if chat_requriments_token:
-                headers["openai-sentinel-chat-requirements-token"] = chat_requriments_token
-
-            response = self.chatgpt.session.post(
-                url=url,
-                headers=headers,
-                json=payload,
-                content_callback=content_callback,
-            )
-            response_queue.put(None)
-
-        Thread(target=perform_request).start()
-
-        while True:
-            chunk = response_queue.get()
-            if chunk is None:
-                break
-            yield chunk
-    
-    def send_websocket_message(self, payload: dict) -> Generator[str, None, None]:
-        """
-        Send a message payload via WebSocket and receive the response.
-
-        Args:
-            payload (dict): Payload containing message information.
-
-        Yields:
-            str: Chunk of data received as a response.
-        """
-
-        response_queue = Queue()
-        websocket_request_id = None
-
-        def perform_request():
-            nonlocal websocket_request_id
-            
-            url = CHATGPT_API.format("conversation")
-            headers = self.chatgpt.build_request_headers()
-            # Add Chat Requirements Token
-            chat_requriments_token = self.chatgpt.create_chat_requirements_token()
-            if chat_requriments_token:
-                headers["openai-sentinel-chat-requirements-token"] = chat_requriments_token
-
-            response = (self.chatgpt.session.post(
-                url=url,
-                headers=headers,
-                json=payload,
-            )).json()
-
-            websocket_request_id = response.get("websocket_request_id")
-            
-            if websocket_request_id is None:
-                raise UnexpectedResponseError("WebSocket request ID not found in response", response)
-
-            if websocket_request_id not in self.chatgpt.ws_conversation_map:
-                self.chatgpt.ws_conversation_map[websocket_request_id] = response_queue
-            
-        Thread(target=perform_request).start()
-
-        while True:
-            chunk = response_queue.get()
-            if chunk is None:
-                break
-            yield chunk
-
-        del self.chatgpt.ws_conversation_map[websocket_request_id]
-
-    def build_message_payload(self, user_input: str) -> dict:
-        """
-        Build a payload for sending a user message.
-
-        Returns:
-            dict: Payload containing message information.
-        """
-        if self.conversation_id and (self.parent_id is None or self.model is None):
-            self.fetch_chat()  # it will automatically fetch the chat and set the parent id
-
-        payload = {
-            "conversation_mode": {"conversation_mode": {"kind": "primary_assistant"}},
-            "conversation_id": self.conversation_id,
-            "action": "next",
-            "arkose_token": self.arkose_token_generator()
-            if self.chatgpt.generate_arkose_token
-            or MODELS[self.model]["needs_arkose_token"]
-            else None,
-            "force_paragen": False,
-            "history_and_training_disabled": False,
-            "messages": [
-                {
-                    "author": {"role": "user"},
-                    "content": {"content_type": "text", "parts": [user_input]},
-                    "id": str(uuid.uuid4()),
-                    "metadata": {},
-                }
-            ],
-            "model": MODELS[self.model]["slug"],
-            "parent_message_id": str(uuid.uuid4())
-            if not self.parent_id
-            else self.parent_id,
-            "websocket_request_id": str(uuid.uuid4())
-            if self.chatgpt.websocket_mode
-            else None,
-        }
-
-        return payload
-
-    def build_message_continuation_payload(self) -> dict:
-        """
-        Build a payload for continuing ChatGPT's cut off response.
-
-        Returns:
-            dict: Payload containing message information for continuation.
-        """
-        payload = {
-            "conversation_mode": {"conversation_mode": {"kind": "primary_assistant"}},
-            "action": "continue",
-            "arkose_token": self.arkose_token_generator()
-            if self.chatgpt.generate_arkose_token
-            or MODELS[self.model]["needs_arkose_token"]
-            else None,
-            "conversation_id": self.conversation_id,
-            "force_paragen": False,
-            "history_and_training_disabled": False,
-            "model": MODELS[self.model]["slug"],
-            "parent_message_id": self.parent_id,
-            "timezone_offset_min": -300,
-        }
-
-        return payload
-
-    def arkose_token_generator(self) -> str:
-        """
-        Generate an Arkose token.
-
-        Returns:
-            str: Arkose token.
-        """
-        if not self.chatgpt.tried_downloading_binary:
-            self.chatgpt.binary_path = sync_get_binary_path(self.chatgpt.session)
-
-            if self.chatgpt.binary_path:
-                self.chatgpt.arkose = ctypes.CDLL(self.chatgpt.binary_path)
-                self.chatgpt.arkose.GetToken.restype = ctypes.c_char_p
-
-            self.chatgpt.tried_downloading_binary = True
-
-        if self.chatgpt.binary_path:
-            try:
-                result = self.chatgpt.arkose.GetToken()
-                return ctypes.string_at(result).decode("utf-8")
-            except:
-                pass
-
-        for _ in range(5):
-            response = self.chatgpt.session.get(BACKUP_ARKOSE_TOKEN_GENERATOR)
-            if response.text == "null":
-                raise BackendError(error_code=505)
-            try:
-                return response.json()["token"]
-            except:
-                time.sleep(0.7)
-
-        raise RetryError(website=BACKUP_ARKOSE_TOKEN_GENERATOR)
+        return self.chatgpt.iterate(self.conversation.chat(user_input))
 
     def delete(self) -> None:
         """
         Deletes the conversation.
         """
-        if self.conversation_id:
-            self.chatgpt.delete_conversation(self.conversation_id)
+        self.chatgpt.run(self.conversation.delete())
 
-            self.conversation_id = None
-            self.parent_id = None
 
+class SyncChatGPT:
+    # attributes of the wrapper, every other one is set on the wrapped client
+    OWN_ATTRIBUTES = ("exit_callback_function", "loop", "thread", "chatgpt")
 
-class SyncChatGPT(AsyncChatGPT):
     def __init__(
         self,
         proxies: Optional[dict] = None,
@@ -343,56 +91,129 @@ class SyncChatGPT(AsyncChatGPT):
         exit_callback_function: Optional[Callable] = None,
         auth_token: Optional[str] = None,
         websocket_mode: Optional[bool] = False,
+        latest_wins: Optional[bool] = False,
+        typed_decoding: Optional[bool] = False,
+        debug_capture_size: Optional[int] = 64 * 1024,
+        sentinel_token_ttl: Optional[float] = 60,
+        sentinel_token_pool_size: Optional[int] = 0,
+        sentinel_token_max_uses: Optional[int] = 1,
+        arkose_pool_size: Optional[int] = 0,
+        arkose_token_ttl: Optional[float] = 120,
+        arkose_executor: Optional[Executor] = None,
+        auth_token_cache_dir: Optional[str] = None,
+        auth_token_refresh_margin: Optional[float] = 300,
+        arkose_binary_offline: Optional[bool] = False,
+        max_concurrency: Optional[int] = 64,
+        retry_policy: Optional[RetryPolicy] = None,
+        websocket_heartbeat: Optional[float] = 20,
+        websocket_max_reconnects: Optional[int] = 5,
+        websocket_queue_size: Optional[int] = 256,
+        lazy_startup: Optional[bool] = False,
+        conversation_cache_size: Optional[int] = 32 * 1024 * 1024,
+        conversation_cache_ttl: Optional[float] = 300,
+        search_index: Optional[ConversationIndex] = None,
+        response_cache: Optional[Union[MemoryResponseCache, DiskResponseCache]] = None,
+        base_url: Optional[str] = BASE_URL,
+        instrumentation_hooks: Optional[List[Callable[[dict], None]]] = None,
     ):
         """
         Initializes an instance of the class.
 
+        The blocking client runs an AsyncChatGPT on one event loop in a
+        background thread, started on enter and stopped on exit, so the number
+        of threads doesn't grow with the number of messages. Attributes and
+        methods that aren't wrapped here are read from the AsyncChatGPT,
+        coroutine methods run on the loop.
+
         Args:
             proxies (Optional[dict]): A dictionary of proxy settings. Defaults to None.
             session_token (Optional[str]): A session token. Defaults to None.
             exit_callback_function (Optional[callable]): A function to be called on exit. Defaults to None.
             auth_token (Optional[str]): An authentication token. Defaults to None.
             websocket_mode (Optional[bool]): Toggle whether to use WebSocket for chat. Defaults to False.
+            latest_wins (Optional[bool]): Only decode the newest assistant event of every received chunk, yielding one delta per chunk. Defaults to False.
+            typed_decoding (Optional[bool]): Only extract the fields chat() reads from each event instead of decoding all of it (needs msgspec). Faster when events carry metadata chat() ignores, like web search citations, see json_backend.decode_event. Defaults to False.
+            debug_capture_size (Optional[int]): How many characters of a chat stream to keep for UnexpectedResponseError, 0 disables it. Defaults to 64 KB.
+            sentinel_token_ttl (Optional[float]): Seconds a chat requirements token is reused/kept ready for. Defaults to 60.
+            sentinel_token_pool_size (Optional[int]): How many chat requirements tokens to prefetch, 0 fetches one per message. Prefetched tokens that expire unused still cost a request. Defaults to 0.
+            sentinel_token_max_uses (Optional[int]): How many messages may share one chat requirements token. Defaults to 1.
+            arkose_pool_size (Optional[int]): How many Arkose tokens to keep ready, 0 generates one per message. Prefetched tokens that expire unused still cost a generator call. Defaults to 0.
+            arkose_token_ttl (Optional[float]): Seconds after which an unused Arkose token is thrown away. Defaults to 120.
+            arkose_executor (Optional[Executor]): Thread or process pool generating Arkose tokens. Defaults to the loop's default executor.
+            auth_token_cache_dir (Optional[str]): Directory of an on-disk access token cache shared between processes. Defaults to None (no cache).
+            auth_token_refresh_margin (Optional[float]): Seconds before expiry at which the access token is refreshed in the background. Defaults to 300.
+            arkose_binary_offline (Optional[bool]): Use the local funcaptcha binary without checking GitHub for updates. Defaults to False.
+            max_concurrency (Optional[int]): Upper bound of the adaptive (AIMD) in-flight limit of each endpoint, None disables the limiter. Defaults to 64.
+            retry_policy (Optional[RetryPolicy]): Retries of messages and of the sentinel/auth requests. Defaults to RetryPolicy().
+            websocket_heartbeat (Optional[float]): Seconds between websocket pings, and how long a pong may take. Defaults to 20.
+            websocket_max_reconnects (Optional[int]): Websocket reconnect attempts in a row before chats fall back to HTTP. Defaults to 5.
+            websocket_queue_size (Optional[int]): Websocket messages buffered per request, older ones are dropped once it's full. Defaults to 256.
+            lazy_startup (Optional[bool]): Only open the session on enter, the access token, websocket and funcaptcha binary are set up on first use (see warmup()). Defaults to False.
+            conversation_cache_size (Optional[int]): Bytes of fetched conversations to keep, 0 disables the conversation cache. Defaults to 32 MB.
+            conversation_cache_ttl (Optional[float]): Seconds a cached conversation is used without revalidating it. Defaults to 300.
+            search_index (Optional[ConversationIndex]): Index that every fetched chat and every finished turn is added to. Defaults to None.
+            response_cache (Optional[Union[MemoryResponseCache, DiskResponseCache]]): Cache that replays chat() responses to repeated prompts instead of generating them again. Defaults to None.
+            base_url (Optional[str]): Origin of the backend, e.g. "http://127.0.0.1:8800" for re_gpt.mock_server. Defaults to "https://chat.openai.com".
+            instrumentation_hooks (Optional[List[Callable[[dict], None]]]): Called with the lifecycle events of every chat() turn, see re_gpt.instrumentation. Defaults to None.
         """
-        super().__init__(
+        self.exit_callback_function = exit_callback_function
+        self.loop = None
+        self.thread = None
+
+        # the exit callback gets the SyncChatGPT, so it's called from here
+        self.chatgpt = AsyncChatGPT(
             proxies=proxies,
             session_token=session_token,
-            exit_callback_function=exit_callback_function,
             auth_token=auth_token,
             websocket_mode=websocket_mode,
+            latest_wins=latest_wins,
+            typed_decoding=typed_decoding,
+            debug_capture_size=debug_capture_size,
+            sentinel_token_ttl=sentinel_token_ttl,
+            sentinel_token_pool_size=sentinel_token_pool_size,
+            sentinel_token_max_uses=sentinel_token_max_uses,
+            arkose_pool_size=arkose_pool_size,
+            arkose_token_ttl=arkose_token_ttl,
+            arkose_executor=arkose_executor,
+            auth_token_cache_dir=auth_token_cache_dir,
+            auth_token_refresh_margin=auth_token_refresh_margin,
+            arkose_binary_offline=arkose_binary_offline,
+            max_concurrency=max_concurrency,
+            retry_policy=retry_policy,
+            websocket_heartbeat=websocket_heartbeat,
+            websocket_max_reconnects=websocket_max_reconnects,
+            websocket_queue_size=websocket_queue_size,
+            lazy_startup=lazy_startup,
+            conversation_cache_size=conversation_cache_size,
+            conversation_cache_ttl=conversation_cache_ttl,
+            search_index=search_index,
+            response_cache=response_cache,
+            base_url=base_url,
+            instrumentation_hooks=instrumentation_hooks,
         )
 
-        self.stop_websocket_flag = False
-        self.stop_websocket = None
+    def __getattr__(self, name):
+        if name == "chatgpt":
+            raise AttributeError(name)
 
-    def __enter__(self):
-        self.session = Session(
-            impersonate="chrome110", timeout=99999, proxies=self.proxies
-        )
+        attribute = getattr(self.chatgpt, name)
+        if inspect.iscoroutinefunction(attribute):
+            return lambda *args, **kwargs: self.run(attribute(*args, **kwargs))
+        return attribute
 
-        if self.generate_arkose_token:
-            self.binary_path = sync_get_binary_path(self.session)
-
-            if self.binary_path:
-                self.arkose = ctypes.CDLL(self.binary_path)
-                self.arkose.GetToken.restype = ctypes.c_char_p
-
-            self.tried_downloading_binary = True
-
-        if not self.auth_token:
-            if self.session_token is None:
-                raise TokenNotProvided
-            self.auth_token = self.fetch_auth_token()
-            
-        # automaticly check the status of websocket_mode
-        if not self.websocket_mode:
-            self.websocket_mode = self.check_websocket_availability()
-            
-        if self.websocket_mode:
-            def run_websocket():
-                asyncio.run(self.ensure_websocket())
-            self.ws_loop = Thread(target=run_websocket)
-            self.ws_loop.start()
+    def __setattr__(self, name, value):
+        if name in self.OWN_ATTRIBUTES:
+            super().__setattr__(name, value)
+        else:
+            setattr(self.chatgpt, name, value)
+
+    def __enter__(self):
+        self.start_loop()
+        try:
+            self.run(self.chatgpt.__aenter__())
+        except:
+            self.stop_loop()
+            raise
 
         return self
 
@@ -402,11 +223,80 @@ class SyncChatGPT(AsyncChatGPT):
                 if not inspect.iscoroutinefunction(self.exit_callback_function):
                     self.exit_callback_function(self)
         finally:
-            self.session.close()
+            try:
+                self.run(self.chatgpt.__aexit__(None, None, None))
+            finally:
+                self.stop_loop()
 
-        if self.websocket_mode:
-            self.stop_websocket_flag = True
-            self.ws_loop.join()
+    def start_loop(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def stop_loop(self) -> None:
+        """
+        Cancel what's still running on the loop, then stop it and join its thread.
+        """
+        if self.loop is None:
+            return
+
+        try:
+            self.run(self.cancel_tasks())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+            self.loop = None
+            self.thread = None
+
+    @staticmethod
+    async def cancel_tasks() -> None:
+        tasks = [
+            task for task in asyncio.all_tasks() if task is not asyncio.current_task()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.get_running_loop().shutdown_asyncgens()
+
+    def run(self, coroutine):
+        """
+        Run a coroutine on the client's loop and wait for its result.
+
+        Args:
+            coroutine: The coroutine.
+
+        Returns:
+            The result of the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def iterate(self, async_generator) -> Generator:
+        """
+        Iterate over an async generator on the client's loop.
+
+        Args:
+            async_generator: The async generator.
+
+        Yields:
+            The items of the async generator.
+        """
+        try:
+            while True:
+                try:
+                    item = self.run(async_generator.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            if self.loop is not None:
+                self.run(async_generator.aclose())
+
+    def warmup(self) -> None:
+        """
+        Do every startup step now instead of on first use, see AsyncChatGPT.warmup.
+        """
+        self.run(self.chatgpt.warmup())
 
     def get_conversation(self, conversation_id: str) -> SyncConversation:
         """
@@ -428,6 +318,29 @@ class SyncChatGPT(AsyncChatGPT):
             raise InvalidModelName(model, MODELS)
         return SyncConversation(self, model=model)
 
+    def chat_many(
+        self,
+        prompts: Iterable[str],
+        concurrency: Optional[int] = 4,
+        model: Optional[str] = "gpt-3.5",
+        ordered: Optional[bool] = False,
+    ) -> SyncChatBatch:
+        """
+        Chat with many prompts concurrently, each one in a new conversation.
+
+        Args:
+            prompts (Iterable[str]): The prompts.
+            concurrency (Optional[int]): How many prompts run at the same time. Defaults to 4.
+            model (Optional[str]): Model of the conversations. Defaults to "gpt-3.5".
+            ordered (Optional[bool]): Yield results in input order instead of completion order. Defaults to False.
+
+        Returns:
+            SyncChatBatch: Use `for result in batch` to get a dict per prompt (index, prompt, content, conversation_id, message_id, error, latency). `batch.stats` holds prompts/sec and p50/p95 latency once it's done.
+        """
+        if model not in MODELS:
+            raise InvalidModelName(model, MODELS)
+        return SyncChatBatch(self, prompts, concurrency, model, ordered)
+
     def delete_conversation(self, conversation_id: str) -> dict:
         """
         Delete a conversation.
@@ -438,50 +351,76 @@ class SyncChatGPT(AsyncChatGPT):
         Returns:
             dict: Server response json.
         """
-        url = CHATGPT_API.format(f"conversation/{conversation_id}")
-        response = self.session.patch(
-            url=url, headers=self.build_request_headers(), json={"is_visible": False}
+        return self.run(self.chatgpt.delete_conversation(conversation_id))
+
+    def delete_conversations(
+        self,
+        conversation_ids: Iterable[str],
+        concurrency: Optional[int] = 8,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """
+        Delete many conversations, see AsyncChatGPT.delete_conversations.
+        progress_callback is called on the client's loop thread.
+
+        Args:
+            conversation_ids (Iterable[str]): IDs of the conversations.
+            concurrency (Optional[int]): How many deletions run at the same time. Defaults to 8.
+            progress_callback (Optional[Callable[[dict], None]]): Called after every conversation with {"conversation_id", "error", "done", "failed"}.
+
+        Returns:
+            dict: Summary with the "succeeded" IDs, the "failed" IDs mapped to their error, and "elapsed" seconds.
+        """
+        return self.run(
+            self.chatgpt.delete_conversations(
+                conversation_ids, concurrency, progress_callback
+            )
         )
 
-        return response.json()
+    def hide_conversations(
+        self,
+        predicate: Callable[[ChatSummary], bool],
+        concurrency: Optional[int] = 8,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """
+        Delete (hide) every conversation the predicate selects, see AsyncChatGPT.hide_conversations.
+        predicate and progress_callback are called on the client's loop thread.
+
+        Args:
+            predicate (Callable[[ChatSummary], bool]): Returns True for the conversations to delete.
+            concurrency (Optional[int]): How many deletions run at the same time. Defaults to 8.
+            progress_callback (Optional[Callable[[dict], None]]): Called after every conversation with {"conversation_id", "error", "done", "failed"}.
 
-    def fetch_auth_token(self) -> str:
+        Returns:
+            dict: Summary with the "succeeded" IDs, the "failed" IDs mapped to their error, and "elapsed" seconds.
         """
-        Fetch the authentication token for the session.
+        return self.run(
+            self.chatgpt.hide_conversations(predicate, concurrency, progress_callback)
+        )
 
-        Raises:
-            InvalidSessionToken: If the session token is invalid.
-
-        Returns: authentication token.
-        """
-        url = "https://chat.openai.com/api/auth/session"
-        cookies = {"__Secure-next-auth.session-token": self.session_token}
-
-        headers = {
-            "User-Agent": USER_AGENT,
-            "Accept": "*/*",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Alt-Used": "chat.openai.com",
-            "Connection": "keep-alive",
-            "Sec-Fetch-Dest": "empty",
-            "Sec-Fetch-Mode": "cors",
-            "Sec-Fetch-Site": "same-origin",
-            "Sec-GPC": "1",
-            "Cookie": "; ".join(
-                [
-                    f"{cookie_key}={cookie_value}"
-                    for cookie_key, cookie_value in cookies.items()
-                ]
-            ),
-        }
-
-        response = self.session.get(url=url, headers=headers)
-        response_json = response.json()
-
-        if "accessToken" in response_json:
-            return response_json["accessToken"]
-
-        raise InvalidSessionToken
+    def delete_conversations_older_than(
+        self,
+        older_than: Union[datetime, timedelta],
+        concurrency: Optional[int] = 8,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """
+        Delete every conversation not updated since a point in time, see AsyncChatGPT.delete_conversations_older_than.
+
+        Args:
+            older_than (Union[datetime, timedelta]): The point in time, or the age of the conversations (a naive datetime is taken as UTC).
+            concurrency (Optional[int]): How many deletions run at the same time. Defaults to 8.
+            progress_callback (Optional[Callable[[dict], None]]): Called after every conversation with {"conversation_id", "error", "done", "failed"}.
+
+        Returns:
+            dict: Summary with the "succeeded" IDs, the "failed" IDs mapped to their error, and "elapsed" seconds.
+        """
+        return self.run(
+            self.chatgpt.delete_conversations_older_than(
+                older_than, concurrency, progress_callback
+            )
+        )
 
     def set_custom_instructions(
         self,
@@ -499,102 +438,28 @@ class SyncChatGPT(AsyncChatGPT):
         Returns:
             dict: Server response json.
         """
-        data = {
-            "about_user_message": about_user,
-            "about_model_message": about_model,
-            "enabled": enable_for_new_chats,
-        }
-        url = CHATGPT_API.format("user_system_messages")
-        response = self.session.post(
-            url=url, headers=self.build_request_headers(), json=data
+        return self.run(
+            self.chatgpt.set_custom_instructions(
+                about_user, about_model, enable_for_new_chats
+            )
         )
 
-        return response.json()
-
     def retrieve_chats(
         self, offset: Optional[int] = 0, limit: Optional[int] = 28
     ) -> dict:
-        params = {
-            "offset": offset,
-            "limit": limit,
-            "order": "updated",
-        }
-        url = CHATGPT_API.format("conversations")
-        response = self.session.get(
-            url=url, params=params, headers=self.build_request_headers()
-        )
+        return self.run(self.chatgpt.retrieve_chats(offset, limit))
 
-        return response.json()
-    
-    def check_websocket_availability(self) -> bool:
+    def iter_chats(
+        self, page_size: Optional[int] = 28, prefetch: Optional[int] = 2
+    ) -> Generator[ChatSummary, None, None]:
         """
-        Check if WebSocket is available.
+        Iterate over every conversation of the account, see AsyncChatGPT.iter_chats.
 
-        Returns:
-            bool: True if WebSocket is available, otherwise False.
-        """
-        url = CHATGPT_API.format("accounts/check/v4-2023-04-27")
-        response = (self.session.get(
-            url=url, headers=self.build_request_headers()
-        )).json()
-        
-        if 'account_ordering' in response and 'accounts' in response:
-            account_id = response['account_ordering'][0]
-            if account_id in response['accounts']:
-                return 'shared_websocket' in response['accounts'][account_id]['features']
-
-        return False
-    
-    async def ensure_websocket(self):
-        ws_url_rsp = self.session.post(WS_REGISTER_URL, headers=self.build_request_headers()).json()
-        ws_url = ws_url_rsp['wss_url']
-        access_token = self.extract_access_token(ws_url)
-        asyncio.create_task(self.ensure_close_websocket())
-        await self.listen_to_websocket(ws_url, access_token)
-        
-    async def ensure_close_websocket(self):
-        while True:
-            if self.stop_websocket_flag:
-                break
-            await asyncio.sleep(1)
-        await self.stop_websocket()
-
-    async def listen_to_websocket(self, ws_url: str, access_token: str):
-        headers = {'Authorization': f'Bearer {access_token}'}
-        async with websockets.connect(ws_url, extra_headers=headers) as websocket:
-            async def stop_websocket():
-                await websocket.close()
-            self.stop_websocket = stop_websocket
-
-            while True:
-                message = None
-                try:
-                    message = await websocket.recv()
-                except ConnectionClosed:
-                    break
-                message_data = json.loads(message)
-                body_encoded = message_data.get("body", "")
-                ws_id = message_data.get("websocket_request_id", "")
-                decoded_body = base64.b64decode(body_encoded).decode('utf-8')
-                response_queue = self.ws_conversation_map.get(ws_id)
-                if response_queue is None:
-                    continue
-                response_queue.put_nowait(decoded_body)
-                if '[DONE]' in decoded_body or '[ERROR]' in decoded_body:
-                    response_queue.put(None)
-                    continue
-
-    def create_chat_requirements_token(self):
-        """
-        Get a chat requirements token from chatgpt server
+        Args:
+            page_size (Optional[int]): Conversations per request. Defaults to 28.
+            prefetch (Optional[int]): Pages fetched ahead of the one being consumed. Defaults to 2.
 
-        Returns:
-            str: chat requirements token
+        Yields:
+            ChatSummary: One summary per conversation.
         """
-        url = CHATGPT_API.format("sentinel/chat-requirements")
-        response = self.session.post(
-            url=url, headers=self.build_request_headers()
-        )
-        body = response.json()
-        token = body.get("token", None)
-        return token
\ No newline at end of file
+        yield from self.iterate(self.chatgpt.iter_chats(page_size, prefetch))
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Optional
+
+
+class AsyncTokenPool:
+    def __init__(
+        self,
+        fetch_token: Callable,
+        ttl: Optional[float] = 60,
+        pool_size: Optional[int] = 0,
+        max_uses: Optional[int] = 1,
+        refresh_margin: Optional[float] = None,
+    ):
+        """
+        Pool of short-lived tokens (sentinel chat requirements tokens, Arkose
+        tokens). A fetched token is reused up to `max_uses` times while it's
+        valid, and with `pool_size` extra tokens are prefetched in the
+        background so sending a message doesn't wait on generating one.
+
+        Args:
+            fetch_token (Callable): Coroutine function fetching a new token.
+            ttl (Optional[float]): Seconds a token is considered valid after it was fetched. Defaults to 60.
+            pool_size (Optional[int]): How many fresh tokens to prefetch for bursts, 0 only fetches on demand. Every prefetched token costs a fetch even if it expires unused. Defaults to 0.
+            max_uses (Optional[int]): How many messages may reuse the same token. Defaults to 1.
+            refresh_margin (Optional[float]): Tokens this close to expiring are replaced in the background. Defaults to a fifth of the ttl.
+        """
+        self.fetch_token = fetch_token
+        self.ttl = ttl
+        self.pool_size = pool_size
+        self.max_uses = max_uses
+        self.refresh_margin = ttl / 5 if refresh_margin is None else refresh_margin
+
+        self.tokens = deque()  # [token, expires_at, uses_left]
+        self.refill_task = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def take_cached(self) -> Optional[str]:
+        now = time.monotonic()
+        while self.tokens and self.tokens[0][1] <= now:
+            self.tokens.popleft()
+
+        if not self.tokens:
+            return None
+
+        entry = self.tokens[0]
+        entry[2] -= 1
+        if entry[2] <= 0:
+            self.tokens.popleft()
+        return entry[0]
+
+    def missing_tokens(self) -> int:
+        fresh_after = time.monotonic() + self.refresh_margin
+        fresh_tokens = sum(1 for entry in self.tokens if entry[1] > fresh_after)
+        return max(self.pool_size - fresh_tokens, 0)
+
+    def store(self, token: Optional[str], uses: Optional[int] = None) -> None:
+        if uses is None:
+            uses = self.max_uses
+        if token and uses > 0:
+            self.tokens.append([token, time.monotonic() + self.ttl, uses])
+
+    def invalidate(self) -> None:
+        """
+        Drop every cached token, e.g. after the server rejected one.
+        """
+        self.tokens.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Pool hits, misses and the number of tokens ready to use.
+        """
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self.tokens)}
+
+    async def get(self) -> Optional[str]:
+        """
+        Get a token, from the pool if there's a valid one.
+
+        Returns:
+            Optional[str]: token
+        """
+        token = self.take_cached()
+        if token is not None:
+            self.hits += 1
+        else:
+            # the caller waits on a fetch either way, a refill in flight only saves a request
+            self.misses += 1
+            if self.refill_task is not None and not self.refill_task.done():
+                await asyncio.shield(self.refill_task)
+                token = self.take_cached()
+            if token is None:
+                token = await self.fetch_token()
+                # this use is the first one, the rest is left for the next messages
+                self.store(token, self.max_uses - 1)
+
+        self.prefetch()
+        return token
+
+    def prefetch(self) -> None:
+        """
+        Start refilling the pool in the background if it's running low.
+        """
+        if not self.pool_size or not self.missing_tokens():
+            return
+        if self.refill_task is None or self.refill_task.done():
+            self.refill_task = asyncio.create_task(self.refill())
+
+    async def refill(self) -> None:
+        missing = self.missing_tokens()
+        if not missing:
+            return
+
+        tokens = await asyncio.gather(
+            *(self.fetch_token() for _ in range(missing)), return_exceptions=True
+        )
+        for token in tokens:
+            # errors are dropped, the next get() will fetch the token itself and raise them there
+            if not isinstance(token, BaseException):
+                self.store(token)
+
+    def close(self) -> None:
+        if self.refill_task is not None:
+            self.refill_task.cancel()
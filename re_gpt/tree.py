@@ -0,0 +1,162 @@
+import sys
+from array import array
+from typing import List, Optional
+
+
+class ConversationTree:
+    __slots__ = (
+        "ids",
+        "positions",
+        "parents",
+        "child_starts",
+        "child_counts",
+        "children_list",
+        "roles",
+        "model_slugs",
+        "current",
+    )
+
+    def __init__(self, chat: dict):
+        """
+        Index of a conversation's message tree, built once from the "mapping"
+        of a fetched chat. Nodes are positions in flat arrays (parent, children
+        range) instead of objects, so long histories stay small, and lookups
+        walk at most one branch.
+
+        Args:
+            chat (dict): The chat as returned by fetch_chat().
+        """
+        mapping = chat.get("mapping") or {}
+        self.ids = list(mapping)
+        self.positions = {node_id: position for position, node_id in enumerate(self.ids)}
+        self.parents = array("l", [-1]) * len(self.ids)
+        self.child_starts = array("l", [0]) * len(self.ids)
+        self.child_counts = array("l", [0]) * len(self.ids)
+        self.children_list = array("l")
+        self.roles = [None] * len(self.ids)
+        # only assistant messages carry a model slug
+        self.model_slugs = {}
+
+        for position, node in enumerate(mapping.values()):
+            parent = self.positions.get(node.get("parent"))
+            if parent is not None:
+                self.parents[position] = parent
+
+            self.child_starts[position] = len(self.children_list)
+            for child_id in node.get("children") or ():
+                child = self.positions.get(child_id)
+                if child is not None:
+                    self.children_list.append(child)
+            self.child_counts[position] = len(self.children_list) - self.child_starts[position]
+
+            message = node.get("message")
+            if message:
+                role = sys.intern(message["author"]["role"])
+                self.roles[position] = role
+                model_slug = (message.get("metadata") or {}).get("model_slug")
+                if role == "assistant" and model_slug:
+                    self.model_slugs[position] = model_slug
+
+        current = self.positions.get(chat.get("current_node"))
+        if current is None and self.ids:
+            # older responses have no current_node, fall back to the newest node
+            current = len(self.ids) - 1
+        self.current = current
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self.positions
+
+    def position(self, node_id: Optional[str]) -> Optional[int]:
+        if node_id is None:
+            return self.current
+        return self.positions[node_id]
+
+    def active_leaf(self) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: ID of the node the conversation continues from, None if it's empty.
+        """
+        if self.current is None:
+            return None
+        return self.ids[self.current]
+
+    def parent(self, node_id: str) -> Optional[str]:
+        """
+        Args:
+            node_id (str): ID of the node.
+
+        Returns:
+            Optional[str]: ID of its parent, None for the root.
+        """
+        parent = self.parents[self.positions[node_id]]
+        return self.ids[parent] if parent != -1 else None
+
+    def children(self, node_id: str) -> List[str]:
+        """
+        Args:
+            node_id (str): ID of the node.
+
+        Returns:
+            List[str]: IDs of its children, one per answer or edit.
+        """
+        position = self.positions[node_id]
+        start = self.child_starts[position]
+        end = start + self.child_counts[position]
+        return [self.ids[child] for child in self.children_list[start:end]]
+
+    def siblings(self, node_id: str) -> List[str]:
+        """
+        Args:
+            node_id (str): ID of the node.
+
+        Returns:
+            List[str]: IDs of the alternatives of the node (regenerated answers, edited prompts), itself included.
+        """
+        parent = self.parent(node_id)
+        if parent is None:
+            return [node_id]
+        return self.children(parent)
+
+    def path_to_root(self, node_id: Optional[str] = None) -> List[str]:
+        """
+        Args:
+            node_id (Optional[str]): ID of the node to start from. Defaults to the active leaf.
+
+        Returns:
+            List[str]: IDs from the node up to the root.
+        """
+        position = self.position(node_id)
+        path = []
+        while position is not None and position != -1:
+            path.append(self.ids[position])
+            position = self.parents[position]
+        return path
+
+    def model_slug(self, node_id: Optional[str] = None) -> Optional[str]:
+        """
+        Args:
+            node_id (Optional[str]): ID of the node to start from. Defaults to the active leaf.
+
+        Returns:
+            Optional[str]: Model slug of the nearest assistant message on the branch, None if there's none.
+        """
+        position = self.position(node_id)
+        while position is not None and position != -1:
+            model_slug = self.model_slugs.get(position)
+            if model_slug is not None:
+                return model_slug
+            position = self.parents[position]
+        return None
+
+    def role(self, node_id: str) -> Optional[str]:
+        """
+        Args:
+            node_id (str): ID of the node.
+
+        Returns:
+            Optional[str]: Author role of the node's message, None for nodes without one.
+        """
+        return self.roles[self.positions[node_id]]
@@ -1,6 +1,15 @@
+import asyncio
+import base64
 import hashlib
+import json
 import os
 import platform
+import random
+import tempfile
+import time
+from email.utils import parsedate_to_datetime
+
+from .errors import BackendError, InvalidBinaryDownload
 
 current_os = platform.system()
 current_file_directory = "/".join(
@@ -22,11 +31,16 @@ binary_path = {
 }.get(current_os)
 
 
-def calculate_file_md5(file_path):
+manifest_path = f"{funcaptcha_bin_folder_path}/manifest.json"
+RELEASE_METADATA_TTL = 24 * 60 * 60
+
+
+def calculate_file_md5(file_path, chunk_size=1024 * 1024):
+    md5_hash = hashlib.md5()
     with open(file_path, "rb") as file:
-        file_content = file.read()
-        md5_hash = hashlib.md5(file_content).hexdigest()
-        return md5_hash
+        while chunk := file.read(chunk_size):
+            md5_hash.update(chunk)
+    return md5_hash.hexdigest()
 
 
 def get_file_url(json_data):
@@ -40,98 +54,258 @@ def get_file_url(json_data):
             return file_url
 
 
-# async
-async def async_download_binary(session, output_path, file_url):
-    with open(output_path, "wb") as output_file:
-        response = await session.get(
-            url=file_url, content_callback=lambda chunk: output_file.write(chunk)
+def get_latest_binary_hash(json_data):
+    for release in json_data:
+        if release["tag_name"].startswith("funcaptcha_bin"):
+            for line in release["body"].splitlines():
+                if line.startswith(current_os):
+                    return line.split("=")[-1].strip()
+
+
+def read_manifest():
+    """
+    Read the local manifest, which remembers the last release check (ETag,
+    time, latest hash and download url) and the hash of the local binary.
+    """
+    try:
+        with open(manifest_path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_file_atomic(path, content):
+    # a unique temp file, concurrent writers must not share one
+    file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_manifest(manifest):
+    write_file_atomic(manifest_path, json.dumps(manifest).encode())
+
+
+def local_binary_md5(manifest):
+    """
+    Hash of the local binary, taken from the manifest while the file's size and
+    mtime haven't changed so it's only hashed after a download or an outside change.
+    """
+    stat = os.stat(binary_path)
+    binary = manifest.get("binary", {})
+    if binary.get("size") == stat.st_size and binary.get("mtime") == stat.st_mtime:
+        return binary["md5"]
+
+    md5_hash = calculate_file_md5(binary_path)
+    manifest["binary"] = {
+        "md5": md5_hash,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+    }
+    return md5_hash
+
+
+class BinaryDownload:
+    def __init__(self, url):
+        """
+        Streams the funcaptcha binary into a unique temp file next to it,
+        hashing it on the way, and only replaces the binary once the
+        download is known to be good.
+
+        Args:
+            url (str): Where the binary is downloaded from.
+        """
+        self.url = url
+        file_descriptor, self.temp_path = tempfile.mkstemp(
+            dir=funcaptcha_bin_folder_path, suffix=".tmp"
         )
+        self.file = os.fdopen(file_descriptor, "wb")
+        self.md5_hash = hashlib.md5()
 
+    def write(self, chunk):
+        self.md5_hash.update(chunk)
+        self.file.write(chunk)
 
-async def async_get_binary_path(session):
-    if binary_path is None:
-        return None
+    def install(self, manifest, status_code):
+        """
+        Check the download and move it in place of the binary.
 
-    if not os.path.exists(funcaptcha_bin_folder_path) or not os.path.isdir(
-        funcaptcha_bin_folder_path
-    ):
-        os.mkdir(funcaptcha_bin_folder_path)
+        Args:
+            manifest (dict): The manifest, holding the expected hash.
+            status_code (int): Status code of the download.
 
-    if os.path.isfile(binary_path):
-        try:
-            local_binary_hash = calculate_file_md5(binary_path)
-            response = await session.get(latest_release_url)
-            json_data = response.json()
+        Raises:
+            InvalidBinaryDownload: If the download failed or doesn't match the released hash.
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
 
-            for line in json_data["body"].splitlines():
-                if line.startswith(current_os):
-                    latest_binary_hash = line.split("=")[-1]
-                    break
+        if status_code != 200:
+            raise InvalidBinaryDownload(self.url, f"status code {status_code}")
+        expected_hash = manifest.get("latest_hash")
+        if not expected_hash:
+            raise InvalidBinaryDownload(self.url, "the release has no hash to check it against")
+        if self.md5_hash.hexdigest() != expected_hash:
+            raise InvalidBinaryDownload(self.url, "its md5 doesn't match the release")
 
-            if local_binary_hash != latest_binary_hash:
-                file_url = get_file_url(json_data)
+        os.replace(self.temp_path, binary_path)
+        local_binary_md5(manifest)
+        write_manifest(manifest)
 
-                await async_download_binary(session, binary_path, file_url)
-        except:
-            return binary_path
-    else:
-        response = await session.get(latest_release_url)
-        json_data = response.json()
-        file_url = get_file_url(json_data)
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
 
-        await async_download_binary(session, binary_path, file_url)
 
-    return binary_path
+def release_check_needed(manifest, ttl):
+    return time.time() - manifest.get("checked_at", 0) >= ttl
 
 
-# sync
-def sync_download_binary(session, output_path, file_url):
-    with open(output_path, "wb") as output_file:
-        response = session.get(
-            url=file_url, content_callback=lambda chunk: output_file.write(chunk)
-        )
+def update_release_metadata(manifest, response):
+    if response.status_code == 304:
+        manifest["checked_at"] = time.time()
+        return
+    if response.status_code != 200:
+        raise BackendError(response.status_code)
 
+    manifest["checked_at"] = time.time()
 
-def sync_get_binary_path(session):
-    if binary_path is None:
-        return None
+    json_data = response.json()
+    manifest["etag"] = response.headers.get("etag")
+    manifest["latest_hash"] = get_latest_binary_hash(json_data)
+    manifest["file_url"] = get_file_url(json_data)
+
+
+def release_request_headers(manifest, has_binary):
+    if has_binary and manifest.get("etag") and manifest.get("file_url"):
+        return {"If-None-Match": manifest["etag"]}
+    return {}
 
+
+def ensure_binary_folder():
     if not os.path.exists(funcaptcha_bin_folder_path) or not os.path.isdir(
         funcaptcha_bin_folder_path
     ):
         os.mkdir(funcaptcha_bin_folder_path)
 
-    if os.path.isfile(binary_path):
-        try:
-            local_binary_hash = calculate_file_md5(binary_path)
-            response = session.get(latest_release_url)
-            json_data = response.json()
 
-            for line in json_data["body"].splitlines():
-                if line.startswith(current_os):
-                    latest_binary_hash = line.split("=")[-1]
-                    break
+async def async_get_binary_path(session, offline=False, ttl=RELEASE_METADATA_TTL):
+    """
+    Resolve the funcaptcha binary, downloading it when it's missing or outdated.
+    The release metadata is only requested again once `ttl` seconds have passed
+    (with If-None-Match), and file I/O runs off the event loop. A download
+    only replaces the binary if it succeeded and matches the released md5.
 
-            if local_binary_hash != latest_binary_hash:
-                file_url = get_file_url(json_data)
+    Args:
+        session: The client's session.
+        offline (bool): Trust the local binary and manifest, never touch the network. Defaults to False.
+        ttl (float): Seconds the release metadata is cached for. Defaults to a day.
 
-                sync_download_binary(session, binary_path, file_url)
-        except:
-            return binary_path
-    else:
-        response = session.get(latest_release_url)
-        json_data = response.json()
-        file_url = get_file_url(json_data)
+    Returns:
+        Optional[str]: Path of the binary, None if there's none for this OS (or offline without a binary).
+    """
+    if binary_path is None:
+        return None
+
+    has_binary = os.path.isfile(binary_path)
+    if offline:
+        return binary_path if has_binary else None
+
+    await asyncio.to_thread(ensure_binary_folder)
+    manifest = await asyncio.to_thread(read_manifest)
+
+    try:
+        if release_check_needed(manifest, ttl) or not has_binary:
+            response = await session.get(
+                latest_release_url,
+                headers=release_request_headers(manifest, has_binary),
+            )
+            update_release_metadata(manifest, response)
+
+        if has_binary:
+            local_hash = await asyncio.to_thread(local_binary_md5, manifest)
+            if manifest.get("latest_hash") in (None, local_hash) or not manifest.get(
+                "file_url"
+            ):
+                await asyncio.to_thread(write_manifest, manifest)
+                return binary_path
 
-        sync_download_binary(session, binary_path, file_url)
+        download = await asyncio.to_thread(BinaryDownload, manifest["file_url"])
+        try:
+            # chunks are written as they arrive instead of buffering the whole binary
+            response = await session.get(
+                url=manifest["file_url"], content_callback=download.write
+            )
+            await asyncio.to_thread(download.install, manifest, response.status_code)
+        finally:
+            await asyncio.to_thread(download.discard)
+    except:
+        if has_binary:
+            return binary_path
+        raise
 
     return binary_path
 
 
-def get_model_slug(chat):
-    for _, message in chat.get("mapping", {}).items():
-        if "message" in message:
-            if message["message"]:
-                role = message["message"]["author"]["role"]
-                if role == "assistant":
-                    return message["message"]["metadata"]["model_slug"]
+def backoff_delay(attempt: int, base: float = 0.5, maximum: float = 8.0) -> float:
+    """
+    Exponential backoff with jitter.
+
+    Args:
+        attempt (int): Number of the failed attempt, starting at 0.
+        base (float): Delay after the first failure. Defaults to 0.5.
+        maximum (float): Upper bound of the delay. Defaults to 8.
+
+    Returns:
+        float: Seconds to wait before the next attempt.
+    """
+    return min(maximum, base * 2**attempt) * random.uniform(0.5, 1)
+
+
+def get_jwt_expiry(token: str):
+    """
+    Read the "exp" claim of a JWT without verifying it.
+
+    Args:
+        token (str): The JWT.
+
+    Returns:
+        Optional[float]: Expiry as a unix timestamp, None if the token has none or isn't a JWT.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except:
+        return None
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header.
+
+    Args:
+        value (Optional[str]): Seconds or an HTTP date.
+
+    Returns:
+        Optional[float]: Seconds to wait, None if there's no usable value.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
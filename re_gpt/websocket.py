@@ -0,0 +1,233 @@
+import asyncio
+import base64
+import re
+from typing import Optional, Tuple
+
+import websockets
+
+from . import json_backend
+from .errors import WebSocketError
+from .utils import backoff_delay
+
+def extract_access_token(url: str) -> Optional[str]:
+    match = re.search(r"access_token=([^&]*)", url)
+    if match:
+        return match.group(1)
+    return None
+
+
+class AsyncWebSocketManager:
+    def __init__(
+        self,
+        chatgpt,
+        heartbeat: Optional[float] = 20,
+        max_reconnects: Optional[int] = 5,
+        queue_size: Optional[int] = 256,
+    ):
+        """
+        Keeps the shared websocket connection alive and routes its messages to
+        the requests waiting for them. A socket that stops answering heartbeats
+        is dropped, the requests on it fail with WebSocketError (chat() resumes
+        them over HTTP) and a new socket is registered with backoff. Every
+        request gets a bounded queue that the socket never waits on: every
+        message carries the whole reply so far, so when a consumer falls behind
+        the oldest message it hasn't read is dropped.
+
+        Args:
+            chatgpt: The client whose session registers the websocket.
+            heartbeat (Optional[float]): Seconds between pings, and how long a pong may take. Defaults to 20.
+            max_reconnects (Optional[int]): Reconnect attempts in a row before giving up, chats then go over HTTP. Defaults to 5.
+            queue_size (Optional[int]): Messages buffered per request, older ones are dropped once it's full. Defaults to 256.
+        """
+        self.chatgpt = chatgpt
+        self.heartbeat = heartbeat
+        self.max_reconnects = max_reconnects
+        self.queue_size = queue_size
+
+        self.routes = {}
+        self.websocket = None
+        self.task = None
+        self.started = None
+        self.reconnects = 0
+        self.dropped = 0
+
+    def is_connected(self) -> bool:
+        return self.websocket is not None
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Whether the socket is connected, the open requests, the reconnects and the messages dropped so far.
+        """
+        return {
+            "connected": self.is_connected(),
+            "requests": len(self.routes),
+            "reconnects": self.reconnects,
+            "dropped": self.dropped,
+        }
+
+    def create_queue(self):
+        # deliver() keeps queue_size messages, the extra slot is the end marker's
+        return asyncio.Queue(maxsize=self.queue_size + 1)
+
+    def open_route(self, request_id: str):
+        """
+        Register a request before it's sent, so no message can arrive unrouted.
+
+        Args:
+            request_id (str): The websocket_request_id of the request.
+
+        Returns:
+            The queue receiving the request's messages, then None once it's done.
+        """
+        response_queue = self.routes[request_id] = self.create_queue()
+        return response_queue
+
+    def close_route(self, request_id: str) -> None:
+        self.routes.pop(request_id, None)
+
+    def fail_route(self, request_id: str, error: Exception) -> None:
+        """
+        Stop routing a request and hand an error to its consumer.
+
+        Args:
+            request_id (str): The websocket_request_id of the request.
+            error (Exception): The error the consumer raises.
+        """
+        response_queue = self.routes.pop(request_id, None)
+        if response_queue is not None:
+            self.put_error(response_queue, error)
+
+    def fail_routes(self, error: Exception) -> None:
+        for request_id in list(self.routes):
+            self.fail_route(request_id, error)
+
+    def put_error(self, response_queue, error: Exception) -> None:
+        try:
+            response_queue.put_nowait(error)
+        except asyncio.QueueFull:
+            # the request failed anyway, the error matters more than what's buffered
+            while not response_queue.empty():
+                response_queue.get_nowait()
+            response_queue.put_nowait(error)
+
+    def deliver(self, response_queue, item) -> None:
+        """
+        Put a message, or None for the end of the reply, in a request's
+        queue without waiting, the receive loop is shared by every request.
+        Past queue_size messages the oldest one is dropped, the newer ones
+        supersede it. The end marker always fits in the extra slot.
+        """
+        if item is not None and response_queue.qsize() >= self.queue_size:
+            response_queue.get_nowait()
+            self.dropped += 1
+        response_queue.put_nowait(item)
+
+    async def register(self) -> Tuple[str, str]:
+        """
+        Register a new websocket.
+
+        Returns:
+            Tuple[str, str]: The websocket URL and its access token.
+        """
+        response = await self.chatgpt.retry_request(
+            "websocket",
+            "post",
+            url=self.chatgpt.api_url("register-websocket"),
+            headers=await self.chatgpt.request_headers(),
+        )
+        ws_url = response.json()["wss_url"]
+        return ws_url, extract_access_token(ws_url)
+
+    def connect(self, ws_url: str, access_token: str):
+        return websockets.connect(
+            ws_url,
+            extra_headers={"Authorization": f"Bearer {access_token}"},
+            ping_interval=self.heartbeat,
+            ping_timeout=self.heartbeat,
+        )
+
+    async def start(self) -> None:
+        """
+        Connect if not connected yet, or again after giving up.
+
+        Raises:
+            WebSocketError: If no connection could be made.
+        """
+        if self.task is None or self.task.done():
+            self.started = asyncio.get_running_loop().create_future()
+            self.task = asyncio.create_task(self.run())
+        await asyncio.shield(self.started)
+
+    async def close(self) -> None:
+        if self.task is not None:
+            # before Python 3.12, wait_for() drops a cancellation that races
+            # the completion of what it waits for, so cancel until it's done
+            while not self.task.done():
+                self.task.cancel()
+                await asyncio.wait([self.task], timeout=1)
+            self.task = None
+        self.fail_routes(WebSocketError("The websocket was closed."))
+
+    def notify_started(self, error: Optional[Exception] = None) -> None:
+        if self.started is None or self.started.done():
+            return
+        if error is None:
+            self.started.set_result(None)
+        else:
+            self.started.set_exception(error)
+
+    async def run(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                ws_url, access_token = await self.register()
+                async with self.connect(ws_url, access_token) as websocket:
+                    self.websocket = websocket
+                    attempt = 0
+                    self.notify_started()
+                    await self.receive(websocket)
+                error = WebSocketError("The websocket was closed by the server.")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = WebSocketError(f"The websocket connection failed: {e!r}")
+            finally:
+                self.websocket = None
+
+            self.fail_routes(error)
+            if attempt >= self.max_reconnects:
+                self.notify_started(error)
+                return
+
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+            self.reconnects += 1
+
+    async def receive(self, websocket) -> None:
+        async for message in websocket:
+            try:
+                message_data = json_backend.loads(message)
+                request_id = message_data.get("websocket_request_id", "")
+            except (ValueError, TypeError, AttributeError):
+                # nothing tells which request it belongs to, and it's not worth the socket
+                continue
+            response_queue = self.routes.get(request_id)
+            if response_queue is None:
+                continue
+
+            try:
+                decoded_body = base64.b64decode(message_data.get("body", "")).decode(
+                    "utf-8"
+                )
+            except (ValueError, TypeError):
+                self.fail_route(
+                    request_id, WebSocketError("The websocket sent a malformed message.")
+                )
+                continue
+            if "title_generation" in decoded_body:
+                continue
+
+            self.deliver(response_queue, decoded_body)
+            if "[DONE]" in decoded_body or "[ERROR]" in decoded_body:
+                self.deliver(response_queue, None)
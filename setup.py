@@ -16,4 +16,9 @@ setup(
         "curl_cffi==0.5.9",
         "websockets==12.0"
     ],
+    extras_require={
+        "fast": ["orjson", "msgspec"],
+        "export": ["zstandard"],
+        "otel": ["opentelemetry-api"],
+    },
 )
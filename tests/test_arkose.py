@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+import pytest
+
+from re_gpt import arkose
+from re_gpt.arkose import AsyncArkoseTokenProvider
+
+
+class SlowBinaryProvider(AsyncArkoseTokenProvider):
+    def __init__(self):
+        super().__init__(chatgpt=None)
+        self.backup_calls = 0
+
+    async def load_binary(self):
+        return "binary-path"
+
+    async def fetch_backup_token(self):
+        self.backup_calls += 1
+        return "backup"
+
+
+def slow_binary_token(binary_path: str) -> str:
+    time.sleep(0.2)
+    return "binary"
+
+
+async def cancel_during_generation(provider: SlowBinaryProvider) -> None:
+    task = asyncio.create_task(provider.generate_token())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await task
+
+
+def test_cancelled_generation_does_not_fall_back(monkeypatch):
+    monkeypatch.setattr(arkose, "generate_binary_token", slow_binary_token)
+    provider = SlowBinaryProvider()
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(cancel_during_generation(provider))
+    assert provider.backup_calls == 0
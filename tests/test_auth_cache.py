@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+from re_gpt.auth_cache import AuthTokenCache
+
+
+def test_token_without_expiry_gets_a_max_age(tmp_path):
+    cache = AuthTokenCache(str(tmp_path), refresh_margin=0, max_age=0.2)
+    cache.write("session", "opaque-token")
+    assert cache.read("session") == "opaque-token"
+    time.sleep(0.3)
+    assert cache.read("session") is None
+
+
+async def cancel_waiting_acquire(cache: AuthTokenCache) -> bool:
+    held = cache.try_acquire("session")
+    waiter = asyncio.create_task(cache.acquire("session", poll_interval=0.01))
+    await asyncio.sleep(0.05)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    cache.release(held)
+
+    lock_file = cache.try_acquire("session")
+    if lock_file is None:
+        return False
+    cache.release(lock_file)
+    return True
+
+
+def test_cancelled_acquire_does_not_keep_the_lock(tmp_path):
+    cache = AuthTokenCache(str(tmp_path))
+    assert asyncio.run(cancel_waiting_acquire(cache))
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from re_gpt import AsyncChatGPT
+from re_gpt.batch import AsyncChatBatch
+from re_gpt.mock_server import MockChatGPTServer
+
+
+async def stop_after_first_result() -> tuple:
+    async with MockChatGPTServer(port=0, token_rate=200, reply_tokens=20, websocket=False) as server:
+        async with AsyncChatGPT(session_token="test", base_url=server.url) as chatgpt:
+            batch = chatgpt.chat_many([f"prompt {i}" for i in range(8)], concurrency=4)
+            results = batch.run()
+            first = await results.__anext__()
+            await results.aclose()
+            leftover = [task for task in asyncio.all_tasks() if "worker" in repr(task)]
+            return first, leftover, batch.stats
+
+
+def test_stopping_early_awaits_the_workers():
+    first, leftover, stats = asyncio.run(stop_after_first_result())
+    assert first["error"] is None
+    assert leftover == []
+    assert stats is not None
+
+
+@pytest.mark.parametrize("concurrency", [0, -1, None])
+def test_concurrency_below_one_is_rejected(concurrency):
+    with pytest.raises(ValueError):
+        AsyncChatBatch(None, ["prompt"], concurrency=concurrency)
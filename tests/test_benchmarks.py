@@ -0,0 +1,64 @@
+import json
+
+from benchmarks import hot_path
+from benchmarks.common import percentile, report, result
+from benchmarks.compare import compare, load
+
+
+def test_compare_flags_regressions_in_both_directions():
+    before = {
+        ("sse_decode", "{}"): {"median_s": 1.0, "mb_per_s": 100.0},
+        ("chat_deltas", "{}"): {"cpu_s": 2.0, "deltas_per_cpu_s": 50.0, "label": "x"},
+        ("removed", "{}"): {"median_s": 1.0},
+    }
+    after = {
+        ("sse_decode", "{}"): {"median_s": 1.05, "mb_per_s": 80.0},
+        ("chat_deltas", "{}"): {"cpu_s": 2.5, "deltas_per_cpu_s": 60.0, "label": "y"},
+        ("added", "{}"): {"median_s": 1.0},
+    }
+
+    rows = {
+        (name, metric): regressed
+        for name, _, metric, *_, regressed in compare(before, after, 0.1)
+    }
+    assert rows == {
+        ("sse_decode", "median_s"): False,
+        # a lower rate is a regression
+        ("sse_decode", "mb_per_s"): True,
+        ("chat_deltas", "cpu_s"): True,
+        ("chat_deltas", "deltas_per_cpu_s"): False,
+    }
+
+
+def test_report_round_trips_through_load(tmp_path):
+    path = str(tmp_path / "results" / "suite.json")
+    entries = [
+        result("sse_decode", {"tokens": 10, "chunk_bytes": 64}, {"median_s": 0.5}),
+        result("sse_decode", {"chunk_bytes": 1024, "tokens": 10}, {"median_s": 0.25}),
+    ]
+    report("hot_path", entries, path)
+
+    with open(path, encoding="utf-8") as file:
+        document = json.load(file)
+    assert document["suite"] == "hot_path"
+    assert document["environment"]["json_backend"]
+    # params are keyed in a stable order whatever order they were given in
+    assert load(path) == {
+        ("sse_decode", '{"chunk_bytes": 64, "tokens": 10}'): {"median_s": 0.5},
+        ("sse_decode", '{"chunk_bytes": 1024, "tokens": 10}'): {"median_s": 0.25},
+    }
+
+
+def test_percentile():
+    assert percentile([], 0.5) is None
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(list(range(101)), 0.95) == 95
+    assert percentile([1, 2], 1.0) == 2
+
+
+def test_hot_path_benchmarks_run():
+    sse = hot_path.bench_sse(tokens=50, chunk_bytes=64, repeat=1)
+    assert sse["metrics"]["mb_per_s"] > 0
+
+    deltas = hot_path.bench_chat_deltas(tokens=50, events_per_chunk=1, repeat=1)
+    assert deltas["metrics"]["deltas"] == 50
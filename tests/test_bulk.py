@@ -0,0 +1,27 @@
+import asyncio
+
+from re_gpt.bulk import AsyncBulkOperation
+
+
+async def delete(conversation_id: str) -> None:
+    await asyncio.sleep(0)
+    if conversation_id.startswith("missing"):
+        raise LookupError(conversation_id)
+
+
+def test_failures_and_a_broken_callback_do_not_stop_the_batch(caplog):
+    progress = []
+
+    def progress_callback(event: dict) -> None:
+        progress.append(event["conversation_id"])
+        raise RuntimeError("broken callback")
+
+    ids = [f"conversation-{i}" for i in range(10)] + ["missing-1", "missing-2"]
+    operation = AsyncBulkOperation(delete, concurrency=3, progress_callback=progress_callback)
+    summary = asyncio.run(operation.run(ids))
+
+    assert sorted(summary["succeeded"]) == sorted(ids[:10])
+    assert sorted(summary["failed"]) == ["missing-1", "missing-2"]
+    assert isinstance(summary["failed"]["missing-1"], LookupError)
+    assert sorted(progress) == sorted(ids)
+    assert "progress_callback failed" in caplog.text
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from re_gpt import AsyncChatGPT, RetryPolicy
+from re_gpt.capture import ResponseCapture
+from re_gpt.errors import UnexpectedResponseError
+from re_gpt.mock_server import MockChatGPTServer
+
+
+def test_keeps_the_first_event_and_a_bounded_tail():
+    capture = ResponseCapture(max_size=32)
+    capture.append(b"data: first\n\ndata: sec")
+    for index in range(100):
+        capture.append(f"ond {index}\n\ndata: ".encode())
+    capture.append(b"last\n\n")
+
+    excerpt = capture.excerpt()
+    assert excerpt["first_event"] == "data: first\n\n"
+    assert excerpt["tail"].endswith("data: last\n\n")
+    assert len(excerpt["tail"]) == 32
+    assert sum(len(part) for part in capture.tail) <= 32 + len(capture.tail[0])
+    assert excerpt["omitted_size"] == excerpt["total_size"] - 13 - 32
+
+
+def test_short_stream_is_kept_whole():
+    capture = ResponseCapture(max_size=1024)
+    capture.append("data: one\n\n")
+    capture.append("data: two\n\n")
+
+    excerpt = capture.excerpt()
+    assert excerpt["first_event"] + excerpt["tail"] == "data: one\n\ndata: two\n\n"
+    assert excerpt["omitted_size"] == 0
+
+
+def test_first_event_is_capped():
+    capture = ResponseCapture(max_size=8)
+    capture.append(b"data: a long first event\n\n")
+
+    excerpt = capture.excerpt()
+    assert excerpt["first_event"] == "data: a "
+    assert len(excerpt["tail"]) <= 8
+
+
+def test_disabled_capture():
+    capture = ResponseCapture(max_size=0)
+    capture.append(b"data: ignored\n\n")
+    assert capture.excerpt() == {"first_event": "", "tail": "", "total_size": 0, "omitted_size": 0}
+
+
+async def chat_until_cut_off() -> UnexpectedResponseError:
+    async with MockChatGPTServer(
+        port=0, token_rate=0, reply_tokens=200, disconnect_rate=1.0, websocket=False
+    ) as server:
+        async with AsyncChatGPT(
+            session_token="test",
+            base_url=server.url,
+            retry_policy=RetryPolicy(max_retries=0),
+            debug_capture_size=1024,
+        ) as chatgpt:
+            conversation = chatgpt.create_new_conversation()
+            with pytest.raises(UnexpectedResponseError) as error:
+                async for _ in conversation.chat("hello"):
+                    pass
+            return error.value
+
+
+def test_error_reports_the_excerpt():
+    error = asyncio.run(chat_until_cut_off())
+    excerpt = error.server_response
+    assert excerpt["first_event"].startswith("data: ")
+    assert excerpt["first_event"].endswith("\n\n")
+    assert len(excerpt["tail"]) == 1024
+    assert excerpt["omitted_size"] > 0
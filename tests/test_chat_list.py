@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+from re_gpt import AsyncChatGPT
+from re_gpt.chat_list import ChatSummary, is_last_page
+from re_gpt.mock_server import MockChatGPTServer
+
+
+def record_pages(chatgpt: AsyncChatGPT, on_page=None) -> list:
+    offsets = []
+    fetch_chats_page = chatgpt.fetch_chats_page
+
+    async def recording_fetch(offset: int, limit: int) -> dict:
+        offsets.append(offset)
+        page = await fetch_chats_page(offset, limit)
+        if on_page is not None:
+            on_page(offset)
+        return page
+
+    chatgpt.fetch_chats_page = recording_fetch
+    return offsets
+
+
+async def list_chats(conversations: int, page_size: int, prefetch: int) -> tuple:
+    async with MockChatGPTServer(port=0, conversations=conversations, websocket=False) as server:
+        async with AsyncChatGPT(session_token="test", base_url=server.url) as chatgpt:
+            offsets = record_pages(chatgpt)
+            ids = [summary.id async for summary in chatgpt.iter_chats(page_size, prefetch)]
+            newest_first = sorted(
+                server.conversations.values(),
+                key=lambda conversation: conversation["update_time"],
+                reverse=True,
+            )
+            return ids, [conversation["conversation_id"] for conversation in newest_first], offsets
+
+
+def test_every_page_is_fetched_once():
+    for prefetch in (0, 2, 10):
+        ids, expected, offsets = asyncio.run(list_chats(10, page_size=3, prefetch=prefetch))
+        assert ids == expected
+        assert sorted(offsets) == [0, 3, 6, 9]
+
+
+def test_page_size_dividing_the_total():
+    ids, expected, offsets = asyncio.run(list_chats(9, page_size=3, prefetch=1))
+    assert ids == expected
+    # the total says there is no fourth page
+    assert sorted(offsets) == [0, 3, 6]
+
+
+def test_empty_account():
+    ids, expected, offsets = asyncio.run(list_chats(0, page_size=3, prefetch=2))
+    assert ids == expected == []
+    assert offsets == [0]
+
+
+async def list_while_one_moves_up() -> list:
+    async with MockChatGPTServer(port=0, conversations=9, websocket=False) as server:
+        async with AsyncChatGPT(session_token="test", base_url=server.url) as chatgpt:
+            oldest = min(
+                server.conversations.values(),
+                key=lambda conversation: conversation["update_time"],
+            )
+
+            def update_oldest(offset: int) -> None:
+                if offset == 0:
+                    # every conversation after the first page shifts down by one
+                    oldest["update_time"] = time.time()
+
+            record_pages(chatgpt, on_page=update_oldest)
+            return [summary.id async for summary in chatgpt.iter_chats(3, prefetch=0)]
+
+
+def test_conversation_moving_up_mid_way_is_not_yielded_twice():
+    ids = asyncio.run(list_while_one_moves_up())
+    assert len(ids) == len(set(ids))
+
+
+async def stop_early() -> list:
+    async with MockChatGPTServer(port=0, conversations=10, websocket=False) as server:
+        async with AsyncChatGPT(session_token="test", base_url=server.url) as chatgpt:
+            chats = chatgpt.iter_chats(page_size=2, prefetch=3)
+            async for _ in chats:
+                break
+            await chats.aclose()
+            return [task for task in asyncio.all_tasks() if "fetch_chats_page" in repr(task)]
+
+
+def test_stopping_early_cancels_the_prefetched_pages():
+    assert asyncio.run(stop_early()) == []
+
+
+def test_is_last_page():
+    items = [{"id": str(index)} for index in range(3)]
+    assert is_last_page({"items": []}, 0, 3)
+    assert is_last_page({"items": items[:2], "total": None}, 0, 3)
+    assert not is_last_page({"items": items, "total": 10}, 3, 3)
+    assert is_last_page({"items": items, "total": 9}, 6, 3)
+    assert not is_last_page({"items": items}, 0, 3)
+    # neither a short page nor the total count when conversations are missing
+    page = {"items": items[:2], "total": 2, "has_missing_conversations": True}
+    assert not is_last_page(page, 0, 3)
+
+
+def test_summary_update_time():
+    summary = ChatSummary.from_item(
+        {"id": "a", "update_time": "2024-01-01T00:00:00Z", "is_archived": None}
+    )
+    assert summary.updated_at() == 1704067200.0
+    assert summary.is_archived is False
+    assert ChatSummary("b", create_time=12.5).updated_at() == 12.5
+    assert ChatSummary("c", update_time="not a time").updated_at() is None
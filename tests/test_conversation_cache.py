@@ -0,0 +1,54 @@
+import asyncio
+
+from re_gpt import AsyncChatGPT
+from re_gpt.mock_server import MockChatGPTServer
+
+
+async def consume(conversation, prompt: str) -> None:
+    async for _ in conversation.chat(prompt):
+        pass
+
+
+async def reopen_after_other_client(ttl: float) -> tuple:
+    async with MockChatGPTServer(port=0, token_rate=0, reply_tokens=5, websocket=False) as server:
+        options = dict(session_token="test", base_url=server.url, conversation_cache_ttl=ttl)
+        async with AsyncChatGPT(**options) as first, AsyncChatGPT(**options) as second:
+            conversation = first.create_new_conversation()
+            await consume(conversation, "hello")
+
+            other = second.get_conversation(conversation.conversation_id)
+            await consume(other, "continued elsewhere")
+
+            await asyncio.sleep(ttl * 2)
+            reopened = first.get_conversation(conversation.conversation_id)
+            await reopened.load_state()
+            return reopened.parent_id, other.parent_id, conversation.parent_id
+
+
+def test_reopened_conversation_is_refetched_after_ttl():
+    parent_id, latest, stale = asyncio.run(reopen_after_other_client(ttl=0.2))
+    assert latest != stale
+    assert parent_id == latest
+
+
+async def fetch_after_changing_it() -> tuple:
+    async with MockChatGPTServer(port=0, token_rate=0, reply_tokens=5, websocket=False) as server:
+        async with AsyncChatGPT(session_token="test", base_url=server.url) as chatgpt:
+            conversation = chatgpt.create_new_conversation()
+            await consume(conversation, "hello")
+
+            reopened = chatgpt.get_conversation(conversation.conversation_id)
+            chat = await reopened.fetch_chat()
+            messages = len(chat["mapping"])
+            chat["mapping"].clear()
+
+            hits = chatgpt.conversation_cache_stats()["hits"]
+            again = await reopened.fetch_chat()
+            return messages, len(again["mapping"]), chatgpt.conversation_cache_stats()["hits"] - hits
+
+
+def test_changing_a_fetched_chat_leaves_the_cache_intact():
+    messages, refetched, hits = asyncio.run(fetch_after_changing_it())
+    assert messages > 0
+    assert refetched == messages
+    assert hits == 1
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from re_gpt import AsyncChatGPT
+from re_gpt.chat_list import ChatSummary
+from re_gpt.errors import InvalidExportCheckpoint
+from re_gpt.export import AsyncConversationExporter, read_export, zstandard
+from re_gpt.mock_server import MockChatGPTServer
+
+
+async def export(server: MockChatGPTServer, path: str, **options) -> dict:
+    async with AsyncChatGPT(
+        session_token="test", base_url=server.url, conversation_cache_size=0
+    ) as chatgpt:
+        return await AsyncConversationExporter(chatgpt, path, **options).run()
+
+
+def latest_records(path: str) -> dict:
+    records = {}
+    for record in read_export(path):
+        records[record["id"]] = record
+    return records
+
+
+@pytest.mark.parametrize(
+    "compression",
+    [
+        pytest.param(
+            "zstd", marks=pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+        ),
+        "gzip",
+        "none",
+    ],
+)
+def test_export_and_incremental_run(tmp_path, compression):
+    path = str(tmp_path / "export.jsonl")
+
+    async def run() -> tuple:
+        async with MockChatGPTServer(port=0, conversations=7, websocket=False) as server:
+            first = await export(server, path, compression=compression, checkpoint_every=3)
+            size = os.path.getsize(path)
+
+            unchanged = await export(server, path)
+            unchanged_size = os.path.getsize(path)
+
+            updated = next(iter(server.conversations.values()))
+            updated["title"] = "Renamed"
+            updated["update_time"] = time.time()
+            third = await export(server, path)
+            return first, (size, unchanged), unchanged_size, third, server.conversations
+
+    first, (size, unchanged), unchanged_size, third, conversations = asyncio.run(run())
+    assert (first["exported"], first["skipped"], first["failed"]) == (7, 0, {})
+    assert (unchanged["exported"], unchanged["skipped"]) == (0, 7)
+    assert unchanged_size == size
+    assert (third["exported"], third["skipped"]) == (1, 6)
+
+    records = latest_records(path)
+    assert len(list(read_export(path))) == 8
+    assert records.keys() == conversations.keys()
+    for conversation_id, record in records.items():
+        assert record["update_time"] == conversations[conversation_id]["update_time"]
+        assert record["conversation"]["title"] == conversations[conversation_id]["title"]
+
+    with open(path + ".checkpoint.json", encoding="utf-8") as file:
+        checkpoint = json.load(file)
+    assert checkpoint["compression"] == compression
+    assert checkpoint["offset"] == os.path.getsize(path)
+    assert len(checkpoint["conversations"]) == 7
+
+
+def test_interrupted_export_resumes_from_the_last_commit(tmp_path):
+    path = str(tmp_path / "export.jsonl.gz")
+
+    async def run() -> tuple:
+        async with MockChatGPTServer(port=0, conversations=10, websocket=False) as server:
+            async with AsyncChatGPT(
+                session_token="test", base_url=server.url, conversation_cache_size=0
+            ) as chatgpt:
+                exporter = AsyncConversationExporter(
+                    chatgpt, path, compression="gzip", concurrency=1, checkpoint_every=2
+                )
+                fetch = exporter.fetch
+                fetches = []
+
+                async def fetch_until_stopped(summary):
+                    fetches.append(summary.id)
+                    if len(fetches) > 5:
+                        await asyncio.Event().wait()
+                    return await fetch(summary)
+
+                exporter.fetch = fetch_until_stopped
+                task = asyncio.create_task(exporter.run())
+                while exporter.stats["exported"] < 5:
+                    await asyncio.sleep(0.01)
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+            # a crash after the last commit leaves a partial write behind
+            with open(path, "ab") as file:
+                file.write(b"\x1f\x8bpartial gzip member")
+
+            resumed = await export(server, path)
+            return exporter.stats, resumed, server.conversations
+
+    interrupted, resumed, conversations = asyncio.run(run())
+    assert interrupted["exported"] == 5
+    assert (resumed["exported"], resumed["skipped"]) == (5, 5)
+
+    ids = [record["id"] for record in read_export(path)]
+    assert sorted(ids) == sorted(conversations)
+
+
+def test_unusable_checkpoints_are_rejected(tmp_path):
+    path = str(tmp_path / "export.jsonl")
+
+    async def run() -> list:
+        errors = []
+        async with MockChatGPTServer(port=0, conversations=3, websocket=False) as server:
+            await export(server, path, compression="none")
+
+            with pytest.raises(InvalidExportCheckpoint) as error:
+                await export(server, path, compression="gzip")
+            errors.append(error.value)
+
+            with open(path, "r+b") as file:
+                file.truncate(10)
+            with pytest.raises(InvalidExportCheckpoint) as error:
+                await export(server, path)
+            errors.append(error.value)
+
+            os.remove(path + ".checkpoint.json")
+            with pytest.raises(InvalidExportCheckpoint) as error:
+                await export(server, path)
+            errors.append(error.value)
+        return errors
+
+    mismatch, truncated, missing = asyncio.run(run())
+    assert "compressed with none" in mismatch.reason
+    assert "shorter" in truncated.reason
+    assert "missing" in missing.reason
+    # none of them touched the output
+    assert os.path.getsize(path) == 10
+
+
+def test_line_breaks_in_bodies_stay_on_one_line(tmp_path):
+    path = str(tmp_path / "export.jsonl")
+    exporter = AsyncConversationExporter(None, path)
+
+    line = exporter.build_line(ChatSummary("a", update_time=1.5), b'{\r\n  "title": "x"\n}')
+    assert line.count(b"\n") == 1
+    with open(path, "wb") as file:
+        file.write(line)
+    assert list(read_export(path)) == [
+        {"id": "a", "update_time": 1.5, "conversation": {"title": "x"}}
+    ]
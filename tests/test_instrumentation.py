@@ -0,0 +1,26 @@
+import asyncio
+
+from re_gpt import AsyncChatGPT
+from re_gpt.mock_server import MockChatGPTServer
+
+
+async def chat_with_hooks(hooks: list) -> str:
+    async with MockChatGPTServer(port=0, token_rate=0, reply_tokens=5, websocket=False) as server:
+        async with AsyncChatGPT(
+            session_token="test", base_url=server.url, instrumentation_hooks=hooks
+        ) as chatgpt:
+            conversation = chatgpt.create_new_conversation()
+            return "".join([m["content"] async for m in conversation.chat("hello")])
+
+
+def test_failing_hook_does_not_break_the_turn(caplog):
+    events = []
+
+    def broken_hook(event: dict) -> None:
+        raise RuntimeError("broken hook")
+
+    reply = asyncio.run(chat_with_hooks([broken_hook, lambda event: events.append(event["event"])]))
+    assert reply
+    assert events[0] == "turn_start" and events[-1] == "turn_end"
+    assert "first_delta" in events
+    assert "broken hook" in caplog.text
@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+from re_gpt import AsyncChatGPT
+from re_gpt.async_chatgpt import AsyncConversation
+from re_gpt.mock_server import MockChatGPTServer
+
+
+def event(text: str, role: str = "assistant") -> str:
+    return json.dumps(
+        {
+            "message": {
+                "id": "message",
+                "author": {"role": role},
+                "content": {"content_type": "text", "parts": [text]},
+                "metadata": {"parent_id": "parent"},
+            },
+            "conversation_id": "conversation",
+        }
+    )
+
+
+def replay(latest_wins: bool, chunks: list) -> list:
+    conversation = AsyncConversation(AsyncChatGPT(session_token="test", latest_wins=latest_wins))
+    deltas = []
+    full_message = None
+    for events in chunks:
+        responses, full_message = conversation.handle_events(events, full_message)
+        deltas.append([response["content"] for response in responses])
+    return deltas
+
+
+def test_latest_wins_yields_one_delta_per_chunk():
+    chunks = [
+        [event("a"), event("ab"), event("abc")],
+        [event("abcd"), event("abcde"), "[DONE]"],
+        [event("prompt", role="user")],
+    ]
+    assert replay(False, chunks) == [["a", "b", "c"], ["d", "e"], []]
+    assert replay(True, chunks) == [["abc"], ["de"], []]
+
+
+async def chat_in_both_modes() -> tuple:
+    async with MockChatGPTServer(port=0, token_rate=0, reply_tokens=40, websocket=False) as server:
+        replies = []
+        for latest_wins in (False, True):
+            async with AsyncChatGPT(
+                session_token="test", base_url=server.url, latest_wins=latest_wins
+            ) as chatgpt:
+                conversation = chatgpt.create_new_conversation()
+                deltas = [message["content"] async for message in conversation.chat("hello")]
+                replies.append("".join(deltas))
+        return replies
+
+
+def test_latest_wins_streams_the_same_reply():
+    default, latest_wins = asyncio.run(chat_in_both_modes())
+    assert default
+    assert latest_wins == default
@@ -0,0 +1,35 @@
+import asyncio
+
+from re_gpt.limiter import AsyncAdaptiveLimiter
+
+
+class Response:
+    def __init__(self, status_code: int, retry_after=None):
+        self.status_code = status_code
+        self.headers = {"retry-after": retry_after} if retry_after else {}
+
+
+async def limits_after(*responses) -> list:
+    limiter = AsyncAdaptiveLimiter(max_limit=16, initial_limit=8)
+    limits = []
+    for response in responses:
+        await limiter.acquire()
+        limiter.release(response)
+        limits.append(limiter.stats()["limit"])
+    return limits
+
+
+def test_only_overload_statuses_lower_the_limit():
+    assert asyncio.run(limits_after(None, Response(401), Response(500))) == [8, 8, 8]
+    assert asyncio.run(limits_after(Response(503))) == [4]
+    assert asyncio.run(limits_after(Response(429))) == [4]
+
+
+def test_errors_do_not_raise_the_limit():
+    limits = asyncio.run(limits_after(*[Response(500)] * 20, *[Response(200)] * 20))
+    assert limits[19] == 8
+    assert limits[-1] > 8
+
+
+def test_starts_at_the_bound():
+    assert AsyncAdaptiveLimiter(max_limit=32).stats()["limit"] == 32
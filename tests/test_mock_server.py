@@ -0,0 +1,91 @@
+import asyncio
+
+from re_gpt import AsyncChatGPT
+from re_gpt.mock_server import MockChatGPTServer
+
+
+async def chat(conversation, prompt: str) -> str:
+    return "".join([message["content"] async for message in conversation.chat(prompt)])
+
+
+async def two_turns(seed: int) -> tuple:
+    async with MockChatGPTServer(
+        port=0, token_rate=0, reply_tokens=8, websocket=False, seed=seed
+    ) as server:
+        async with AsyncChatGPT(session_token="test", base_url=server.url + "/") as chatgpt:
+            conversation = chatgpt.create_new_conversation()
+            first = await chat(conversation, "hello")
+            second = await chat(conversation, "and then?")
+
+            stored = await chatgpt.get_conversation(conversation.conversation_id).fetch_chat()
+            listed = [summary async for summary in chatgpt.iter_chats()]
+            return (first, second), stored, listed, conversation
+
+
+def test_conversation_is_kept_between_turns():
+    replies, stored, listed, conversation = asyncio.run(two_turns(seed=0))
+    assert stored["current_node"] == conversation.parent_id
+
+    mapping = stored["mapping"]
+    branch = []
+    node = mapping[stored["current_node"]]
+    while node["message"] is not None:
+        branch.append((node["message"]["author"]["role"], node["message"]["content"]["parts"][0]))
+        node = mapping[node["parent"]]
+    assert branch[::-1] == [
+        ("user", "hello"),
+        ("assistant", replies[0]),
+        ("user", "and then?"),
+        ("assistant", replies[1]),
+    ]
+
+    assert [(summary.id, summary.title) for summary in listed] == [
+        (conversation.conversation_id, "hello")
+    ]
+
+
+def test_replies_depend_on_the_seed_and_prompt_only():
+    replies, *_ = asyncio.run(two_turns(seed=0))
+    again, *_ = asyncio.run(two_turns(seed=0))
+    other_seed, *_ = asyncio.run(two_turns(seed=1))
+    assert replies == again
+    assert replies != other_seed
+    assert replies[0] != replies[1]
+
+
+async def chat_past_max_tokens() -> tuple:
+    async with MockChatGPTServer(
+        port=0, token_rate=0, reply_tokens=25, max_tokens=10, websocket=False
+    ) as server:
+        async with AsyncChatGPT(session_token="test", base_url=server.url) as chatgpt:
+            conversation = chatgpt.create_new_conversation()
+            reply = await chat(conversation, "tell me more")
+            mapping = server.conversations[conversation.conversation_id]["mapping"]
+            stored = mapping[conversation.parent_id]["message"]["content"]["parts"][0]
+            return reply, stored, server.stats["conversation_requests"]
+
+
+def test_replies_past_max_tokens_are_continued():
+    reply, stored, requests = asyncio.run(chat_past_max_tokens())
+    assert reply == stored
+    assert len(stored.split(" ")) == 25
+    assert requests == 3
+
+
+async def fetch_with_etag() -> tuple:
+    async with MockChatGPTServer(port=0, conversations=1, websocket=False) as server:
+        async with AsyncChatGPT(
+            session_token="test", base_url=server.url, conversation_cache_ttl=0
+        ) as chatgpt:
+            conversation_id = next(iter(server.conversations))
+            conversation = chatgpt.get_conversation(conversation_id)
+            first = await conversation.fetch_chat()
+            second = await conversation.fetch_chat()
+            return first, second, chatgpt.conversation_cache_stats()
+
+
+def test_unchanged_conversation_is_revalidated_with_its_etag():
+    first, second, stats = asyncio.run(fetch_with_etag())
+    assert first == second
+    assert stats["misses"] == 1
+    assert stats["revalidations"] == 1
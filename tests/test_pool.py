@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from re_gpt import AsyncChatGPTPool
+from re_gpt.errors import InvalidSessionToken, UnknownPoolConversation
+from re_gpt.mock_server import MockChatGPTServer
+
+
+async def spread_conversations(count: int) -> list:
+    async with MockChatGPTServer(port=0, token_rate=0, reply_tokens=5, websocket=False) as server:
+        accounts = [{"session_token": "first"}, {"session_token": "second"}]
+        async with AsyncChatGPTPool(accounts, base_url=server.url) as pool:
+            conversations = [await pool.create_new_conversation() for _ in range(count)]
+            for conversation in conversations:
+                async for _ in conversation.chat("hello"):
+                    pass
+
+            with pytest.raises(UnknownPoolConversation):
+                await pool.get_conversation("not-from-this-pool")
+            known = await pool.get_conversation(conversations[1].conversation_id)
+            assert known.account is conversations[1].account
+
+            return [account["conversations"] for account in pool.stats()]
+
+
+def test_conversations_created_up_front_are_spread():
+    assert asyncio.run(spread_conversations(4)) == [2, 2]
+
+
+async def chat_with_revoked_session(server) -> tuple:
+    accounts = [{"session_token": "revoked"}, {"session_token": "valid"}]
+    async with AsyncChatGPTPool(
+        accounts, base_url=server.url, conversation_cache_size=0
+    ) as pool:
+        conversation = await pool.create_new_conversation()
+        assert conversation.account is pool.accounts[0]
+        async for _ in conversation.chat("hello"):
+            pass
+
+        revoked = pool.accounts[0].client
+
+        async def fetch_auth_token():
+            raise InvalidSessionToken
+
+        revoked.fetch_auth_token = fetch_auth_token
+        revoked.reset_auth_token()
+
+        # fails while loading the conversation, before any request is sent
+        reopened = await pool.get_conversation(conversation.conversation_id)
+        with pytest.raises(InvalidSessionToken):
+            async for _ in reopened.chat("hello again"):
+                pass
+
+        with pytest.raises(ValueError):
+            await pool.get_conversation("conversation-id", account=2)
+
+        replacement = await pool.create_new_conversation()
+        return pool.stats()[0], replacement.account.index
+
+
+async def revoked_session_is_disabled() -> tuple:
+    async with MockChatGPTServer(port=0, token_rate=0, reply_tokens=5, websocket=False) as server:
+        return await chat_with_revoked_session(server)
+
+
+def test_invalid_session_token_disables_the_account():
+    stats, replacement = asyncio.run(revoked_session_is_disabled())
+    assert stats["disabled_reason"] == "invalid session token"
+    assert replacement == 1
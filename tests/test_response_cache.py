@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+from re_gpt import AsyncChatGPT, DiskResponseCache
+from re_gpt.mock_server import MockChatGPTServer
+
+
+class ThreadRecordingCache(DiskResponseCache):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+    def put(self, key, recording):
+        self.threads.add(threading.get_ident())
+        super().put(key, recording)
+
+
+async def ask_twice(cache: DiskResponseCache) -> tuple:
+    async with MockChatGPTServer(port=0, token_rate=0, reply_tokens=5, websocket=False) as server:
+        async with AsyncChatGPT(
+            session_token="test", base_url=server.url, response_cache=cache
+        ) as chatgpt:
+            replies = []
+            for _ in range(2):
+                conversation = chatgpt.create_new_conversation()
+                replies.append("".join([m["content"] async for m in conversation.chat("hello")]))
+            return replies, server.stats["conversation_requests"], threading.get_ident()
+
+
+def test_disk_cache_runs_off_the_event_loop(tmp_path):
+    cache = ThreadRecordingCache(str(tmp_path / "responses.sqlite"))
+    (first, second), requests, loop_thread = asyncio.run(ask_twice(cache))
+    assert first == second
+    assert requests == 1
+    assert cache.threads and loop_thread not in cache.threads
@@ -0,0 +1,44 @@
+import asyncio
+
+from re_gpt import AsyncChatGPT, RetryPolicy
+from re_gpt.mock_server import MockChatGPTServer
+
+
+async def chat_with_errors(websocket_mode: bool, prompts: int = 10) -> tuple:
+    async with MockChatGPTServer(
+        port=0,
+        websocket_port=0,
+        token_rate=0,
+        reply_tokens=10,
+        error_rate=0.3,
+        error_status=503,
+        websocket=websocket_mode,
+        seed=1,
+    ) as server:
+        async with AsyncChatGPT(
+            session_token="test",
+            base_url=server.url,
+            websocket_mode=websocket_mode,
+            retry_policy=RetryPolicy(max_retries=10),
+            conversation_cache_size=0,
+        ) as chatgpt:
+            replies = 0
+            for index in range(prompts):
+                conversation = chatgpt.create_new_conversation()
+                async for _ in conversation.chat(f"prompt {index}"):
+                    pass
+                replies += 1
+        return replies, server.stats
+
+
+def test_http_error_statuses_are_resent():
+    replies, stats = asyncio.run(chat_with_errors(websocket_mode=False))
+    assert replies == 10
+    assert stats["errors"] > 0
+    assert stats["conversation_requests"] == 10 + stats["errors"]
+
+
+def test_websocket_error_statuses_are_resent():
+    replies, stats = asyncio.run(chat_with_errors(websocket_mode=True))
+    assert replies == 10
+    assert stats["errors"] > 0
@@ -0,0 +1,61 @@
+import asyncio
+import sqlite3
+import threading
+
+from re_gpt import AsyncChatGPT, ConversationIndex
+from re_gpt.mock_server import MockChatGPTServer
+
+
+class ThreadRecordingIndex(ConversationIndex):
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def index_chat(self, *args, **kwargs):
+        self.threads.add(threading.get_ident())
+        return super().index_chat(*args, **kwargs)
+
+    def add_messages(self, *args, **kwargs):
+        self.threads.add(threading.get_ident())
+        return super().add_messages(*args, **kwargs)
+
+
+async def chat_and_reopen(index: ConversationIndex) -> int:
+    async with MockChatGPTServer(port=0, token_rate=0, reply_tokens=5, websocket=False) as server:
+        async with AsyncChatGPT(
+            session_token="test", base_url=server.url, search_index=index
+        ) as chatgpt:
+            conversation = chatgpt.create_new_conversation()
+            async for _ in conversation.chat("unmistakable prompt"):
+                pass
+            await chatgpt.get_conversation(conversation.conversation_id).fetch_chat()
+            return threading.get_ident()
+
+
+def test_index_writes_run_off_the_event_loop():
+    index = ThreadRecordingIndex()
+    loop_thread = asyncio.run(chat_and_reopen(index))
+    assert index.threads and loop_thread not in index.threads
+    assert index.search("unmistakable")
+
+
+class BrokenIndex(ConversationIndex):
+    def add_messages(self, *args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+
+async def chat_with_broken_index() -> tuple:
+    async with MockChatGPTServer(port=0, token_rate=0, reply_tokens=5, websocket=False) as server:
+        async with AsyncChatGPT(
+            session_token="test", base_url=server.url, search_index=BrokenIndex()
+        ) as chatgpt:
+            conversation = chatgpt.create_new_conversation()
+            reply = "".join([m["content"] async for m in conversation.chat("hello")])
+            return reply, server.stats["conversation_requests"]
+
+
+def test_index_errors_do_not_fail_the_turn(caplog):
+    reply, requests = asyncio.run(chat_with_broken_index())
+    assert reply
+    assert requests == 1
+    assert "database is locked" in caplog.text
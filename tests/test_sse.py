@@ -0,0 +1,87 @@
+import asyncio
+
+from re_gpt import AsyncChatGPT
+from re_gpt.mock_server import MockChatGPTServer
+from re_gpt.sse import SSEDecoder
+
+
+def feed_all(chunks) -> list:
+    decoder = SSEDecoder()
+    events = []
+    for chunk in chunks:
+        events += decoder.feed(chunk)
+    return events + decoder.flush()
+
+
+def test_lines_split_across_chunks():
+    stream = b'data: {"a": 1}\n\ndata: {"b": 2}\n\ndata: [DONE]\n\n'
+    expected = ['{"a": 1}', '{"b": 2}', "[DONE]"]
+    assert feed_all([stream]) == expected
+    for size in (1, 2, 3, 7):
+        assert feed_all([stream[i : i + size] for i in range(0, len(stream), size)]) == expected
+
+
+def test_events_are_returned_once_complete():
+    decoder = SSEDecoder()
+    assert decoder.feed(b"data: fir") == []
+    assert decoder.feed(b"st\n") == []
+    assert decoder.feed(b"\ndata: second\n") == ["first"]
+    assert decoder.feed(b"\n") == ["second"]
+
+
+def test_split_multibyte_characters():
+    text = "héllo → 世界 🙂"
+    stream = f"data: {text}\n\n".encode()
+    assert feed_all([stream[i : i + 1] for i in range(len(stream))]) == [text]
+
+
+def test_crlf_line_endings():
+    stream = b"data: one\r\n\r\ndata: two\r\n\r\n"
+    assert feed_all([stream]) == ["one", "two"]
+    # a CR and its LF in different chunks
+    assert feed_all([b"data: one\r", b"\n\r", b"\n"]) == ["one"]
+
+
+def test_multi_line_data_and_other_fields():
+    stream = b"event: delta\nid: 3\n: comment\ndata: first\ndata:second\ndata:  third\n\n"
+    assert feed_all([stream]) == ["first\nsecond\n third"]
+
+
+def test_flush_returns_the_unterminated_event():
+    decoder = SSEDecoder()
+    assert decoder.feed(b"data: done\n\ndata: last") == ["done"]
+    assert decoder.flush() == ["last"]
+
+    decoder = SSEDecoder()
+    assert decoder.feed(b"data: last\n") == []
+    assert decoder.flush() == ["last"]
+
+    decoder = SSEDecoder()
+    assert decoder.feed("data: text\n\n") == ["text"]
+    assert decoder.flush() == []
+
+
+def test_flush_replaces_a_truncated_character():
+    decoder = SSEDecoder()
+    assert decoder.feed("data: é".encode()[:-1]) == []
+    assert decoder.flush() == ["�"]
+
+
+async def chat_over_fragments(fragments: int) -> tuple:
+    async with MockChatGPTServer(
+        port=0, token_rate=0, reply_tokens=30, fragments=fragments, websocket=False
+    ) as server:
+        async with AsyncChatGPT(session_token="test", base_url=server.url) as chatgpt:
+            conversation = chatgpt.create_new_conversation()
+            deltas = []
+            async for message in conversation.chat("hello"):
+                deltas.append(message["content"])
+
+            mapping = server.conversations[conversation.conversation_id]["mapping"]
+            reply = mapping[conversation.parent_id]["message"]["content"]["parts"][0]
+            return deltas, reply
+
+
+def test_chat_reassembles_fragmented_events():
+    deltas, reply = asyncio.run(chat_over_fragments(fragments=5))
+    assert "".join(deltas) == reply
@@ -0,0 +1,76 @@
+import asyncio
+
+from re_gpt import AsyncChatGPT
+from re_gpt.errors import BackendError
+from re_gpt.mock_server import MockChatGPTServer
+
+
+def count_auth_token_fetches(chatgpt: AsyncChatGPT, failures: int = 0) -> list:
+    calls = []
+    fetch_auth_token = chatgpt.fetch_auth_token
+
+    async def counting_fetch():
+        calls.append(None)
+        await asyncio.sleep(0.05)
+        if len(calls) <= failures:
+            raise BackendError(503)
+        return await fetch_auth_token()
+
+    chatgpt.fetch_auth_token = counting_fetch
+    return calls
+
+
+async def chat_with_lazy_startup() -> tuple:
+    async with MockChatGPTServer(port=0, token_rate=0, reply_tokens=5, websocket=False) as server:
+        async with AsyncChatGPT(
+            session_token="test", base_url=server.url, lazy_startup=True, auth_token_cache_dir=None
+        ) as chatgpt:
+            requests_on_enter = server.stats["requests"]
+            calls = count_auth_token_fetches(chatgpt)
+
+            async def chat(index: int) -> int:
+                conversation = chatgpt.create_new_conversation()
+                return len([message async for message in conversation.chat(f"prompt {index}")])
+
+            replies = await asyncio.gather(*(chat(index) for index in range(3)))
+            return requests_on_enter, len(calls), replies
+
+
+def test_lazy_startup_sends_nothing_on_enter_and_shares_the_token():
+    requests_on_enter, auth_token_fetches, replies = asyncio.run(chat_with_lazy_startup())
+    assert requests_on_enter == 0
+    assert auth_token_fetches == 1
+    assert all(replies)
+
+
+async def enter_eagerly() -> tuple:
+    async with MockChatGPTServer(port=0, websocket_port=0, websocket=True) as server:
+        async with AsyncChatGPT(
+            session_token="test", base_url=server.url, auth_token_cache_dir=None
+        ) as chatgpt:
+            has_token = chatgpt.auth_token is not None
+            await chatgpt.websocket_setup_task
+            return has_token, chatgpt.websocket_mode
+
+
+def test_warmup_gets_the_token_and_sets_up_the_websocket():
+    assert asyncio.run(enter_eagerly()) == (True, True)
+
+
+async def retry_failed_auth_token() -> int:
+    async with MockChatGPTServer(port=0, websocket=False) as server:
+        async with AsyncChatGPT(
+            session_token="test", base_url=server.url, lazy_startup=True, auth_token_cache_dir=None
+        ) as chatgpt:
+            calls = count_auth_token_fetches(chatgpt, failures=1)
+            waiting = [asyncio.create_task(chatgpt.request_headers()) for _ in range(2)]
+            results = await asyncio.gather(*waiting, return_exceptions=True)
+            assert all(isinstance(result, BackendError) for result in results)
+
+            headers = await chatgpt.request_headers()
+            assert headers["Authorization"].startswith("Bearer ")
+            return len(calls)
+
+
+def test_failed_auth_token_is_fetched_again_by_the_next_request():
+    assert asyncio.run(retry_failed_auth_token()) == 2
@@ -0,0 +1,13 @@
+from re_gpt import SyncChatGPT
+
+
+def test_attributes_are_set_on_the_wrapped_objects():
+    chatgpt = SyncChatGPT(session_token="test")
+    chatgpt.latest_wins = True
+    assert chatgpt.chatgpt.latest_wins is True
+    assert "latest_wins" not in vars(chatgpt)
+
+    conversation = chatgpt.get_conversation("conversation-id")
+    conversation.parent_id = "parent-id"
+    assert conversation.conversation.parent_id == "parent-id"
+    assert "parent_id" not in vars(conversation)
@@ -0,0 +1,38 @@
+import asyncio
+
+from re_gpt.token_pool import AsyncTokenPool
+
+
+def counting_fetch():
+    fetched = []
+
+    async def fetch_token():
+        fetched.append(f"t{len(fetched) + 1}")
+        return fetched[-1]
+
+    return fetch_token, fetched
+
+
+async def get_tokens(pool: AsyncTokenPool, count: int) -> list:
+    return [await pool.get() for _ in range(count)]
+
+
+def test_tokens_are_reused_without_a_pool():
+    fetch_token, fetched = counting_fetch()
+    pool = AsyncTokenPool(fetch_token, pool_size=0, max_uses=5)
+    assert asyncio.run(get_tokens(pool, 7)) == ["t1"] * 5 + ["t2"] * 2
+    assert fetched == ["t1", "t2"]
+    assert pool.stats() == {"hits": 5, "misses": 2, "cached": 1}
+
+
+def test_single_use_tokens_are_fetched_every_time():
+    fetch_token, fetched = counting_fetch()
+    pool = AsyncTokenPool(fetch_token, pool_size=0, max_uses=1)
+    assert asyncio.run(get_tokens(pool, 3)) == ["t1", "t2", "t3"]
+    assert pool.stats() == {"hits": 0, "misses": 3, "cached": 0}
+
+
+def test_expired_tokens_are_not_reused():
+    fetch_token, fetched = counting_fetch()
+    pool = AsyncTokenPool(fetch_token, ttl=0, pool_size=0, max_uses=5)
+    assert asyncio.run(get_tokens(pool, 2)) == ["t1", "t2"]
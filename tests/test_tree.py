@@ -0,0 +1,76 @@
+from re_gpt.tree import ConversationTree
+
+
+def node(parent, children, role=None, model_slug=None) -> dict:
+    message = None
+    if role is not None:
+        metadata = {"model_slug": model_slug} if model_slug else {}
+        message = {"author": {"role": role}, "metadata": metadata}
+    return {"parent": parent, "children": children, "message": message}
+
+
+def branched_chat(current_node="answer-2b") -> dict:
+    # root -> prompt-1 -> answer-1 -> {prompt-2a -> answer-2a, prompt-2b -> answer-2b}
+    return {
+        "current_node": current_node,
+        "mapping": {
+            "root": node(None, ["prompt-1"]),
+            "prompt-1": node("root", ["answer-1"], "user"),
+            "answer-1": node("prompt-1", ["prompt-2a", "prompt-2b"], "assistant", "gpt-4"),
+            "prompt-2a": node("answer-1", ["answer-2a"], "user"),
+            "answer-2a": node("prompt-2a", [], "assistant", "gpt-4"),
+            "prompt-2b": node("answer-1", ["answer-2b"], "user"),
+            "answer-2b": node("prompt-2b", [], "assistant", "text-davinci-002-render-sha"),
+        },
+    }
+
+
+def test_traversal():
+    tree = ConversationTree(branched_chat())
+    assert len(tree) == 7
+    assert "prompt-2a" in tree and "missing" not in tree
+
+    assert tree.active_leaf() == "answer-2b"
+    assert tree.path_to_root() == ["answer-2b", "prompt-2b", "answer-1", "prompt-1", "root"]
+    assert tree.path_to_root("answer-2a") == ["answer-2a", "prompt-2a", "answer-1", "prompt-1", "root"]
+
+    assert tree.parent("root") is None
+    assert tree.parent("prompt-2a") == "answer-1"
+    assert tree.children("answer-1") == ["prompt-2a", "prompt-2b"]
+    assert tree.children("answer-2a") == []
+    assert tree.siblings("prompt-2b") == ["prompt-2a", "prompt-2b"]
+    assert tree.siblings("root") == ["root"]
+
+    assert tree.role("root") is None
+    assert tree.role("prompt-1") == "user"
+    assert tree.role("answer-1") == "assistant"
+
+
+def test_model_slug_of_the_branch():
+    tree = ConversationTree(branched_chat())
+    assert tree.model_slug() == "text-davinci-002-render-sha"
+    assert tree.model_slug("answer-2a") == "gpt-4"
+    # a prompt takes the model of the answer it follows
+    assert tree.model_slug("prompt-2a") == "gpt-4"
+    assert tree.model_slug("prompt-1") is None
+
+
+def test_missing_current_node_falls_back_to_the_newest_node():
+    tree = ConversationTree(branched_chat(current_node=None))
+    assert tree.active_leaf() == "answer-2b"
+
+
+def test_unknown_children_are_skipped():
+    chat = branched_chat()
+    chat["mapping"]["answer-2a"]["children"] = ["deleted"]
+    tree = ConversationTree(chat)
+    assert tree.children("answer-2a") == []
+    assert tree.children("answer-1") == ["prompt-2a", "prompt-2b"]
+
+
+def test_empty_chat():
+    tree = ConversationTree({})
+    assert len(tree) == 0
+    assert tree.active_leaf() is None
+    assert tree.path_to_root() == []
+    assert tree.model_slug() is None
@@ -0,0 +1,97 @@
+import asyncio
+import base64
+import json
+
+from re_gpt import AsyncChatGPT
+from re_gpt.errors import WebSocketError
+from re_gpt.mock_server import MockChatGPTServer
+from re_gpt.websocket import AsyncWebSocketManager
+
+
+async def reply(chat) -> str:
+    return "".join([message["content"] async for message in chat])
+
+
+async def chat_next_to_stalled_consumer() -> tuple:
+    async with MockChatGPTServer(
+        port=0, websocket_port=0, token_rate=0, reply_tokens=50
+    ) as server:
+        async with AsyncChatGPT(
+            session_token="test",
+            base_url=server.url,
+            websocket_mode=True,
+            websocket_queue_size=4,
+            conversation_cache_size=0,
+        ) as chatgpt:
+            stalled = chatgpt.create_new_conversation().chat("hello")
+            first = (await stalled.__anext__())["content"]
+
+            fast = chatgpt.create_new_conversation()
+            expected = await asyncio.wait_for(reply(fast.chat("hello")), 5)
+
+            return first + await reply(stalled), expected, chatgpt.websocket.stats()
+
+
+def test_stalled_consumer_does_not_block_the_socket():
+    stalled, expected, stats = asyncio.run(chat_next_to_stalled_consumer())
+    assert stalled == expected
+    assert stats["dropped"] > 0
+
+
+class Frames:
+    def __init__(self, frames: list):
+        self.frames = frames
+
+    def __aiter__(self):
+        return self.receive()
+
+    async def receive(self):
+        for frame in self.frames:
+            yield frame
+
+
+def frame(request_id: str, body: str, encoded: bool = False) -> str:
+    if not encoded:
+        body = base64.b64encode(body.encode()).decode()
+    return json.dumps({"websocket_request_id": request_id, "body": body})
+
+
+async def drain(response_queue) -> list:
+    items = []
+    while not response_queue.empty():
+        items.append(response_queue.get_nowait())
+    return items
+
+
+async def receive_frames(frames: list, queue_size: int = 256) -> tuple:
+    manager = AsyncWebSocketManager(chatgpt=None, queue_size=queue_size)
+    broken = manager.open_route("broken")
+    healthy = manager.open_route("healthy")
+    await manager.receive(Frames(frames))
+    return await drain(broken), await drain(healthy), manager
+
+
+def test_malformed_frames_only_affect_their_request():
+    broken, healthy, manager = asyncio.run(
+        receive_frames(
+            [
+                "not json",
+                "[1, 2]",
+                frame("healthy", "data: first\n\n"),
+                frame("broken", "not base64", encoded=True),
+                frame("broken", base64.b64encode(b"\xff\xfe").decode(), encoded=True),
+                frame("healthy", "data: [DONE]\n\n"),
+            ]
+        )
+    )
+    assert len(broken) == 1 and isinstance(broken[0], WebSocketError)
+    assert healthy == ["data: first\n\n", "data: [DONE]\n\n", None]
+    assert manager.stats()["requests"] == 1
+
+
+def test_full_queue_keeps_the_newest_messages_and_the_end_marker():
+    frames = [frame("healthy", f"data: {i}\n\n") for i in range(10)]
+    frames.append(frame("healthy", "data: [DONE]\n\n"))
+    _, healthy, manager = asyncio.run(receive_frames(frames, queue_size=2))
+    assert healthy == ["data: 9\n\n", "data: [DONE]\n\n", None]
+    assert manager.stats()["dropped"] == 9